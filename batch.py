@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, ToolMessage
+
+from graph import ProposalWorkflow
+from utils.file_manager import FileStorageManager, atomic_write
+from utils.rate_limit import configure_rate_limits
+
+load_dotenv()
+
+# State keys copied into the manifest for each finished job.
+ARTIFACT_KEYS = [
+    "cover_letter_path",
+    "google_doc_url",
+    "google_doc_md_path",
+    "google_doc_docx_path",
+    "mermaid_code_path",
+    "mermaid_image_path",
+]
+# A job is only `ok` if all of these are in its final state.
+REQUIRED_ARTIFACT_KEYS = ["cover_letter_path", "google_doc_url", "mermaid_image_path"]
+
+
+def load_jobs(source: str) -> List[dict]:
+    """
+    Loads job descriptions from a folder of `.txt` files or from a JSONL file.
+
+    Each JSONL line must contain a `job_description` field and may contain an `id`.
+
+    Returns:
+        List[dict]: One `{"id", "job_description", "source"}` dict per job.
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(source, name)
+            with open(path, "r") as f:
+                jobs.append({"id": os.path.splitext(name)[0], "job_description": f.read(), "source": path})
+    else:
+        with open(source, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                jobs.append({
+                    "id": str(record.get("id", line_number)),
+                    "job_description": record["job_description"],
+                    "source": f"{source}:{line_number}",
+                })
+    return jobs
+
+
+def run_job(workflow: ProposalWorkflow, job: dict, base_dir: str) -> dict:
+    """Runs the workflow for a single job and returns its manifest entry."""
+    started_at = time.monotonic()
+    file_manager = FileStorageManager(base_dir=base_dir)
+    thread_id = file_manager.job_id
+    file_manager.save_job_description(job["job_description"])
+
+    entry = {
+        "id": job["id"],
+        "source": job["source"],
+        "thread_id": thread_id,
+        "job_folder_path": file_manager.job_folder_path,
+    }
+    try:
+        initial_state = {
+            "messages": [("user", job["job_description"])],
+            "job_folder_path": file_manager.job_folder_path,
+        }
+        final_response = None
+        tool_names = {}
+        tool_errors = []
+        for event in workflow.run(initial_state, thread_id):
+            for node_output in event.values():
+                for message in (node_output or {}).get("messages", []):
+                    if isinstance(message, AIMessage) and message.tool_calls:
+                        tool_names.update({tool_call["id"]: tool_call["name"] for tool_call in message.tool_calls})
+                    elif isinstance(message, AIMessage):
+                        final_response = message.content
+                    elif isinstance(message, ToolMessage) and message.status == "error":
+                        tool_errors.append({"tool": tool_names.get(message.tool_call_id), "error": message.content})
+
+        state = workflow.graph.get_state({"configurable": {"thread_id": thread_id}}).values
+        entry.update({key: state.get(key) for key in ARTIFACT_KEYS})
+        if final_response:
+            entry["final_response_path"] = file_manager.save_final_response(final_response)
+        missing_artifacts = [key for key in REQUIRED_ARTIFACT_KEYS if not state.get(key)]
+        if tool_errors:
+            entry["tool_errors"] = tool_errors
+        if missing_artifacts:
+            entry["missing_artifacts"] = missing_artifacts
+        if not final_response:
+            entry["status"] = "incomplete"
+        elif tool_errors or missing_artifacts:
+            entry["status"] = "partial"
+        else:
+            entry["status"] = "ok"
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = str(e)
+
+    entry["duration_seconds"] = round(time.monotonic() - started_at, 2)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate proposal packages for many job descriptions.")
+    parser.add_argument("source", help="A folder of .txt job descriptions or a JSONL file.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of jobs processed at the same time.")
+    parser.add_argument("--openai-rpm", type=float, default=None, help="Max OpenAI requests per minute.")
+    parser.add_argument("--google-rpm", type=float, default=None, help="Max Gemini requests per minute.")
+    parser.add_argument("--openai-tpm", type=float, default=None, help="Max OpenAI tokens per minute.")
+    parser.add_argument("--google-tpm", type=float, default=None, help="Max Gemini tokens per minute.")
+    parser.add_argument("--drive-rpm", type=float, default=None, help="Max Google Drive requests per minute.")
+    parser.add_argument("--output", default="generated_content", help="Base folder for generated content.")
+    args = parser.parse_args()
+
+    if not os.environ.get("OPENAI_API_KEY"):
+        print("Please set the OPENAI_API_KEY environment variable.")
+        return
+
+    jobs = load_jobs(args.source)
+    if not jobs:
+        print(f"No job descriptions found in {args.source}.")
+        return
+
+    configure_rate_limits(
+        {"openai": args.openai_rpm, "google": args.google_rpm, "drive": args.drive_rpm},
+        {"openai": args.openai_tpm, "google": args.google_tpm},
+    )
+    workflow = ProposalWorkflow()
+
+    print(f"Processing {len(jobs)} jobs with {args.workers} workers...")
+    started_at = time.monotonic()
+    entries = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(run_job, workflow, job, args.output): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            entries[i] = future.result()
+            print(f"[{entries[i]['status']}] {entries[i]['id']} -> {entries[i]['job_folder_path']}")
+
+    manifest = {
+        "source": args.source,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "workers": args.workers,
+        "duration_seconds": round(time.monotonic() - started_at, 2),
+        "succeeded": sum(1 for e in entries if e["status"] == "ok"),
+        "partial": sum(1 for e in entries if e["status"] == "partial"),
+        "failed": sum(1 for e in entries if e["status"] not in ("ok", "partial")),
+        "jobs": entries,
+    }
+    manifest_path = os.path.join(args.output, f"batch_manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    atomic_write(manifest_path, json.dumps(manifest, indent=2))
+
+    print("-" * 50)
+    print(f"{manifest['succeeded']} succeeded, {manifest['partial']} partial, {manifest['failed']} failed in {manifest['duration_seconds']}s.")
+    print(f"Manifest saved to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Markdown to DOCX conversion benchmark.
+
+Converts the example proposals from `prompts.py` (optionally repeated to make
+larger documents) with the built-in converter (`utils/markdown_docx.py`) and with
+pandoc, the way `generate_google_doc_proposal` calls it (Markdown file in, .docx
+file out), and reports per-conversion latency for each:
+
+    python -m benchmarks.docx_conversion
+    python -m benchmarks.docx_conversion --rounds 50 --repeat 4 --json
+
+pandoc is skipped if pypandoc or the pandoc binary is not installed.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import prompts
+from benchmarks.run_benchmark import percentile
+from tools.google_doc import PANDOC_ARGS
+from utils.markdown_docx import markdown_to_docx
+
+
+def sample_proposals(repeat: int = 1) -> List[str]:
+    """The example proposals embedded in the Mermaid prompt, each repeated `repeat` times."""
+    proposals = []
+    for part in prompts.MERMAID_DIAGRAM_SYSTEM_PROMPT.split("Proposal ")[1:]:
+        if "```" not in part:
+            continue
+        proposal = part.split("```", 2)[1].strip()
+        proposals.append("\n\n".join([proposal] * repeat))
+    return proposals
+
+
+def time_converter(convert: Callable[[str, str], None], documents: List[str], rounds: int, work_dir: str) -> Dict[str, float]:
+    """Runs `convert(markdown, docx_path)` `rounds` times per document and summarizes the latencies."""
+    latencies = []
+    sizes = []
+    for round_index in range(rounds):
+        for i, markdown in enumerate(documents):
+            docx_path = os.path.join(work_dir, f"proposal_{round_index}_{i}.docx")
+            started_at = time.perf_counter()
+            convert(markdown, docx_path)
+            latencies.append(time.perf_counter() - started_at)
+            sizes.append(os.path.getsize(docx_path))
+    return {
+        "conversions": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_docx_bytes": statistics.mean(sizes),
+    }
+
+
+def convert_builtin(markdown: str, docx_path: str):
+    with open(docx_path, "wb") as f:
+        f.write(markdown_to_docx(markdown))
+
+
+def convert_pandoc(markdown: str, docx_path: str):
+    import pypandoc
+
+    md_path = docx_path[:-len(".docx")] + ".md"
+    with open(md_path, "w") as f:
+        f.write(markdown)
+    pypandoc.convert_file(md_path, "docx", outputfile=docx_path, extra_args=PANDOC_ARGS)
+
+
+def pandoc_available() -> bool:
+    try:
+        import pypandoc
+
+        pypandoc.get_pandoc_version()
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the built-in Markdown to DOCX converter with pandoc.")
+    parser.add_argument("--rounds", type=int, default=20, help="Conversions of each sample proposal per converter.")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat each proposal this many times to make larger documents.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    documents = sample_proposals(args.repeat)
+    converters = {"builtin": convert_builtin}
+    if pandoc_available():
+        converters["pandoc"] = convert_pandoc
+
+    report = {"documents": len(documents), "mean_markdown_chars": statistics.mean(len(d) for d in documents)}
+    work_dir = tempfile.mkdtemp(prefix="docx-bench-")
+    try:
+        for name, convert in converters.items():
+            convert(documents[0], os.path.join(work_dir, f"warmup_{name}.docx"))
+            report[name] = time_converter(convert, documents, args.rounds, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['documents']} proposals, {report['mean_markdown_chars']:.0f} Markdown chars on average")
+    print(f"{'converter':<12}{'runs':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'docx bytes':>12}")
+    for name in converters:
+        row = report[name]
+        print(
+            f"{name:<12}{row['conversions']:>6}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}"
+            f"{row['p95_ms']:>10.2f}{row['mean_docx_bytes']:>12.0f}"
+        )
+    if "pandoc" not in converters:
+        print("pandoc: skipped (pypandoc or the pandoc binary is not installed)")
+    elif report["builtin"]["mean_ms"] > 0:
+        print(f"Speed-up: {report['pandoc']['mean_ms'] / report['builtin']['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Deterministic local stand-ins for the LLM providers, the `mmdc` binary and pandoc.
+
+Together with `utils/fake_drive_server.py` they let the whole workflow run on a plain
+Linux box with no network access and no API keys.
+"""
+import hashlib
+import json
+import os
+import random
+import stat
+import sys
+import textwrap
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+WORDS = (
+    "agent workflow pipeline automation data model retrieval integration dashboard "
+    "evaluation deployment prompt schema api webhook scheduler report insight client"
+).split()
+
+# Structured output fields whose value must stay valid (an edit appending a Mermaid edge).
+FIELD_VALUES = {"old": "", "new": "    S1 --> S6"}
+
+# A 1x1 transparent PNG, written by the fake `mmdc`.
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+
+
+def _filler(seed: str, chars: int) -> str:
+    """Deterministic pseudo-prose of roughly `chars` characters."""
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that answers like the agent's real models, with configurable latency.
+
+    - Bound to several tools (the orchestrator), it calls every tool for a new user
+      message and otherwise writes a final answer.
+    - Bound to a single forced tool (structured output), it fills every field of the schema.
+    - Otherwise it returns a Mermaid diagram or a Markdown proposal, depending on the
+      system prompt.
+
+    Args:
+        time_to_first_token (float): Seconds before the first chunk.
+        tokens_per_second (float): Output speed once streaming started.
+        output_chars (int): Approximate size of generated text.
+    """
+
+    time_to_first_token: float = 0.2
+    tokens_per_second: float = 400.0
+    output_chars: int = 2000
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs):
+        functions = [convert_to_openai_tool(t)["function"] for t in tools]
+        tool_names = [function["name"] for function in functions]
+        tool_schemas = {function["name"]: function.get("parameters", {}) for function in functions}
+        return self.bind(tool_names=tool_names, tool_choice=tool_choice, tool_schemas=tool_schemas, **kwargs)
+
+    def _seed(self, messages: List[BaseMessage]) -> str:
+        return hashlib.sha256("\n".join(str(m.content) for m in messages).encode("utf-8")).hexdigest()
+
+    def _fill(self, schema: Dict[str, Any], definitions: Dict[str, Any], seed: str, name: str = "") -> Any:
+        """Builds a value matching a JSON schema: one item per array, filler text per string."""
+        if "$ref" in schema:
+            schema = definitions[schema["$ref"].rsplit("/", 1)[-1]]
+        kind = schema.get("type")
+        if kind == "object" or "properties" in schema:
+            return {key: self._fill(value, definitions, seed, key) for key, value in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._fill(schema.get("items", {}), definitions, seed, name)]
+        if kind in ("integer", "number"):
+            return 0
+        if kind == "boolean":
+            return True
+        if name in FIELD_VALUES:
+            return FIELD_VALUES[name]
+        if name == "proposal":
+            return f"Hi, I do this all the time: $$$\n\n{_filler(seed, self.output_chars)}"
+        return _filler(seed + name, self.output_chars)
+
+    def _respond(self, messages: List[BaseMessage], tool_names=None, tool_choice=None, tool_schemas=None) -> AIMessage:
+        seed = self._seed(messages)
+        if tool_choice:
+            schema = (tool_schemas or {}).get(tool_choice) or {"properties": {"proposal": {"type": "string"}}}
+            args = self._fill(schema, schema.get("$defs") or schema.get("definitions") or {}, seed)
+            return AIMessage(content="", tool_calls=[{"name": tool_choice, "args": args, "id": f"call_{seed[:24]}"}])
+
+        if tool_names:
+            last_message = messages[-1]
+            if isinstance(last_message, HumanMessage):
+                tool_calls = [
+                    {
+                        "name": name,
+                        "args": {} if name == "generate_mermaid_diagram" else {"job_description": str(last_message.content)},
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                    }
+                    for name in tool_names
+                ]
+                return AIMessage(content="", tool_calls=tool_calls)
+            return AIMessage(content=f"Here is your proposal package.\n\n{_filler(seed, self.output_chars // 4)}")
+
+        system_prompt = next((str(m.content) for m in messages if isinstance(m, SystemMessage)), "")
+        if "`graph TD`" in system_prompt:
+            return AIMessage(content=self._mermaid(seed))
+        return AIMessage(content=self._markdown(seed))
+
+    def _mermaid(self, seed: str) -> str:
+        rng = random.Random(seed)
+        steps = [f'    S{i}["Step {i}: {rng.choice(WORDS).title()}"]' for i in range(1, 7)]
+        edges = [f"    S{i} --> S{i + 1}" for i in range(1, 6)]
+        return "graph TD\n" + "\n".join(steps + edges)
+
+    def _markdown(self, seed: str) -> str:
+        body = textwrap.fill(_filler(seed, self.output_chars), 100)
+        return (
+            "# Proposed System\n\n"
+            "Hello! Here's how I'd build it:\n\n"
+            "[MERMAID_DIAGRAM_PLACEHOLDER]\n\n"
+            "- **Step 1:** Collect the data.\n\n"
+            "- **Step 2:** Build the agent.\n\n"
+            "- **Step 3:** Deploy it.\n\n"
+            "So basically, **data → agent → deployment**.\n\n"
+            f"## Details\n\n{body}\n\n"
+            "**Thank you for your time!**"
+        )
+
+    def _chunks(self, message: AIMessage, input_tokens: int) -> Iterator[AIMessageChunk]:
+        time.sleep(self.time_to_first_token)
+        if message.tool_calls:
+            for index, tool_call in enumerate(message.tool_calls):
+                arguments = json.dumps(tool_call["args"])
+                for start in range(0, len(arguments), 64):
+                    time.sleep(16 / self.tokens_per_second)
+                    yield AIMessageChunk(
+                        content="",
+                        tool_call_chunks=[{
+                            "name": tool_call["name"] if start == 0 else None,
+                            "args": arguments[start:start + 64],
+                            "id": tool_call["id"] if start == 0 else None,
+                            "index": index,
+                        }],
+                    )
+        else:
+            text = str(message.content)
+            for start in range(0, len(text), 64):
+                time.sleep(16 / self.tokens_per_second)
+                yield AIMessageChunk(content=text[start:start + 64])
+
+        output_tokens = len(json.dumps(message.tool_calls) if message.tool_calls else str(message.content)) // 4
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, tool_names=None, tool_choice=None, tool_schemas=None, **kwargs):
+        message = self._respond(messages, tool_names, tool_choice, tool_schemas)
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        for chunk in self._chunks(message, input_tokens):
+            if run_manager and isinstance(chunk.content, str) and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    def _generate(self, messages, stop=None, run_manager=None, tool_names=None, tool_choice=None, tool_schemas=None, **kwargs):
+        response = None
+        for generation_chunk in self._stream(messages, stop, run_manager, tool_names, tool_choice, tool_schemas):
+            response = generation_chunk.message if response is None else response + generation_chunk.message
+        message = AIMessage(
+            content=response.content,
+            tool_calls=response.tool_calls,
+            usage_metadata=response.usage_metadata,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def install_fake_binaries(bin_dir: str, mmdc_latency: float = 0.5, pandoc_latency: float = 0.2) -> str:
+    """
+    Writes fake `mmdc` and `pandoc` executables into `bin_dir` and prepends it to PATH.
+
+    The fake `mmdc` writes a tiny PNG to its `-o` path; the fake `pandoc` answers
+    `--version` (as pypandoc expects) and copies its input to `-o`/`--output`.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    scripts = {
+        "mmdc": f"""
+import sys, time
+time.sleep({mmdc_latency})
+args = sys.argv[1:]
+with open(args[args.index("-o") + 1], "wb") as f:
+    f.write(bytes.fromhex("{TINY_PNG.hex()}"))
+""",
+        "pandoc": f"""
+import shutil, sys, time
+args = sys.argv[1:]
+if "--version" in args:
+    print("pandoc 3.1.11")
+    sys.exit(0)
+time.sleep({pandoc_latency})
+output = next((a.split("=", 1)[1] for a in args if a.startswith("--output=")), None)
+if output is None and "-o" in args:
+    output = args[args.index("-o") + 1]
+inputs = [a for a in args if not a.startswith("-") and a != output and a.endswith(".md")]
+if inputs:
+    shutil.copyfile(inputs[-1], output)
+""",
+    }
+    for name, body in scripts.items():
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\n{body.lstrip()}")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["PYPANDOC_PANDOC"] = os.path.join(bin_dir, "pandoc")
+    return bin_dir
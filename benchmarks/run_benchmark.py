@@ -0,0 +1,200 @@
+"""
+Offline end-to-end benchmark.
+
+Runs the full workflow over a synthetic corpus of job descriptions with fake LLMs
+(`benchmarks/fakes.py`), the fake Drive API (`utils/fake_drive_server.py`) and fake
+`mmdc`/`pandoc` binaries, so it needs no API keys or network access:
+
+    python -m benchmarks.run_benchmark --jobs 20 --workers 4
+    python -m benchmarks.run_benchmark --jobs 50 --workers 8 --ttft 0.5 --tps 200 --json
+
+Reports throughput, p50/p95 latency per stage, peak RSS and the checkpoint DB size.
+Everything is written to a temporary working directory that is removed afterwards.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JOB_TEMPLATES = [
+    "Looking for an AI engineer to build a {thing} for our {team} team. It should integrate with {tool} and send a weekly report.",
+    "We need a {thing} that reads data from {tool}, summarizes it and answers questions from the {team} team.",
+    "Hi, I'm {name}. I want a {thing} that automates our {team} workflow end to end, using {tool}.",
+]
+THINGS = ["RAG chatbot", "lead enrichment agent", "document extraction pipeline", "LangGraph multi-agent system", "CV screening tool"]
+TEAMS = ["sales", "support", "legal", "recruiting", "finance"]
+TOOLS = ["HubSpot", "Google Sheets", "Slack", "Notion", "Salesforce"]
+NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan"]
+
+
+def synthetic_jobs(count: int, seed: int = 0) -> List[dict]:
+    """Returns `count` deterministic job descriptions."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        description = rng.choice(JOB_TEMPLATES).format(
+            thing=rng.choice(THINGS), team=rng.choice(TEAMS), tool=rng.choice(TOOLS), name=rng.choice(NAMES)
+        )
+        jobs.append({"id": f"job-{i:04d}", "job_description": f"{description}\n\nJob #{i}", "source": "synthetic"})
+    return jobs
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stage_latencies(events: List[dict]) -> Dict[str, dict]:
+    """Groups metrics events by stage and returns count, p50 and p95 wall seconds."""
+    by_stage = {}
+    for event in events:
+        by_stage.setdefault(f"{event['kind']}:{event['name']}", []).append(event.get("wall_seconds", 0.0))
+    return {
+        stage: {
+            "count": len(values),
+            "p50_seconds": round(percentile(values, 0.50), 4),
+            "p95_seconds": round(percentile(values, 0.95), 4),
+        }
+        for stage, values in sorted(by_stage.items())
+    }
+
+
+def run(args) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="proposal-bench-")
+    previous_dir = os.getcwd()
+    try:
+        # Configure everything through the environment before the workflow modules are imported.
+        os.environ.update({
+            "LLM_CACHE": "off",
+            "MERMAID_RENDER_SERVICE": "0",
+            "CHECKPOINT_DB": os.path.join(work_dir, "checkpoints.sqlite"),
+            "METRICS_EVENTS_PATH": "",
+            "DOCX_CONVERTER": args.docx_converter,
+            # The synthetic jobs are alike, so by default every job takes the fresh-job path.
+            "SIMILAR_JOBS": "1" if args.similar_jobs else "0",
+            "OPENAI_API_KEY": "benchmark",
+            "GOOGLE_API_KEY": "benchmark",
+        })
+        from benchmarks.fakes import FakeChatModel, install_fake_binaries
+        from utils.fake_drive_server import FakeDriveServer
+
+        install_fake_binaries(os.path.join(work_dir, "bin"), mmdc_latency=args.mmdc_latency, pandoc_latency=args.pandoc_latency)
+        drive = FakeDriveServer(latency=args.drive_latency).start()
+        os.environ["GOOGLE_DRIVE_API_ENDPOINT"] = drive.url
+
+        # Tools write artifacts relative to the working directory.
+        os.chdir(work_dir)
+        sys.path.insert(0, PROJECT_ROOT)
+
+        from batch import run_job
+        from graph import ProposalWorkflow
+        from utils.llm_clients import set_client_factory
+        from utils.metrics import metrics
+
+        set_client_factory(lambda provider, model, temperature: FakeChatModel(
+            time_to_first_token=args.ttft,
+            tokens_per_second=args.tps,
+            output_chars=args.output_chars,
+            model_name=model,
+        ))
+        workflow = ProposalWorkflow(max_concurrency=args.tool_concurrency)
+
+        jobs = synthetic_jobs(args.jobs, seed=args.seed)
+        output_dir = os.path.join(work_dir, "generated_content")
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            entries = list(pool.map(lambda job: run_job(workflow, job, output_dir), jobs))
+        duration = time.perf_counter() - started_at
+
+        drive.stop()
+        checkpoint_path = os.environ["CHECKPOINT_DB"]
+        checkpoint_bytes = sum(
+            os.path.getsize(checkpoint_path + suffix)
+            for suffix in ("", "-wal", "-shm")
+            if os.path.exists(checkpoint_path + suffix)
+        )
+        job_seconds = [entry["duration_seconds"] for entry in entries]
+        return {
+            "jobs": args.jobs,
+            "workers": args.workers,
+            "succeeded": sum(1 for entry in entries if entry["status"] == "ok"),
+            "errors": [
+                entry.get("error") or entry.get("tool_errors") or f"{entry['status']}: missing {entry.get('missing_artifacts')}"
+                for entry in entries if entry["status"] != "ok"
+            ][:5],
+            "duration_seconds": round(duration, 2),
+            "throughput_jobs_per_minute": round(args.jobs / duration * 60, 2) if duration else 0.0,
+            "job_p50_seconds": round(percentile(job_seconds, 0.50), 2),
+            "job_p95_seconds": round(percentile(job_seconds, 0.95), 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "checkpoint_db_bytes": checkpoint_bytes,
+            "drive_requests": drive.request_count,
+            "stages": stage_latencies(metrics.events()),
+        }
+    finally:
+        os.chdir(previous_dir)
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"Kept benchmark files in {work_dir}", file=sys.stderr)
+
+
+def print_report(report: dict):
+    print(f"{report['succeeded']}/{report['jobs']} jobs succeeded with {report['workers']} workers in {report['duration_seconds']}s")
+    print(f"Throughput: {report['throughput_jobs_per_minute']} jobs/min")
+    print(f"Job latency: p50 {report['job_p50_seconds']}s, p95 {report['job_p95_seconds']}s")
+    print(f"Peak RSS: {report['peak_rss_mb']} MB, checkpoint DB: {report['checkpoint_db_bytes'] / 1024:.1f} KB, Drive requests: {report['drive_requests']}")
+    for error in report["errors"]:
+        print(f"Error: {error}")
+    print("-" * 70)
+    print(f"{'stage':<46}{'count':>8}{'p50 s':>8}{'p95 s':>8}")
+    for stage, row in report["stages"].items():
+        print(f"{stage:<46}{row['count']:>8}{row['p50_seconds']:>8.3f}{row['p95_seconds']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the proposal workflow offline against fake LLMs, Drive and mmdc.")
+    parser.add_argument("--jobs", type=int, default=20, help="Number of synthetic job descriptions.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of jobs processed at the same time.")
+    parser.add_argument("--tool-concurrency", type=int, default=3, help="Max tools run at the same time per job.")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Fake LLM time to first token, in seconds.")
+    parser.add_argument("--tps", type=float, default=400.0, help="Fake LLM output tokens per second.")
+    parser.add_argument("--output-chars", type=int, default=2000, help="Approximate size of each fake LLM answer.")
+    parser.add_argument("--mmdc-latency", type=float, default=0.5, help="Seconds the fake mmdc takes per render.")
+    parser.add_argument("--pandoc-latency", type=float, default=0.2, help="Seconds the fake pandoc takes per conversion.")
+    parser.add_argument("--docx-converter", choices=["builtin", "pandoc"], default="builtin", help="Markdown to DOCX converter to use.")
+    parser.add_argument("--similar-jobs", action="store_true", help="Let jobs adapt the artifacts of similar earlier jobs.")
+    parser.add_argument("--drive-latency", type=float, default=0.1, help="Seconds the fake Drive API adds per request.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Startup-time budget check.
+
+Imports a module in a fresh interpreter with `python -X importtime`, reports the
+total and the slowest imports, and fails if the total is over budget or if one of
+the heavy SDKs that should only load on demand was imported:
+
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --module main --budget-ms 1500 --top 15
+
+Exits with status 1 when the budget is exceeded, so it can run in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded just by importing the workflow.
+LAZY_MODULES = [
+    "googleapiclient.discovery",
+    "google_auth_oauthlib",
+    "pypandoc",
+    "langchain_google_genai",
+    "langchain_openai",
+]
+
+
+def measure_imports(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Imports `module` in a subprocess and returns `{name: (self_us, cumulative_us)}`
+    for every module it loaded, as reported by `-X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"`import {module}` failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def check_budget(module: str, budget_ms: float, top: int) -> List[str]:
+    """Prints the import report for `module` and returns the list of problems found."""
+    timings = measure_imports(module)
+    total_ms = timings[module][1] / 1000 if module in timings else sum(t[0] for t in timings.values()) / 1000
+
+    print(f"`import {module}`: {total_ms:.0f} ms across {len(timings)} modules (budget {budget_ms:.0f} ms)")
+    print(f"{'module':<60}{'self ms':>10}{'cumul. ms':>12}")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"{name:<60}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}")
+
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"`import {module}` took {total_ms:.0f} ms, over the {budget_ms:.0f} ms budget")
+    for lazy_module in LAZY_MODULES:
+        if lazy_module in timings:
+            problems.append(f"`import {module}` eagerly imports `{lazy_module}`")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the workflow against a budget.")
+    parser.add_argument("--module", default="graph", help="Module to import.")
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="Maximum cumulative import time.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list.")
+    args = parser.parse_args()
+
+    problems = check_budget(args.module, args.budget_ms, args.top)
+    print("-" * 82)
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,30 @@
+import contextvars
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from typing import List, Optional, Annotated, TypedDict
 
-from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
 
 import prompts
 from tools.cover_letter import generate_cover_letter
 from tools.google_doc import generate_google_doc_proposal
 from tools.mermaid import generate_mermaid_diagram
+from utils import rate_limit
+from utils.checkpointer import create_checkpointer
+from utils.context_budget import build_context, estimate_tokens
+from utils.llm_clients import EXPECTED_OUTPUT_TOKENS, get_chat_model
+from utils.metrics import metrics
+from utils.similar_jobs import find_similar_job
+from utils.upload_queue import get_upload_queue
+
+# How long the orchestrator waits for a pending Google Drive upload (`GOOGLE_UPLOAD_TIMEOUT`).
+UPLOAD_WAIT_TIMEOUT_SECONDS = 120.0
 
 
 class WorkflowState(TypedDict):
@@ -21,6 +36,8 @@ class WorkflowState(TypedDict):
     cover_letter_path: Optional[str]
     
     google_doc_url: Optional[str]
+    google_doc_id: Optional[str]
+    google_doc_upload_id: Optional[str]
     google_doc_markdown: Optional[str]
     google_doc_md_path: Optional[str]
     google_doc_docx_path: Optional[str]
@@ -28,29 +45,149 @@ class WorkflowState(TypedDict):
     mermaid_code: Optional[str]
     mermaid_code_path: Optional[str]
     mermaid_image_path: Optional[str]
+
+    # A similar past job whose artifacts the tools adapt instead of starting from scratch
+    similar_job: Optional[dict]
     # Future fields
     # mermaid_diagram: Optional[str]
     # google_doc: Optional[str]
 
 
+logger = logging.getLogger(__name__)
+
+# Tools that consume an artifact produced by another tool. When both are called
+# in the same turn, the dependent call waits for its dependencies to finish.
+TOOL_DEPENDENCIES = {
+    "generate_mermaid_diagram": {"generate_google_doc_proposal"},
+}
+
+
+def _cover_letter_updates(result: dict):
+    state_updates = {
+        "proposal": result["proposal_text"],
+        "cover_letter_path": result["file_path"],
+    }
+    return state_updates, str(result["proposal_text"])
+
+
+def _google_doc_updates(result: dict):
+    state_updates = {
+        "google_doc_url": None,
+        "google_doc_upload_id": result["upload_id"],
+        "google_doc_markdown": result["markdown_content"],
+        "google_doc_md_path": result["md_path"],
+        "google_doc_docx_path": result["docx_path"],
+    }
+    if "baseline_job_id" in result:
+        sections = ", ".join(str(i) for i in result["edited_sections"]) or "none"
+        return state_updates, f"Google Doc content adapted from the proposal of the similar job {result['baseline_job_id']} (rewritten sections: {sections}); it is being uploaded to Google Drive and its URL will be provided once the upload finishes."
+    if "edited_sections" in result:
+        sections = ", ".join(str(i) for i in result["edited_sections"]) or "none"
+        return state_updates, f"Google Doc content edited (rewritten sections: {sections}); the Google Doc is being updated in place and its URL will be provided once the update finishes."
+    return state_updates, "Google Doc content generated; it is being uploaded to Google Drive and its URL will be provided once the upload finishes."
+
+
+def _mermaid_updates(result: dict):
+    state_updates = {
+        "mermaid_code": result["mermaid_code"],
+        "mermaid_code_path": result["mermaid_code_path"],
+        "mermaid_image_path": result["image_path"],
+    }
+    return state_updates, f"Diagram saved to {result['image_path']}"
+
+
+# Maps each tool to a function turning its result into (state_updates, tool message content).
+TOOL_RESULT_HANDLERS = {
+    "generate_cover_letter": _cover_letter_updates,
+    "generate_google_doc_proposal": _google_doc_updates,
+    "generate_mermaid_diagram": _mermaid_updates,
+}
+
+
+def _timed_node(name: str, node):
+    """Wraps a graph node so its wall time is recorded in the metrics."""
+    def timed(state: WorkflowState):
+        with metrics.stage("node", name):
+            return node(state)
+
+    return timed
+
+
+# Fast-path graph nodes, each running exactly one tool for a fresh job.
+FAST_PATH_NODES = {
+    "cover_letter": "generate_cover_letter",
+    "google_doc": "generate_google_doc_proposal",
+    "mermaid": "generate_mermaid_diagram",
+}
+
+
 class ProposalWorkflow:
-    def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    def __init__(self, max_concurrency: int = 3, fast_path: bool = True, checkpointer=None, checkpoint_retention: int = 5, context_token_budget: int = 12000):
+        """
+        Args:
+            max_concurrency (int): Maximum number of tool calls executed at the same time
+                when the orchestrator requests several tools in one turn.
+            fast_path (bool): If True, a fresh job description skips LLM-driven routing and
+                runs the tools as a fixed dependency graph (cover letter and Google Doc in
+                parallel, then the diagram), calling the orchestrator once at the end.
+            checkpointer: The LangGraph checkpointer. Defaults to `create_checkpointer()`,
+                a SQLite database that keeps threads resumable across restarts.
+            checkpoint_retention (int): Checkpoints kept per thread after each run. Older,
+                intermediate checkpoints are pruned if the checkpointer supports it.
+            context_token_budget (int): Approximate prompt size for each orchestrator hop.
+                Large tool outputs from earlier turns are replaced by references to the
+                state, and the oldest turns are dropped past this budget.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.fast_path = fast_path
+        self.checkpointer = checkpointer if checkpointer is not None else create_checkpointer()
+        self.checkpoint_retention = checkpoint_retention
+        self.context_token_budget = context_token_budget
         self.tools = [
             generate_cover_letter,
             generate_google_doc_proposal,
             generate_mermaid_diagram,
         ]
-        self.model_with_tools = self.llm.bind_tools(self.tools)
+        self.tools_by_name = {t.name: t for t in self.tools}
         self.graph = self._build_graph()
 
+    # The orchestrator model is built on first use, so creating the workflow (e.g. to
+    # resume a thread or answer `exit`) doesn't load the provider SDK.
+    @cached_property
+    def llm(self):
+        return get_chat_model("openai", "gpt-4o", temperature=0)
+
+    @cached_property
+    def model_with_tools(self):
+        return self.llm.bind_tools(self.tools)
+
     def _build_graph(self):
         workflow = StateGraph(WorkflowState)
 
-        workflow.add_node("orchestrator", self.orchestrator_node)
-        workflow.add_node("tool_executor", self.tool_executor_node)
+        workflow.add_node("orchestrator", _timed_node("orchestrator", self.orchestrator_node))
+        workflow.add_node("tool_executor", _timed_node("tool_executor", self.tool_executor_node))
+
+        if self.fast_path:
+            workflow.add_node("plan", _timed_node("plan", self.plan_node))
+            for node_name, tool_name in FAST_PATH_NODES.items():
+                workflow.add_node(node_name, _timed_node(node_name, self._make_fast_path_node(tool_name)))
+
+            workflow.add_conditional_edges(
+                START,
+                self.route_start,
+                {"fast_path": "plan", "orchestrator": "orchestrator"},
+            )
+            workflow.add_edge("plan", "cover_letter")
+            workflow.add_edge("plan", "google_doc")
+            workflow.add_conditional_edges(
+                "google_doc",
+                self.route_after_google_doc,
+                {"mermaid": "mermaid", "orchestrator": "orchestrator"},
+            )
+            workflow.add_edge(["cover_letter", "mermaid"], "orchestrator")
+        else:
+            workflow.add_edge(START, "orchestrator")
 
-        workflow.add_edge(START, "orchestrator")
         workflow.add_conditional_edges(
             "orchestrator",
             self.should_continue,
@@ -58,70 +195,242 @@ class ProposalWorkflow:
         )
         workflow.add_edge("tool_executor", "orchestrator")
 
-        memory = MemorySaver()
-        return workflow.compile(checkpointer=memory)
+        return workflow.compile(checkpointer=self.checkpointer)
+
+    def route_start(self, state: WorkflowState):
+        """
+        Sends fresh jobs down the fast path and everything else to the orchestrator.
+
+        A thread is fresh only while its sole message is the job description. Any earlier
+        turn (including a fast-path plan whose tools failed and left no artifacts) means
+        the user is following up, and that must not re-run the whole job.
+        """
+        return "fast_path" if len(state["messages"]) == 1 else "orchestrator"
+
+    def route_after_google_doc(self, state: WorkflowState):
+        """Skips the diagram when the Google Doc step produced no Markdown to draw it from."""
+        return "mermaid" if state.get("google_doc_markdown") else "orchestrator"
+
+    def plan_node(self, state: WorkflowState):
+        """
+        Emits the tool calls for a fresh job without asking the orchestrator LLM.
+
+        The calls are recorded as a regular `AIMessage` so that the orchestrator sees
+        the same history it would have produced itself when it composes the answer.
+        If a past job is nearly the same posting, its artifacts are put in the state as
+        `similar_job`, and the tools start from them instead of from scratch: the cover
+        letter is rewritten from the old one, while the proposal and diagram are edited.
+        """
+        job_description = state["messages"][-1].content
+        similar_job = find_similar_job(state["job_folder_path"], job_description) if state.get("job_folder_path") else None
+        if similar_job:
+            logger.info("Job is similar to %s (similarity %.2f); adapting its artifacts", similar_job["job_id"], similar_job["similarity"])
+        tool_calls = [
+            {
+                "name": tool_name,
+                "args": {} if tool_name == "generate_mermaid_diagram" else {"job_description": job_description},
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+            }
+            for tool_name in FAST_PATH_NODES.values()
+        ]
+        return {"messages": [AIMessage(content="", tool_calls=tool_calls)], "similar_job": similar_job}
+
+    def _make_fast_path_node(self, tool_name: str):
+        def node(state: WorkflowState):
+            plan_message = next(
+                m for m in reversed(state["messages"]) if isinstance(m, AIMessage) and m.tool_calls
+            )
+            tool_call = next(tc for tc in plan_message.tool_calls if tc["name"] == tool_name)
+            tool_message, state_updates = self._execute_tool_call(state, tool_call)
+            messages = [tool_message]
+            if not state_updates:
+                # Planned calls that needed this tool's artifact are skipped, but still answered.
+                messages += [
+                    ToolMessage(
+                        content=f"Skipped: `{tc['name']}` needs the output of `{tool_name}`, which failed.",
+                        tool_call_id=tc["id"],
+                        status="error",
+                    )
+                    for tc in plan_message.tool_calls
+                    if tool_name in TOOL_DEPENDENCIES.get(tc["name"], set())
+                ]
+            return {**state_updates, "messages": messages}
+
+        return node
 
     def orchestrator_node(self, state: WorkflowState):
-        messages = state["messages"]
-        
-        # Add the system prompt only if it's the first message
-        if not messages or not isinstance(messages[0], SystemMessage):
-            messages = [SystemMessage(content=prompts.ORCHESTRATOR_SYSTEM_PROMPT)] + messages
+        state_updates, new_messages = {}, []
+        if state.get("google_doc_upload_id"):
+            upload_message, state_updates = self._resolve_upload(state["google_doc_upload_id"])
+            new_messages.append(upload_message)
+
+        # The system prompt is never stored in the state; it is always the first message.
+        history = [m for m in state["messages"] if not (isinstance(m, SystemMessage) and m.content == prompts.ORCHESTRATOR_SYSTEM_PROMPT)]
+        messages = build_context(
+            prompts.ORCHESTRATOR_SYSTEM_PROMPT,
+            history + new_messages,
+            {**state, **state_updates},
+            max_tokens=self.context_token_budget,
+            count_tokens=self._count_tokens,
+        )
+
+        with metrics.stage("llm", "orchestrator", model="gpt-4o", provider="openai") as record:
+            estimated_tokens = estimate_tokens(messages) + EXPECTED_OUTPUT_TOKENS
+            response, record["queue_seconds"] = rate_limit.run(
+                "openai", lambda: self.model_with_tools.invoke(messages), tokens=estimated_tokens
+            )
+            usage = getattr(response, "usage_metadata", None) or {}
+            rate_limit.observe_response(
+                "openai", response.response_metadata.get("headers"), estimated_tokens, usage.get("total_tokens")
+            )
+            record["input_tokens"] = usage.get("input_tokens")
+            record["output_tokens"] = usage.get("output_tokens")
+        logger.info(
+            "orchestrator hop: %d history messages -> %d sent, ~%d prompt tokens; usage: input=%s output=%s cached=%s",
+            len(history) + len(new_messages),
+            len(messages),
+            self._count_tokens(messages),
+            usage.get("input_tokens"),
+            usage.get("output_tokens"),
+            (usage.get("input_token_details") or {}).get("cache_read"),
+        )
+
+        new_messages.append(response)
+        return {**state_updates, "messages": new_messages}
+
+    def _count_tokens(self, messages: List[BaseMessage]) -> int:
+        try:
+            return self.llm.get_num_tokens_from_messages(messages)
+        except Exception:
+            return estimate_tokens(messages)
 
-        response = self.model_with_tools.invoke(messages)
-        return {"messages": [response]}
+    @staticmethod
+    def _resolve_upload(upload_id: str):
+        """Waits for a pending Google Drive upload and reports the outcome to the orchestrator."""
+        upload_queue = get_upload_queue()
+        handle = upload_queue.get(upload_id)
+        if handle is None:
+            return SystemMessage(content="The Google Doc upload was lost (the process restarted). Generate the Google Doc again if the user needs the link."), {"google_doc_upload_id": None}
+
+        timeout = float(os.environ.get("GOOGLE_UPLOAD_TIMEOUT", UPLOAD_WAIT_TIMEOUT_SECONDS))
+        doc_url = handle.wait(timeout)
+        if not handle.done():
+            # The upload keeps going in the background; the queue forgets it once it finishes.
+            logger.warning("Google Doc upload %s did not finish within %.0fs", upload_id, timeout)
+            note = (
+                f"The Google Doc upload did not finish within {timeout:.0f} seconds, so there is no link yet. "
+                f"The proposal is saved locally at {handle.docx_path}"
+            )
+            return SystemMessage(content=note), {"google_doc_url": None, "google_doc_upload_id": None}
+
+        upload_queue.release(upload_id)
+        if doc_url:
+            action = "updated" if handle.file_id else "created"
+            note = f"The Google Doc upload has finished. Google Doc {action} at {doc_url}"
+        else:
+            note = f"The Google Doc upload failed: {handle.error}. The proposal is saved locally at {handle.docx_path}"
+        # A document whose sharing failed is not reused for later edits.
+        doc_id = handle.doc_id if doc_url else handle.file_id
+        return SystemMessage(content=note), {"google_doc_url": doc_url, "google_doc_id": doc_id, "google_doc_upload_id": None}
 
     def should_continue(self, state: WorkflowState):
         if not state["messages"][-1].tool_calls:
             return "end"
         return "continue"
 
+    def _execute_tool_call(self, state: WorkflowState, tool_call: dict, submitted_at: Optional[float] = None):
+        """Runs a single tool call and returns its `ToolMessage` and state updates."""
+        queue_seconds = time.perf_counter() - submitted_at if submitted_at else 0.0
+        with metrics.stage("tool", tool_call["name"], queue_seconds=queue_seconds) as record:
+            tool_message, state_updates = self._invoke_tool(state, tool_call)
+            if not state_updates:
+                record["status"] = "error"
+        return tool_message, state_updates
+
+    def _invoke_tool(self, state: WorkflowState, tool_call: dict):
+        tool_name = tool_call["name"]
+        tool = self.tools_by_name.get(tool_name)
+        if tool is None:
+            return ToolMessage(content=f"Error: unknown tool `{tool_name}`.", tool_call_id=tool_call["id"], status="error"), {}
+
+        # All tools now expect the state to be passed in.
+        args = {"state": state, **tool_call["args"]}
+        try:
+            result = tool.invoke(args)
+        except Exception as e:
+            return ToolMessage(content=f"Error: `{tool_name}` failed: {e}", tool_call_id=tool_call["id"], status="error"), {}
+
+        if "error" in result:
+            return ToolMessage(content=result["error"], tool_call_id=tool_call["id"], status="error"), {}
+
+        state_updates, content = TOOL_RESULT_HANDLERS[tool_name](result)
+        return ToolMessage(content=content, tool_call_id=tool_call["id"]), state_updates
+
+    @staticmethod
+    def _schedule_tool_calls(tool_calls: List[dict]) -> List[List[int]]:
+        """
+        Groups tool calls into waves that can run concurrently.
+
+        A call is deferred to a later wave while any tool it depends on (see
+        `TOOL_DEPENDENCIES`) is still pending in the same batch.
+        """
+        pending = list(range(len(tool_calls)))
+        waves = []
+        while pending:
+            pending_names = {tool_calls[i]["name"] for i in pending}
+            wave = [
+                i for i in pending
+                if not (TOOL_DEPENDENCIES.get(tool_calls[i]["name"], set()) & (pending_names - {tool_calls[i]["name"]}))
+            ]
+            if not wave:
+                # Should not happen with an acyclic dependency map, but never stall.
+                wave = pending
+            waves.append(wave)
+            pending = [i for i in pending if i not in wave]
+        return waves
+
     def tool_executor_node(self, state: WorkflowState):
-        last_message = state["messages"][-1]
-        tool_messages = []
+        tool_calls = state["messages"][-1].tool_calls
+        results = [None] * len(tool_calls)
         state_updates = {}
-        
-        for tool_call in last_message.tool_calls:
-            # All tools now expect the state to be passed in.
-            args = {"state": state, **tool_call["args"]}
-
-            if tool_call["name"] == "generate_cover_letter":
-                result = generate_cover_letter.invoke(args)
-                if "error" in result:
-                    tool_messages.append(ToolMessage(content=result["error"], tool_call_id=tool_call["id"]))
-                else:
-                    state_updates["proposal"] = result["proposal_text"]
-                    state_updates["cover_letter_path"] = result["file_path"]
-                    tool_messages.append(ToolMessage(content=str(result["proposal_text"]), tool_call_id=tool_call["id"]))
-            
-            elif tool_call["name"] == "generate_google_doc_proposal":
-                result = generate_google_doc_proposal.invoke(args)
-                if "error" in result:
-                    tool_messages.append(ToolMessage(content=result["error"], tool_call_id=tool_call["id"]))
-                else:
-                    state_updates["google_doc_url"] = result["doc_url"]
-                    state_updates["google_doc_markdown"] = result["markdown_content"]
-                    state_updates["google_doc_md_path"] = result["md_path"]
-                    state_updates["google_doc_docx_path"] = result["docx_path"]
-                    tool_messages.append(ToolMessage(content=f"Google Doc created at {result['doc_url']}", tool_call_id=tool_call["id"]))
-            
-            elif tool_call["name"] == "generate_mermaid_diagram":
-                result = generate_mermaid_diagram.invoke(args)
-                if "error" in result:
-                    tool_messages.append(ToolMessage(content=result["error"], tool_call_id=tool_call["id"]))
-                else:
-                    state_updates["mermaid_code"] = result["mermaid_code"]
-                    state_updates["mermaid_code_path"] = result["mermaid_code_path"]
-                    state_updates["mermaid_image_path"] = result["image_path"]
-                    tool_messages.append(ToolMessage(content=f"Diagram saved to {result['image_path']}", tool_call_id=tool_call["id"]))
-
-        state_updates["messages"] = tool_messages
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for wave in self._schedule_tool_calls(tool_calls):
+                # Later waves see the artifacts produced by earlier ones.
+                wave_state = {**state, **state_updates}
+                futures = {
+                    i: pool.submit(
+                        contextvars.copy_context().run, self._execute_tool_call, wave_state, tool_calls[i], time.perf_counter()
+                    )
+                    for i in wave
+                }
+                # Merge in the order the orchestrator issued the calls, not completion order.
+                for i in wave:
+                    results[i] = futures[i].result()
+                    state_updates.update(results[i][1])
+
+        state_updates["messages"] = [tool_message for tool_message, _ in results]
         return state_updates
 
-    def run(self, initial_state: dict, thread_id: str):
-        config = {"configurable": {"thread_id": thread_id}}
-        return self.graph.stream(
+    def run(self, initial_state: dict, thread_id: str, stream_mode="updates", run_id: Optional[str] = None):
+        """
+        Runs the workflow on a thread and yields the LangGraph event stream. Once the
+        stream is exhausted, the thread's old checkpoints are pruned.
+
+        Args:
+            initial_state (dict): The input state (usually just new user `messages`).
+            thread_id (str): The conversation's thread ID.
+            stream_mode: A LangGraph stream mode or list of modes. Use
+                `["updates", "messages", "custom"]` to also receive orchestrator tokens
+                (`messages`) and tagged artifact chunks from the tools (`custom`).
+            run_id (Optional[str]): Tags the run's metrics so they can be summarized with
+                `metrics.summarize(run_id=...)`. Generated if omitted.
+        """
+        config = {"configurable": {"thread_id": thread_id, "workflow_run_id": run_id or uuid.uuid4().hex}}
+        yield from self.graph.stream(
             initial_state,
             config=config,
-            stream_mode="updates",
+            stream_mode=stream_mode,
         )
+        if hasattr(self.checkpointer, "prune"):
+            self.checkpointer.prune(thread_id, keep_last=self.checkpoint_retention)
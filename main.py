@@ -1,19 +1,62 @@
 import os
+import sys
+import uuid
 from dotenv import load_dotenv
 from graph import ProposalWorkflow
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessageChunk
 from utils.file_manager import FileStorageManager
+from utils.metrics import metrics, start_metrics_server
 
 load_dotenv()
 
+# Stream orchestrator tokens plus the tagged artifact chunks emitted by the tools.
+STREAM_MODES = ["messages", "custom"]
 
-def main():
-    if not os.environ.get("OPENAI_API_KEY"):
-        print("Please set the OPENAI_API_KEY environment variable.")
-        return
 
-    workflow = ProposalWorkflow()
-    
+def print_stream(events):
+    """
+    Renders streamed tokens live. The tools stream their artifacts at the same time,
+    so output is printed a line at a time, each prefixed with its source.
+    """
+    partial_lines = {}
+
+    def write(source: str, text: str):
+        lines = (partial_lines.pop(source, "") + text).split("\n")
+        for line in lines[:-1]:
+            print(f"[{source}] {line}", flush=True)
+        if lines[-1]:
+            partial_lines[source] = lines[-1]
+
+    for mode, payload in events:
+        if mode == "messages":
+            # Only the orchestrator's tokens; the tools' LLM calls come through `custom`.
+            chunk, metadata = payload
+            if (
+                metadata.get("langgraph_node") == "orchestrator"
+                and isinstance(chunk, AIMessageChunk)
+                and isinstance(chunk.content, str)
+                and chunk.content
+            ):
+                write("assistant", chunk.content)
+        elif mode == "custom" and isinstance(payload, dict) and payload.get("reset"):
+            source = payload.get("artifact", "tool")
+            partial_lines.pop(source, None)
+            print(f"[{source}] --- switched to another model; restarting ---", flush=True)
+        elif mode == "custom" and isinstance(payload, dict) and payload.get("chunk"):
+            write(payload.get("artifact", "tool"), payload["chunk"])
+    for source, line in partial_lines.items():
+        print(f"[{source}] {line}")
+
+
+def print_metrics(run_id: str):
+    """Prints the per-stage latency, token and cost summary of a run."""
+    print("-" * 50)
+    print("Run summary:")
+    print(metrics.summarize(run_id=run_id))
+
+
+def start_new_job(workflow: ProposalWorkflow):
+    """Generates the proposal package for `job_description.txt` and returns the new thread ID."""
     print("Welcome to the AI Proposal Agent!")
     print("The agent will generate a proposal for the job description in `job_description.txt`.")
     print("Reading job description...")
@@ -25,32 +68,55 @@ def main():
 
         # Each conversation will have a unique file manager and thread_id
         file_manager = FileStorageManager()
-        thread_id = file_manager.timestamp
+        thread_id = file_manager.job_id
         job_description_path = file_manager.save_job_description(initial_job_description)
 
         print(f"Read job description and saved to {job_description_path}")
         print(f"All generated content will be saved in: {file_manager.job_folder_path}")
         print("Processing...")
-        
+    
         initial_state = {
             "messages": [("user", initial_job_description)],
             "job_folder_path": file_manager.job_folder_path
         }
 
-        events = workflow.run(initial_state, thread_id)
-        for event in events:
-            for node_name, node_output in event.items():
-                if "messages" in node_output:
-                    for message in node_output["messages"]:
-                        if isinstance(message, AIMessage) and not message.tool_calls:
-                            message.pretty_print()
-        
+        run_id = uuid.uuid4().hex
+        print_stream(workflow.run(initial_state, thread_id, stream_mode=STREAM_MODES, run_id=run_id))
+        print_metrics(run_id)
+    
         print("-" * 50)
         print("You can now ask for changes or provide further instructions.")
+        return thread_id
 
     except FileNotFoundError:
         print("`job_description.txt` not found. Please create one and add the job description to it.")
-        return # Exit if the file is not found, as interactive mode is disabled.
+        return None
+
+
+def main():
+    if not os.environ.get("OPENAI_API_KEY"):
+        print("Please set the OPENAI_API_KEY environment variable.")
+        return
+
+    if os.environ.get("METRICS_PORT"):
+        start_metrics_server(int(os.environ["METRICS_PORT"]))
+        print(f"Serving metrics on http://127.0.0.1:{os.environ['METRICS_PORT']}/metrics")
+
+    workflow = ProposalWorkflow()
+
+    # `python3 main.py --resume <job_id>` continues a previous job's conversation.
+    if len(sys.argv) == 3 and sys.argv[1] == "--resume":
+        file_manager = FileStorageManager.lookup(sys.argv[2])
+        if file_manager is None:
+            print(f"Job `{sys.argv[2]}` not found in generated_content/index.jsonl.")
+            return
+        thread_id = file_manager.job_id
+        print(f"Resuming job {thread_id} ({file_manager.job_folder_path}).")
+        print("You can ask for changes or provide further instructions.")
+    else:
+        thread_id = start_new_job(workflow)
+        if thread_id is None:
+            return # Exit if the file is not found, as interactive mode is disabled.
 
     # Interactive loop for the same job
     while True:
@@ -60,20 +126,9 @@ def main():
             break
         
         # Continue the same thread
-        events = workflow.run(
-            {"messages": [("user", user_input)]},
-            thread_id
-        )
-
-        for event in events:
-            # The event is a dictionary where keys are node names
-            # and values are the updates to the state
-            for node_name, node_output in event.items():
-                if "messages" in node_output:
-                    for message in node_output["messages"]:
-                        # Only print final AI responses, not intermediate tool calls or results.
-                        if isinstance(message, AIMessage) and not message.tool_calls:
-                            message.pretty_print()
+        run_id = uuid.uuid4().hex
+        print_stream(workflow.run({"messages": [("user", user_input)]}, thread_id, stream_mode=STREAM_MODES, run_id=run_id))
+        print_metrics(run_id)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,16 +1,21 @@
-ABOUT_ME = """I'm a generative AI engineer who builds intelligent multi-agent systems, LangChain/LangGraph workflows, RAG systems, and AI-powered tools for real-world impact.
-
-Relevant projects:
-- AI Network Engineer: A multi-agent system that acts as a fully autonomous network engineer. It uses over 5,000 custom API tools to diagnose, troubleshoot, and resolve complex network issues for 100s of devices without human intervention. This system is projected to save over $200,000 annually and is a top 12 finalist in the T-Mobile T-Challenge.
-- AI Market Researcher agent that scrapes competitor sites, clusters pain points, and writes data-backed reports; saved ≈ $25 k in research fees.
-- AI document information extraction & summarization pipeline for a multinational glass manufacturer, saving ~$45,000/year.
-- AI recruiter automation pipeline that analyzed batches of CVs across any evaluation metrics a user defined.
-- AI Journaling App in LangChain and Django: Emotionally intelligent journaling assistant that prompts users to help them journal and promote self-reflection. Also does an in-depth analysis of their journaling patterns over time to give insights on moods, behaviors, habits, recurring life themes, etc. 
-- AI therapist using LangGraph and FastAPI.
-- AI Lead Generation & Enrichment Agent: I created a system that ingests a list of target companies, finds their key decision-makers on LinkedIn using the Proxycurl API, and then performs automated web searches to find and verify their professional email addresses—turning a simple company list into a sales-qualified lead list.
-"""
-
-PROPOSAL_GENERATION_SYSTEM_PROMPT = f"""
+ABOUT_ME_INTRO = """I'm a generative AI engineer who builds intelligent multi-agent systems, LangChain/LangGraph workflows, RAG systems, and AI-powered tools for real-world impact."""
+
+# The portfolio, one project per entry, most important first. Prompts only include
+# the projects most relevant to each job (see `utils/portfolio.py`).
+PORTFOLIO_PROJECTS = [
+    """AI Network Engineer: A multi-agent system that acts as a fully autonomous network engineer. It uses over 5,000 custom API tools to diagnose, troubleshoot, and resolve complex network issues for 100s of devices without human intervention. This system is projected to save over $200,000 annually and is a top 12 finalist in the T-Mobile T-Challenge.""",
+    """AI Market Researcher agent that scrapes competitor sites, clusters pain points, and writes data-backed reports; saved ≈ $25 k in research fees.""",
+    """AI document information extraction & summarization pipeline for a multinational glass manufacturer, saving ~$45,000/year.""",
+    """AI recruiter automation pipeline that analyzed batches of CVs across any evaluation metrics a user defined.""",
+    """AI Journaling App in LangChain and Django: Emotionally intelligent journaling assistant that prompts users to help them journal and promote self-reflection. Also does an in-depth analysis of their journaling patterns over time to give insights on moods, behaviors, habits, recurring life themes, etc. """,
+    """AI therapist using LangGraph and FastAPI.""",
+    """AI Lead Generation & Enrichment Agent: I created a system that ingests a list of target companies, finds their key decision-makers on LinkedIn using the Proxycurl API, and then performs automated web searches to find and verify their professional email addresses—turning a simple company list into a sales-qualified lead list.""",
+]
+
+# The intro and the whole portfolio.
+ABOUT_ME = ABOUT_ME_INTRO + "\n\nRelevant projects:\n" + "".join(f"- {project}\n" for project in PORTFOLIO_PROJECTS)
+
+PROPOSAL_GENERATION_SYSTEM_PROMPT = """
 You are a helpful, intelligent Upwork application writer.
 
 Your task is to take as input an Upwork job description and return as output a customized proposal.
@@ -18,9 +23,9 @@ Your task is to take as input an Upwork job description and return as output a c
 High-performing proposals are typically templated as follows:
 
 ```
-Hi, I do {{thing}} all the time. I'm so confident I'm the right fit for you that I just created a workflow diagram + a demo of your {{thing}}: $$$
+Hi, I do {thing} all the time. I'm so confident I'm the right fit for you that I just created a workflow diagram + a demo of your {thing}: $$$
 
-About me: I'm a {{relevantJobDescription}} that has done {{coolRelevantThing}}. Of note, {{otherCoolTieIn}}.
+About me: I'm a {relevantJobDescription} that has done {coolRelevantThing}. Of note, {otherCoolTieIn}.
 
 Happy to do this for you anytime—just respond to this proposal (else I don't get a chat window). 
 
@@ -34,14 +39,10 @@ Rules:
 - If there's a name included somewhere in the description, add it after "Hi"
 - If there's anything else you feel should be included in the proposal (like the client asking for their favorite color), add it in.
 
-Some facts about me for the personalization: 
-```
-{ABOUT_ME}
-```
-You should include 2-4 relevant projects that would look impressive for this job. 
+Some facts about me for the personalization are in the message before the job description. You should include 2-4 relevant projects from them that would look impressive for this job. 
 """
 
-GOOGLE_DOC_PROPOSAL_SYSTEM_PROMPT = f"""
+GOOGLE_DOC_PROPOSAL_SYSTEM_PROMPT = """
 I'm a Generative AI Engineer applying to jobs on freelance platforms.
 
 Your task is to take as input an Upwork job description (and sometimes some additional instructions) and return well-formatted markdown for a customized proposal (which I'll upload to Google Docs). Bear in mind I'm already making a brief proposal for the job that I'll be using when bidding on Upwork. This Google Doc's link will be shared in that proposal. 
@@ -49,24 +50,24 @@ Your task is to take as input an Upwork job description (and sometimes some addi
 High-performing proposals are typically templated as follows:
 
 ```
-# {{titleOfSystem}}
+# {titleOfSystem}
 
 Hello <name of the client, ONLY if available>! As mentioned, I’m so confident I’m the right fit for this I went ahead and created a proposal for you, including a step-by-step of how I’d do it.
 
-I’ve done the below many times and working with {{specificPartOfTheirRequest(but not the project’s name)}} is actually one of my favorite parts of generative AI work. 
+I’ve done the below many times and working with {specificPartOfTheirRequest(but not the project’s name)} is actually one of my favorite parts of generative AI work. 
 
 **Anyway**, here’s how I’d build it:
 
 [MERMAID_DIAGRAM_PLACEHOLDER]
 
-{{stepByStepBulletPoints}}
+{stepByStepBulletPoints}
 
-So basically, **{{leftToRightFlowWithArrows}}**.
+So basically, **{leftToRightFlowWithArrows}**.
 
 **A little about me**:
-{{aboutMeIntro}}
+{aboutMeIntro}
 Relevant projects I've recently done:
-{{relevantProjectsBulletPoints}}
+{relevantProjectsBulletPoints}
 
 To be upfront: my goal is to ideally work with you long-term, since I find it aligns incentives and lets me help clients better. So I'd treat everything we do together as foundational, and help you build systems that drive revenue/maximize cost savings. 
 
@@ -79,17 +80,33 @@ Leave the "[MERMAID_DIAGRAM_PLACEHOLDER]" placeholder EXACTLY AS IT IS for now i
 
 Remember to tailor the content to the specific job description provided. The client is looking for a proposal that is tailored to their specific needs, so you should include details about the project that are relevant to the job description. If they have asked any more questions, address them properly. The template is just a guide, so you can add or remove things as needed.
 
-Some facts about me for personalization:
-```
-{ABOUT_ME}
-```
-Make sure to include examples of work I've done, especially those that are relevant to the job description. 
+Some facts about me for personalization are in the message before the job description. Make sure to include examples of work I've done, especially those that are relevant to the job description. 
 
 The output should be a single string written in Markdown format. Use standard Markdown syntax like '#' for headings, '##' for subheadings, '-' for bullet points, and '**' for bold text. MAKE SURE TO HAVE AN EXTRA NEW LINE BEFORE EACH BULLET POINT (for proper formatting). 
 
 DO NOT OUTPUT ANYTHING ELSE AT ALL, JUST A STRING. DO NOT START OR END WITH TRIPLE BACKTICKS.
 """
 
+GOOGLE_DOC_SECTION_EDIT_SYSTEM_PROMPT = """
+You are editing a Markdown proposal I already wrote for an Upwork job. The proposal is split into numbered sections, each wrapped in a <section index="..."> tag.
+
+Your task is to apply the user's requested changes by rewriting ONLY the sections that need to change. For each of them, return its index and its full new Markdown (including its heading, if it has one). Leave every other section out of your answer; they will be kept exactly as they are. To remove a section, return it with empty content. To add new content, include it in the section it belongs to.
+
+Rules:
+- Keep the tone, formatting and Markdown conventions of the rest of the proposal. Keep an extra new line before each bullet point.
+- Leave the "[MERMAID_DIAGRAM_PLACEHOLDER]" placeholder EXACTLY AS IT IS if it appears in a section you rewrite.
+- Do not wrap the content in <section> tags or triple backticks.
+
+Some facts about me are in a separate message, in case the changes need them.
+"""
+
+# Sent as its own message after the static system prompts above, so they stay a
+# cacheable prefix while the selected projects change from job to job.
+ABOUT_ME_MESSAGE = """Some facts about me:
+```
+{about_me}
+```"""
+
 ORCHESTRATOR_SYSTEM_PROMPT = """I am applying to jobs on freelance platforms. Your task is to take as input an Upwork job description (and sometimes some additional instructions) and return a proposal. The proposal will also include a link to a Google Doc. 
 
 Your job is to decide whether to call a tool or to respond to the user based on the conversation history.
@@ -102,14 +119,13 @@ You have three tools available:
 **Your Routing Logic:**
 
 1.  **Initial Request**: If the user sends in an Upwork job description, your sequence of operations should be:
-    a. Call `generate_cover_letter`.
-    b. Call `generate_google_doc_proposal`.
-    c. Call `generate_mermaid_diagram` using the text from the Google Doc proposal as the `workflow_description`.
-    d. Finally, respond to the user with the cover letter, the Google Doc URL, and the path to the diagram image.
+    a. Call `generate_cover_letter`, `generate_google_doc_proposal` and `generate_mermaid_diagram` together in the same turn. The diagram is built from the text of the Google Doc proposal, and it is automatically generated after the Google Doc is ready.
+    b. Finally, respond to the user with the cover letter, the Google Doc URL, and the path to the diagram image.
 2.  **Modification Request**: If the user asks for changes, determine which artifact needs to be updated (the proposal, the Google Doc, or the diagram) and call the appropriate tool. You MUST include the user's feedback in the `change_request` parameter and pass the previous artifact (e.g., `previous_proposal` or `previous_mermaid_code`) to the tool.
+    If the user just asks for a new version of an artifact without any specific change, call its tool with `regenerate` set to true so a fresh version is generated.
 3. Once you have fulfilled the request, share the cover letter and URL with the user. In the cover letter, you will see a '$$$' placeholder. Replace it with the link to the Google Doc (just the plain link, not as a hyperlink).
 
-Call one tool at a time, check its output, then call the next or respond to the user if complete. 
+You can call several tools in the same turn: independent tools run in parallel, and `generate_mermaid_diagram` always waits for `generate_google_doc_proposal` when both are requested together. Check their outputs, then call more tools or respond to the user if complete. 
 """
 
 MERMAID_DIAGRAM_SYSTEM_PROMPT = """
@@ -475,3 +491,25 @@ If you feel the diagram is going to be long vertically and we should have this s
 
 **YOUR FINAL OUTPUT SHOULD JUST BE THE MERMAID DIAGRAM, STARTING LITERALLY WITH `graph TD` OR `%%{init: { ... }}%%` (WITHOUT ANY DELIMITERS ETC.).**
 """
+
+MERMAID_EDIT_SYSTEM_PROMPT = """
+You are an expert technical illustrator editing an existing Mermaid diagram (`graph TD`). Instead of rewriting the whole diagram, return a short list of search-and-replace edits:
+- `old`: one or more consecutive lines copied exactly from the current code (without the line numbers shown to you). Use the fewest lines that identify the place to change.
+- `new`: the lines that replace them. Leave it empty to delete the lines.
+To add lines at the end of the diagram, use an empty `old`.
+
+Keep the diagram valid Mermaid:
+- Wrap node labels in double quotes when they contain brackets, parentheses or other special characters, e.g. `A["Data (raw)"]`.
+- Never use double quotes inside a label; use single quotes instead.
+- Close every `subgraph` with `end`, and never use `end` as a node ID.
+- Use <br/> to break longer labels.
+
+Only change what is needed for the request; everything you don't edit is kept as it is.
+"""
+
+SIMILAR_JOB_CHANGE_REQUEST = """This was written for an earlier job posting that is very similar to the new one (possibly a repost, or the same client hiring for a similar role). Adapt it to the new job description: update everything that is specific to the earlier posting (the client's goals, requirements, tools, deliverables and any questions they asked) and keep everything that still applies."""
+
+SIMILAR_JOB_DIAGRAM_REQUEST = """This diagram was drawn for an earlier, very similar proposal. Update it so it matches the workflow of the new proposal below, changing only what differs:
+```
+{proposal}
+```"""
@@ -1,5 +1,29 @@
+from typing import List
+
 from pydantic import BaseModel, Field
 
 class Proposal(BaseModel):
     """The generated proposal."""
     proposal: str = Field(description="The customized proposal text based on the job description.")
+
+
+class SectionEdit(BaseModel):
+    """The new text of one section of the Google Doc proposal."""
+    index: int = Field(description="The index of the section to replace.")
+    content: str = Field(description="The full new Markdown of the section, including its heading. Empty to remove the section.")
+
+
+class SectionEdits(BaseModel):
+    """The sections of the Google Doc proposal that change."""
+    edits: List[SectionEdit] = Field(description="One entry per section that needs to change. Sections not listed are kept as they are.")
+
+
+class MermaidEdit(BaseModel):
+    """A search-and-replace edit to Mermaid code."""
+    old: str = Field(description="One or more consecutive lines copied exactly from the current code. Empty to append `new` at the end.")
+    new: str = Field(description="The lines replacing `old`. Empty to delete them.")
+
+
+class MermaidEdits(BaseModel):
+    """The edits to apply to the current Mermaid code."""
+    edits: List[MermaidEdit] = Field(description="The edits, applied in order.")
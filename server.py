@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from langchain_core.messages import AIMessage, AIMessageChunk
+from pydantic import BaseModel
+
+from graph import ProposalWorkflow
+from utils.file_manager import FileStorageManager
+from utils.metrics import metrics
+from utils.rate_limit import configure_rate_limits
+
+load_dotenv()
+
+# Stream orchestrator tokens, tool artifact chunks and node updates.
+STREAM_MODES = ["updates", "messages", "custom"]
+
+# Events of the latest run kept per session, replayed to clients that connect late.
+EVENT_HISTORY = 5000
+# Seconds between SSE keep-alive comments.
+KEEPALIVE_SECONDS = 15
+# Idle sessions (no run, no SSE client) are forgotten after this many seconds, and
+# beyond this many the least recently active ones go first. A forgotten session is
+# recreated from the job index on its next request.
+SESSION_IDLE_TTL_SECONDS = 900
+MAX_IDLE_SESSIONS = 256
+
+
+class JobRequest(BaseModel):
+    job_description: str
+
+
+class MessageRequest(BaseModel):
+    message: str
+
+
+class Subscriber:
+    """An SSE client. If it falls `max_queue` events behind, it is disconnected and can reconnect."""
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False
+
+
+class Session:
+    """The server-side state of one job thread: its running flag, event history and SSE clients."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.run_id: Optional[str] = None
+        self.running = False
+        self.history = deque(maxlen=EVENT_HISTORY)
+        self.subscribers: Set[Subscriber] = set()
+        self.last_active = time.monotonic()
+
+    def idle(self) -> bool:
+        return not self.running and not self.subscribers
+
+    def publish(self, event: dict):
+        """Sends an event to every subscriber. Must be called on the event loop."""
+        self.history.append(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.lagged = True
+                self.subscribers.discard(subscriber)
+
+
+def _to_events(mode: str, payload) -> Iterator[dict]:
+    """Turns one LangGraph stream item into the server's JSON events."""
+    if mode == "messages":
+        chunk, metadata = payload
+        if (
+            metadata.get("langgraph_node") == "orchestrator"
+            and isinstance(chunk, AIMessageChunk)
+            and isinstance(chunk.content, str)
+            and chunk.content
+        ):
+            yield {"type": "token", "source": "assistant", "text": chunk.content}
+    elif mode == "custom":
+        if isinstance(payload, dict) and payload.get("reset"):
+            # The text streamed so far for this source was discarded; its replacement follows.
+            yield {"type": "reset", "source": payload.get("artifact", "tool")}
+        elif isinstance(payload, dict) and payload.get("chunk"):
+            yield {"type": "token", "source": payload.get("artifact", "tool"), "text": payload["chunk"]}
+    elif mode == "updates":
+        for node, output in payload.items():
+            output = output or {}
+            artifacts = {
+                key: value for key, value in output.items()
+                if key.endswith(("_path", "_url")) and isinstance(value, str)
+            }
+            yield {"type": "progress", "node": node, "artifacts": artifacts}
+            for message in output.get("messages", []):
+                if isinstance(message, AIMessage) and not message.tool_calls:
+                    yield {"type": "message", "content": message.content}
+
+
+class ProposalServer:
+    """
+    Runs many proposal sessions on one shared `ProposalWorkflow`.
+
+    The graph, the LLM client pools, the renderer and the upload queue are process-wide,
+    so every session reuses them. Graph runs execute on a bounded thread pool; once
+    `max_concurrent_runs + max_pending_runs` runs are in flight, new ones are rejected
+    with HTTP 429. Each session runs one request at a time and accepts a limited number
+    of SSE clients.
+
+    Args:
+        base_dir (str): The folder holding all job folders.
+        max_concurrent_runs (int): Graph runs executing at the same time.
+        max_pending_runs (int): Runs allowed to wait for a free slot.
+        max_subscribers (int): SSE clients per session.
+        max_input_chars (int): Longest accepted job description or message.
+        subscriber_queue (int): Events buffered per SSE client before it is disconnected.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "generated_content",
+        max_concurrent_runs: int = 8,
+        max_pending_runs: int = 32,
+        max_subscribers: int = 4,
+        max_input_chars: int = 20000,
+        subscriber_queue: int = 1000,
+    ):
+        self.base_dir = base_dir
+        self.max_concurrent_runs = max(1, max_concurrent_runs)
+        self.max_pending_runs = max(0, max_pending_runs)
+        self.max_subscribers = max_subscribers
+        self.max_input_chars = max_input_chars
+        self.subscriber_queue = subscriber_queue
+        self.workflow: Optional[ProposalWorkflow] = None
+        self.sessions: Dict[str, Session] = {}
+        self.session_ttl = SESSION_IDLE_TTL_SECONDS
+        self.max_idle_sessions = MAX_IDLE_SESSIONS
+        self.active_runs = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_runs, thread_name_prefix="proposal-run")
+
+    def start(self):
+        self.workflow = ProposalWorkflow()
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _check_input(self, text: str, field: str):
+        if not text.strip():
+            raise HTTPException(status_code=422, detail=f"`{field}` is empty.")
+        if len(text) > self.max_input_chars:
+            raise HTTPException(status_code=413, detail=f"`{field}` is longer than {self.max_input_chars} characters.")
+
+    def _evict_sessions(self):
+        """Forgets idle sessions past the TTL, then the least recently active beyond `max_idle_sessions`."""
+        now = time.monotonic()
+        idle = sorted((s for s in self.sessions.values() if s.idle()), key=lambda s: s.last_active)
+        for position, session in enumerate(idle):
+            if now - session.last_active >= self.session_ttl or len(idle) - position > self.max_idle_sessions:
+                del self.sessions[session.job_id]
+
+    def _get_session(self, job_id: str) -> Session:
+        self._evict_sessions()
+        session = self.sessions.get(job_id)
+        if session is None:
+            if FileStorageManager.lookup(job_id, base_dir=self.base_dir) is None:
+                raise HTTPException(status_code=404, detail=f"Job `{job_id}` not found.")
+            session = self.sessions[job_id] = Session(job_id)
+        return session
+
+    def _reserve_run(self, session: Session):
+        if session.running:
+            raise HTTPException(status_code=409, detail="This job is still processing the previous request.")
+        if self.active_runs >= self.max_concurrent_runs + self.max_pending_runs:
+            raise HTTPException(status_code=429, detail="The server is busy. Try again later.", headers={"Retry-After": "10"})
+        session.running = True
+        session.last_active = time.monotonic()
+        self.active_runs += 1
+
+    def _start_run(self, session: Session, initial_state: dict) -> str:
+        """Starts a graph run on the pool and streams its events into the session."""
+        loop = asyncio.get_running_loop()
+        run_id = uuid.uuid4().hex
+        session.run_id = run_id
+        session.history.clear()
+        session.publish({"type": "run_started", "run_id": run_id})
+
+        def publish(event: dict):
+            loop.call_soon_threadsafe(session.publish, {**event, "run_id": run_id})
+
+        def work():
+            final_response = None
+            for mode, payload in self.workflow.run(initial_state, session.job_id, stream_mode=STREAM_MODES, run_id=run_id):
+                for event in _to_events(mode, payload):
+                    if event["type"] == "message":
+                        final_response = event["content"]
+                    publish(event)
+            if final_response:
+                FileStorageManager(base_dir=self.base_dir, job_id=session.job_id).save_final_response(final_response)
+
+        def finished(future):
+            session.running = False
+            session.last_active = time.monotonic()
+            self.active_runs -= 1
+            error = future.exception()
+            if error is not None:
+                session.publish({"type": "error", "run_id": run_id, "error": str(error)})
+            session.publish({"type": "done", "run_id": run_id, "summary": metrics.summarize(run_id=run_id)})
+
+        future = loop.run_in_executor(self._executor, work)
+        future.add_done_callback(finished)
+        return run_id
+
+    async def create_job(self, request: JobRequest) -> dict:
+        self._check_input(request.job_description, "job_description")
+        if self.active_runs >= self.max_concurrent_runs + self.max_pending_runs:
+            raise HTTPException(status_code=429, detail="The server is busy. Try again later.", headers={"Retry-After": "10"})
+
+        self._evict_sessions()
+        file_manager = await asyncio.to_thread(FileStorageManager, self.base_dir)
+        await asyncio.to_thread(file_manager.save_job_description, request.job_description)
+        session = self.sessions[file_manager.job_id] = Session(file_manager.job_id)
+        self._reserve_run(session)
+        run_id = self._start_run(session, {
+            "messages": [("user", request.job_description)],
+            "job_folder_path": file_manager.job_folder_path,
+        })
+        return {"job_id": session.job_id, "run_id": run_id, "events_url": f"/jobs/{session.job_id}/events"}
+
+    async def post_message(self, job_id: str, request: MessageRequest) -> dict:
+        self._check_input(request.message, "message")
+        session = self._get_session(job_id)
+        self._reserve_run(session)
+        run_id = self._start_run(session, {"messages": [("user", request.message)]})
+        return {"job_id": job_id, "run_id": run_id, "events_url": f"/jobs/{job_id}/events"}
+
+    async def stream_events(self, job_id: str) -> StreamingResponse:
+        session = self._get_session(job_id)
+        if len(session.subscribers) >= self.max_subscribers:
+            raise HTTPException(status_code=429, detail="Too many open event streams for this job.")
+
+        subscriber = Subscriber(self.subscriber_queue)
+        for event in list(session.history)[-self.subscriber_queue:]:
+            subscriber.queue.put_nowait(event)
+        session.subscribers.add(subscriber)
+
+        async def events():
+            try:
+                while True:
+                    if subscriber.lagged and subscriber.queue.empty():
+                        yield "event: overflow\ndata: {}\n\n"
+                        return
+                    try:
+                        event = await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            finally:
+                session.subscribers.discard(subscriber)
+                session.last_active = time.monotonic()
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def get_job(self, job_id: str) -> dict:
+        session = self._get_session(job_id)
+        config = {"configurable": {"thread_id": job_id}}
+        state = (await asyncio.to_thread(self.workflow.graph.get_state, config)).values
+        artifacts = {key: value for key, value in state.items() if key.endswith(("_path", "_url")) and value}
+        return {"job_id": job_id, "running": session.running, "run_id": session.run_id, "artifacts": artifacts}
+
+    def list_jobs(self) -> List[dict]:
+        jobs = FileStorageManager.list_jobs(self.base_dir)
+        for job in jobs:
+            session = self.sessions.get(job["job_id"])
+            job["running"] = bool(session and session.running)
+        return jobs
+
+    def list_artifacts(self, job_id: str) -> List[str]:
+        folder = self._job_folder(job_id)
+        return sorted(
+            os.path.relpath(os.path.join(root, name), folder)
+            for root, _, names in os.walk(folder)
+            for name in names
+            if not name.endswith(".tmp")
+        )
+
+    def get_artifact(self, job_id: str, path: str) -> FileResponse:
+        folder = os.path.realpath(self._job_folder(job_id))
+        full_path = os.path.realpath(os.path.join(folder, path))
+        if os.path.commonpath([folder, full_path]) != folder or not os.path.isfile(full_path):
+            raise HTTPException(status_code=404, detail=f"Artifact `{path}` not found.")
+        return FileResponse(full_path)
+
+    def _job_folder(self, job_id: str) -> str:
+        file_manager = FileStorageManager.lookup(job_id, base_dir=self.base_dir)
+        if file_manager is None:
+            raise HTTPException(status_code=404, detail=f"Job `{job_id}` not found.")
+        return file_manager.job_folder_path
+
+
+def create_app(server: Optional[ProposalServer] = None) -> FastAPI:
+    """Creates the FastAPI app serving `server` (a default `ProposalServer` if omitted)."""
+    server = server or ProposalServer()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        server.start()
+        yield
+        server.stop()
+
+    app = FastAPI(title="AI Proposal Agent", lifespan=lifespan)
+    app.add_api_route("/jobs", server.create_job, methods=["POST"], status_code=202)
+    app.add_api_route("/jobs", server.list_jobs, methods=["GET"])
+    app.add_api_route("/jobs/{job_id}", server.get_job, methods=["GET"])
+    app.add_api_route("/jobs/{job_id}/messages", server.post_message, methods=["POST"], status_code=202)
+    app.add_api_route("/jobs/{job_id}/events", server.stream_events, methods=["GET"])
+    app.add_api_route("/jobs/{job_id}/artifacts", server.list_artifacts, methods=["GET"])
+    app.add_api_route("/jobs/{job_id}/artifacts/{path:path}", server.get_artifact, methods=["GET"])
+    app.add_api_route("/metrics", lambda: PlainTextResponse(metrics.render_prometheus()), methods=["GET"])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the proposal workflow over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--output", default="generated_content", help="Base folder for generated content.")
+    parser.add_argument("--max-runs", type=int, default=8, help="Graph runs executing at the same time.")
+    parser.add_argument("--max-pending", type=int, default=32, help="Runs allowed to wait for a free slot.")
+    parser.add_argument("--max-subscribers", type=int, default=4, help="Event streams per job.")
+    parser.add_argument("--openai-rpm", type=float, default=None, help="Max OpenAI requests per minute.")
+    parser.add_argument("--google-rpm", type=float, default=None, help="Max Gemini requests per minute.")
+    parser.add_argument("--openai-tpm", type=float, default=None, help="Max OpenAI tokens per minute.")
+    parser.add_argument("--google-tpm", type=float, default=None, help="Max Gemini tokens per minute.")
+    parser.add_argument("--drive-rpm", type=float, default=None, help="Max Google Drive requests per minute.")
+    args = parser.parse_args()
+
+    if not os.environ.get("OPENAI_API_KEY"):
+        print("Please set the OPENAI_API_KEY environment variable.")
+        return
+
+    configure_rate_limits(
+        {"openai": args.openai_rpm, "google": args.google_rpm, "drive": args.drive_rpm},
+        {"openai": args.openai_tpm, "google": args.google_tpm},
+    )
+    server = ProposalServer(
+        base_dir=args.output,
+        max_concurrent_runs=args.max_runs,
+        max_pending_runs=args.max_pending,
+        max_subscribers=args.max_subscribers,
+    )
+    uvicorn.run(create_app(server), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
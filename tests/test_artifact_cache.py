@@ -0,0 +1,59 @@
+import os
+import time
+
+from utils.artifact_cache import STALE_TMP_SECONDS, ArtifactCache
+
+
+def artifact(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    key = cache.make_key("png", "graph TD\n A-->B", "1500x350")
+    dest = str(tmp_path / "diagram.png")
+
+    assert not cache.fetch(key, dest)
+    cache.store(key, artifact(tmp_path, "rendered.png", 10))
+    assert cache.fetch(key, dest)
+    assert open(dest, "rb").read() == b"x" * 10
+    assert cache.make_key("png", "graph TD\n A-->C", "1500x350") != key
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, 10)
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=25)
+    for name in ("a", "b"):
+        cache.store(name, artifact(tmp_path, name, 10))
+    assert cache.fetch("a", str(tmp_path / "out-a"))  # "b" is now the least recently used.
+
+    cache.store("c", artifact(tmp_path, "c", 10))
+
+    assert not cache.fetch("b", str(tmp_path / "out-b"))
+    assert cache.fetch("a", str(tmp_path / "out-a"))
+    assert sorted(os.listdir(cache.cache_dir)) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 20
+
+
+def test_reload_restores_entries_and_skips_temporary_files(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    ArtifactCache(cache_dir).store("kept.png", artifact(tmp_path, "kept", 10))
+    fresh_tmp = os.path.join(cache_dir, "kept.png.123.tmp")
+    stale_tmp = os.path.join(cache_dir, "other.png.456.tmp")
+    for path in (fresh_tmp, stale_tmp):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - STALE_TMP_SECONDS - 1
+    os.utime(stale_tmp, (old, old))
+
+    cache = ArtifactCache(cache_dir)
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 10
+    assert os.path.exists(fresh_tmp)
+    assert not os.path.exists(stale_tmp)
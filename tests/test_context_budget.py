@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from utils.context_budget import MAX_INLINE_TOOL_OUTPUT_CHARS, build_context
+
+SYSTEM_PROMPT = "You are the orchestrator."
+STATE = {"proposal": "Dear client, ...", "mermaid_image_path": "diagram.png"}
+
+
+def turn(request: str, tool_output: str, call_id: str, answer: str = "Done."):
+    return [
+        HumanMessage(content=request),
+        AIMessage(content="", tool_calls=[{"name": "generate_cover_letter", "args": {}, "id": call_id}]),
+        ToolMessage(content=tool_output, tool_call_id=call_id),
+        AIMessage(content=answer),
+    ]
+
+
+def contents(messages):
+    return [m.content for m in messages]
+
+
+def test_prefix_is_stable_across_hops():
+    history = turn("Job description", "short letter", "call_1") + [HumanMessage(content="Make it shorter")]
+    first_hop = build_context(SYSTEM_PROMPT, history, STATE, max_tokens=10_000)
+    next_hop = build_context(
+        SYSTEM_PROMPT,
+        history + [AIMessage(content="", tool_calls=[{"name": "generate_cover_letter", "args": {}, "id": "call_2"}])],
+        STATE,
+        max_tokens=10_000,
+    )
+
+    assert isinstance(first_hop[0], SystemMessage) and first_hop[0].content == SYSTEM_PROMPT
+    # The per-hop artifact summary goes last, so everything before it is shared.
+    assert first_hop[-1].content.startswith("Current artifacts")
+    assert contents(next_hop[:len(first_hop) - 1]) == contents(first_hop[:-1])
+    assert next_hop[-1].content == first_hop[-1].content
+
+
+def test_large_tool_outputs_of_earlier_turns_become_state_references():
+    long_output = "x" * (MAX_INLINE_TOOL_OUTPUT_CHARS + 1)
+    history = (
+        turn("Job description", long_output, "call_1")
+        + turn("Change the tone", "y" * MAX_INLINE_TOOL_OUTPUT_CHARS, "call_2")
+        + turn("And now?", long_output, "call_3")
+    )
+
+    messages = build_context(SYSTEM_PROMPT, history, STATE, max_tokens=10_000)
+    tool_outputs = [m.content for m in messages if isinstance(m, ToolMessage)]
+
+    assert tool_outputs[0] == (
+        f"[Output of `generate_cover_letter` omitted ({len(long_output)} chars). "
+        "The latest version is kept in the workflow state as `proposal`.]"
+    )
+    assert tool_outputs[1] == "y" * MAX_INLINE_TOOL_OUTPUT_CHARS
+    # The current turn is never compacted.
+    assert tool_outputs[2] == long_output
+
+
+def test_oldest_turns_are_dropped_past_the_budget_but_the_job_is_kept():
+    history = (
+        turn("Job description", "letter 1", "call_1", "A" * 400)
+        + turn("Second request", "letter 2", "call_2", "B" * 400)
+        + turn("Third request", "letter 3", "call_3", "C" * 400)
+        + [HumanMessage(content="Current request")]
+    )
+    everything = build_context(SYSTEM_PROMPT, history, {}, max_tokens=10_000)
+
+    messages = build_context(SYSTEM_PROMPT, history, {}, max_tokens=300)
+
+    assert len(messages) < len(everything)
+    kept = contents(messages)
+    assert kept[:2] == [SYSTEM_PROMPT, "Job description"]
+    assert "Second request" not in kept
+    assert "Third request" in kept
+    assert kept[-1] == "Current request"
+
+
+def test_job_description_survives_even_when_over_budget():
+    history = turn("Job description", "letter", "call_1", "A" * 4000) + [HumanMessage(content="Current request")]
+
+    messages = build_context(SYSTEM_PROMPT, history, {}, max_tokens=10)
+
+    assert contents(messages) == [SYSTEM_PROMPT, "Job description", "Current request"]
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from utils import file_manager
+from utils.file_manager import INDEX_FILE_NAME, FileStorageManager, atomic_write, new_job_id
+
+
+def test_job_ids_are_unique_and_time_ordered():
+    ids = [new_job_id() for _ in range(2000)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(len(job_id) == 26 for job_id in ids)
+
+
+def test_job_ids_in_the_same_millisecond_stay_ordered(monkeypatch):
+    monkeypatch.setattr(file_manager.time, "time", lambda: 4_000_000_000.0)
+    monkeypatch.setattr(file_manager, "_last_ulid", (0, 0))
+    ids = [new_job_id() for _ in range(100)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert len({job_id[:10] for job_id in ids}) == 1  # Same timestamp part.
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "letter.txt"
+    atomic_write(str(path), "first")
+    atomic_write(str(path), "second")
+    atomic_write(str(tmp_path / "image.png"), b"\x89PNG")
+
+    assert path.read_text() == "second"
+    assert (tmp_path / "image.png").read_bytes() == b"\x89PNG"
+    assert sorted(os.listdir(tmp_path)) == ["image.png", "letter.txt"]
+
+
+def test_failed_atomic_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    path = tmp_path / "letter.txt"
+    atomic_write(str(path), "original")
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(file_manager.os, "replace", fail_replace)
+    with pytest.raises(OSError, match="disk full"):
+        atomic_write(str(path), "new content")
+
+    assert path.read_text() == "original"
+    assert os.listdir(tmp_path) == ["letter.txt"]
+
+
+def test_job_folder_collision_picks_a_new_id(tmp_path, monkeypatch):
+    ids = iter(["01TAKEN", "01TAKEN", "01FREE"])
+    monkeypatch.setattr(file_manager, "new_job_id", lambda: next(ids))
+
+    first = FileStorageManager(base_dir=str(tmp_path))
+    second = FileStorageManager(base_dir=str(tmp_path))
+
+    assert (first.job_id, second.job_id) == ("01TAKEN", "01FREE")
+    assert os.path.isdir(second.mermaid_diagrams_path)
+    with pytest.raises(FileExistsError):
+        os.mkdir(first.job_folder_path)
+
+
+def test_index_round_trip(tmp_path):
+    base_dir = str(tmp_path)
+    first = FileStorageManager(base_dir=base_dir)
+    first.save_job_description("\n  Build a Zapier automation  \nDetails follow.")
+    second = FileStorageManager(base_dir=base_dir)
+    with open(os.path.join(base_dir, INDEX_FILE_NAME), "a") as f:
+        f.write('{"job_id": "partial')  # A write cut short by a crash.
+
+    jobs = FileStorageManager.list_jobs(base_dir)
+
+    assert [job["job_id"] for job in jobs] == [first.job_id, second.job_id]
+    assert jobs[0]["title"] == "Build a Zapier automation"
+    assert jobs[0]["job_folder_path"] == first.job_folder_path
+    assert "title" not in jobs[1]
+
+    found = FileStorageManager.lookup(first.job_id, base_dir=base_dir)
+    assert found.job_folder_path == first.job_folder_path
+    assert found.get_cover_letter_path() == first.get_cover_letter_path()
+    assert FileStorageManager.lookup("01UNKNOWN", base_dir=base_dir) is None
+
+
+def test_list_jobs_without_an_index(tmp_path):
+    assert FileStorageManager.list_jobs(str(tmp_path)) == []
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils import llm_cache
+from utils.llm_cache import DiskBackend, LLMResponseCache, SQLiteBackend
+
+TOOL = "generate_cover_letter"
+MESSAGES = [SystemMessage(content="Write a cover letter."), HumanMessage(content="Build a Zapier automation.")]
+
+
+@pytest.fixture(params=["sqlite", "disk"])
+def cache(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    else:
+        backend = DiskBackend(str(tmp_path / "cache"))
+    return LLMResponseCache(backend, ttls={TOOL: 60})
+
+
+def key(messages=MESSAGES, model="gpt-4o", temperature=0.7, schema=""):
+    return LLMResponseCache.make_key(model, temperature, messages, schema)
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now)
+    cache.set(TOOL, key(), "Dear client")
+
+    now += 60
+    assert cache.get(TOOL, key()) == "Dear client"
+    now += 1
+    assert cache.get(TOOL, key()) is None
+    assert cache.stats()[TOOL] == {"hits": 1, "misses": 1, "bypassed": 0}
+
+
+def test_regenerate_bypasses_the_cache(cache):
+    cache.set(TOOL, key(), "Dear client")
+
+    assert cache.get(TOOL, key(), bypass=True) is None
+    assert cache.get(TOOL, key()) == "Dear client"
+    assert cache.stats()[TOOL]["bypassed"] == 1
+
+
+def test_zero_ttl_disables_caching(tmp_path):
+    cache = LLMResponseCache(DiskBackend(str(tmp_path / "cache")), ttls={TOOL: 0})
+    cache.set(TOOL, key(), "Dear client")
+    assert cache.get(TOOL, key()) is None
+
+
+def test_key_ignores_cosmetic_differences_and_message_objects():
+    rebuilt = [
+        SystemMessage(content="Write a cover letter."),
+        HumanMessage(content="  Build a   Zapier\tautomation.\r\n\n\n"),
+    ]
+    assert key(rebuilt) == key(MESSAGES)
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        key([MESSAGES[0], HumanMessage(content="Build a Make.com automation.")]),
+        key(MESSAGES + [AIMessage(content="Dear client")]),
+        key([SystemMessage(content="Write a proposal."), MESSAGES[1]]),
+        key(model="gemini-2.5-pro"),
+        key(temperature=0.2),
+        key(schema="CoverLetter"),
+    ],
+)
+def test_key_changes_with_anything_that_changes_the_answer(other):
+    assert other != key()
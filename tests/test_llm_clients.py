@@ -0,0 +1,117 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import AIMessageChunk, HumanMessage, SystemMessage
+
+from utils import llm_clients, rate_limit
+from utils.llm_cache import DiskBackend, LLMResponseCache
+
+TOOL = "generate_cover_letter"
+MESSAGES = [SystemMessage(content="Write a cover letter."), HumanMessage(content="A job")]
+PRIMARY = ("openai", "gpt-4o")
+SECONDARY = ("google", "gemini-2.5-pro")
+
+
+class FixedRouter:
+    """Answers every call as if `used` had produced it, without running the attempts."""
+
+    def __init__(self, used):
+        self.used = used
+
+    def call(self, tool, provider, model, attempt):
+        return f"answer from {self.used[1]}", {}, self.used
+
+
+class ScriptedModel:
+    """A chat model that streams fixed chunks, then optionally fails."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, messages):
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+        if self.error is not None:
+            raise self.error
+
+
+class SequentialRouter:
+    """Runs the primary attempt, then the secondary one, and uses the secondary's answer."""
+
+    def call(self, tool, provider, model, attempt):
+        try:
+            attempt(*PRIMARY, None, lambda: None)
+        except ConnectionError:
+            pass
+        result, usage = attempt(*SECONDARY, None, lambda: None)
+        return result, usage, SECONDARY
+
+
+@pytest.fixture
+def streamed(monkeypatch):
+    """Routes `invoke_llm` through `SequentialRouter` and returns what `on_text` received."""
+    monkeypatch.setattr(llm_clients, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(llm_clients, "get_router", SequentialRouter)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    yield []
+    llm_clients.set_client_factory(None)
+
+
+def use_models(models):
+    llm_clients.set_client_factory(lambda provider, model, temperature: models[model])
+
+
+def test_losing_attempt_text_is_reset_and_the_winner_replayed(streamed):
+    use_models({
+        "gpt-4o": ScriptedModel(["Dear ", "client"]),
+        "gemini-2.5-pro": ScriptedModel(["Hello ", "there"]),
+    })
+
+    result = llm_clients.invoke_llm(TOOL, MESSAGES, *PRIMARY, on_text=streamed.append)
+
+    assert result == "Hello there"
+    # The first attempt owned the stream; the second was buffered until it won.
+    assert streamed == ["Dear ", "client", None, "Hello there"]
+
+
+def test_failed_owner_hands_the_stream_to_the_next_attempt(streamed):
+    use_models({
+        "gpt-4o": ScriptedModel(["Dear "], error=ConnectionError("connection reset")),
+        "gemini-2.5-pro": ScriptedModel(["Hello ", "there"]),
+    })
+
+    result = llm_clients.invoke_llm(TOOL, MESSAGES, *PRIMARY, on_text=streamed.append)
+
+    assert result == "Hello there"
+    assert streamed == ["Dear ", None, "Hello ", "there"]
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = LLMResponseCache(DiskBackend(str(tmp_path / "llm_cache")))
+    monkeypatch.setattr(llm_clients, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def cached_answer(cache):
+    return cache.get(TOOL, cache.make_key("gpt-4o", 0.7, MESSAGES))
+
+
+def test_answer_of_the_requested_model_is_cached(monkeypatch, cache):
+    monkeypatch.setattr(llm_clients, "get_router", lambda: FixedRouter(("openai", "gpt-4o")))
+
+    llm_clients.invoke_llm(TOOL, MESSAGES, "openai", "gpt-4o", 0.7)
+
+    assert cached_answer(cache) == "answer from gpt-4o"
+
+
+def test_failover_answer_is_not_cached_under_the_requested_model(monkeypatch, cache):
+    monkeypatch.setattr(llm_clients, "get_router", lambda: FixedRouter(("google", "gemini-2.5-pro")))
+
+    result = llm_clients.invoke_llm(TOOL, MESSAGES, "openai", "gpt-4o", 0.7)
+
+    assert result == "answer from gemini-2.5-pro"
+    assert cached_answer(cache) is None
@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+from utils import llm_router
+from utils.llm_router import DEFAULT_HEDGE_SECONDS, FALLBACK_HEDGE_SECONDS, AttemptCancelled, CircuitBreaker, LLMRouter
+
+TOOL = "generate_cover_letter"
+PRIMARY = ("openai", "gpt-4o")
+SECONDARY = ("google", "gemini-2.5-pro")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_router.time, "monotonic", clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_five_consecutive_failures(clock):
+    breaker = CircuitBreaker()
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker()
+    for _ in range(4):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_lets_a_single_probe_through_after_the_cooldown(clock):
+    breaker = CircuitBreaker()
+    open_breaker(breaker)
+
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_probe_result_closes_or_reopens_the_breaker(clock):
+    breaker = CircuitBreaker()
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+
+def test_hedge_delay_uses_the_slo_until_enough_samples():
+    router = LLMRouter()
+    for i in range(19):
+        router._observe(TOOL, *PRIMARY, 1.0 + i)
+
+    assert router.hedge_delay(TOOL, *PRIMARY) == DEFAULT_HEDGE_SECONDS[TOOL]
+    assert router.hedge_delay("unknown_tool", *PRIMARY) == FALLBACK_HEDGE_SECONDS
+
+
+def test_hedge_delay_is_the_observed_p95_after_twenty_samples():
+    router = LLMRouter()
+    for i in range(20):
+        router._observe(TOOL, *PRIMARY, 0.1 * (i + 1))
+
+    assert router.hedge_delay(TOOL, *PRIMARY) == pytest.approx(2.0)
+    # Other models keep their own samples.
+    assert router.hedge_delay(TOOL, *SECONDARY) == DEFAULT_HEDGE_SECONDS[TOOL]
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    router = LLMRouter()
+    router.hedge_delay = lambda tool, provider, model: 0.05
+    primary_cancelled = threading.Event()
+
+    def attempt(provider, model, cancel, started):
+        started()
+        if (provider, model) == PRIMARY:
+            cancel.wait(5)
+            primary_cancelled.set()
+            raise AttemptCancelled()
+        return "secondary answer", {}
+
+    result, _, used = router.call(TOOL, *PRIMARY, attempt)
+
+    assert (result, used) == ("secondary answer", SECONDARY)
+    assert primary_cancelled.wait(5)
+
+
+def test_attempt_queued_in_the_rate_limiter_is_not_hedged():
+    router = LLMRouter()
+    router.hedge_delay = lambda tool, provider, model: 0.0
+    models = []
+
+    def attempt(provider, model, cancel, started):
+        models.append(model)
+        threading.Event().wait(0.3)  # Queued in the limiter: `started` isn't called yet.
+        started()
+        return "primary answer", {}
+
+    result, _, used = router.call(TOOL, *PRIMARY, attempt)
+
+    assert (result, used) == ("primary answer", PRIMARY)
+    assert models == ["gpt-4o"]
+
+
+def test_provider_failure_fails_over_but_other_errors_are_raised():
+    router = LLMRouter(hedging=False)
+
+    def attempt(provider, model, cancel, started):
+        started()
+        if (provider, model) == PRIMARY:
+            raise ConnectionError("connection reset")
+        return "secondary answer", {}
+
+    assert router.call(TOOL, *PRIMARY, attempt)[2] == SECONDARY
+    assert router.breaker(*PRIMARY).failures == 1
+
+    def invalid(provider, model, cancel, started):
+        started()
+        raise ValueError("answer doesn't fit the schema")
+
+    with pytest.raises(ValueError):
+        router.call(TOOL, *PRIMARY, invalid)
@@ -0,0 +1,76 @@
+import io
+import os
+import zipfile
+from xml.etree import ElementTree
+
+from utils.markdown_docx import markdown_to_docx
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "examples")
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def convert_example(name: str) -> zipfile.ZipFile:
+    with open(os.path.join(EXAMPLES_DIR, name), "r") as f:
+        return zipfile.ZipFile(io.BytesIO(markdown_to_docx(f.read())))
+
+
+def paragraph_text(paragraph) -> str:
+    return "".join(t.text or "" for t in paragraph.iter(f"{W}t"))
+
+
+def style_of(paragraph):
+    style = paragraph.find(f"{W}pPr/{W}pStyle")
+    return style.get(f"{W}val") if style is not None else None
+
+
+def test_package_parts_are_well_formed_xml():
+    docx = convert_example("proposal.md")
+
+    assert docx.testzip() is None
+    assert {
+        "[Content_Types].xml", "_rels/.rels", "word/document.xml", "word/styles.xml",
+        "word/numbering.xml", "word/_rels/document.xml.rels",
+    } <= set(docx.namelist())
+    for name in docx.namelist():
+        ElementTree.fromstring(docx.read(name))
+
+
+def test_document_has_the_headings_list_and_table():
+    body = ElementTree.fromstring(convert_example("proposal.md").read("word/document.xml")).find(f"{W}body")
+    paragraphs = list(body.iter(f"{W}p"))
+
+    headings = [(style_of(p), paragraph_text(p)) for p in paragraphs if (style_of(p) or "").startswith("Heading")]
+    assert headings == [
+        ("Heading1", "Lead Enrichment Agent for HubSpot"),
+        ("Heading2", "Step-by-Step Plan"),
+        ("Heading2", "Timeline"),
+        ("Heading3", "Questions"),
+    ]
+
+    items = [p for p in paragraphs if style_of(p) == "ListParagraph"]
+    assert [paragraph_text(p) for p in items] == [
+        "Pull new contacts from HubSpot every hour",
+        "Enrich each contact with company data",
+        "Website and LinkedIn profile",
+        "Employee count",
+        "Write the results back to HubSpot",
+        "Which enrichment provider do you use today?",
+    ]
+    levels = [p.find(f"{W}pPr/{W}numPr/{W}ilvl").get(f"{W}val") for p in items]
+    assert levels == ["0", "0", "1", "1", "0", "0"]
+
+    tables = body.findall(f"{W}tbl")
+    assert len(tables) == 1
+    rows = [[paragraph_text(cell) for cell in row.findall(f"{W}tc")] for row in tables[0].findall(f"{W}tr")]
+    assert rows == [
+        ["Phase", "Duration", "Deliverable"],
+        ["Setup", "2 days", "HubSpot connection"],
+        ["Enrichment", "1 week", "Working agent"],
+    ]
+
+
+def test_links_are_registered_as_relationships():
+    docx = convert_example("proposal.md")
+    relationships = docx.read("word/_rels/document.xml.rels").decode("utf-8")
+
+    assert 'Target="https://www.langchain.com/langgraph" TargetMode="External"' in relationships
@@ -0,0 +1,85 @@
+import pytest
+
+from utils.markdown_sections import number_sections, split_sections, splice_sections
+
+PROPOSAL = """Intro text before any heading.
+
+# Automation Proposal
+
+Hi there,
+
+**A little about me**:
+I build automations.
+
+## Step-by-step plan
+
+1. Connect the CRM
+2. Post to Slack
+
+```python
+# Not a heading inside a fence
+**Not bold either**
+```
+
+### Questions
+- Which CRM?
+"""
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    [
+        PROPOSAL,
+        PROPOSAL.replace("\n", "\r\n"),
+        PROPOSAL.rstrip("\n"),
+        "# Only a heading",
+        "No headings at all.\n\nJust text.\n",
+        "\n\n# Heading after blank lines\n\n\n## Another\n   \n",
+        "",
+    ],
+)
+def test_split_and_splice_without_replacements_round_trip(markdown):
+    sections = split_sections(markdown)
+
+    assert "".join(sections) == markdown
+    assert splice_sections(sections, {}) == markdown
+
+
+def test_sections_start_at_headings_and_bold_sub_headings():
+    sections = split_sections(PROPOSAL)
+
+    assert [section.splitlines()[0] for section in sections] == [
+        "Intro text before any heading.",
+        "# Automation Proposal",
+        "**A little about me**:",
+        "## Step-by-step plan",
+        "### Questions",
+    ]
+    assert "**Not bold either**" in sections[3]
+
+
+def test_bold_text_inside_a_paragraph_does_not_start_a_section():
+    markdown = "# Title\n**Note** this is a sentence.\n"
+    assert split_sections(markdown) == [markdown]
+
+
+def test_replacement_keeps_the_spacing_between_sections():
+    sections = split_sections(PROPOSAL)
+
+    result = splice_sections(sections, {2: "**A little about me**:\nI build AI agents.\n\n\n"})
+
+    assert result == PROPOSAL.replace("I build automations.", "I build AI agents.")
+
+
+def test_empty_replacement_removes_the_section():
+    sections = split_sections(PROPOSAL)
+
+    result = splice_sections(sections, {4: ""})
+
+    assert result == "".join(sections[:4])
+    assert "### Questions" not in result
+
+
+def test_number_sections():
+    rendered = number_sections(["# A\n\n", "text\n"])
+    assert rendered == '<section index="0">\n# A\n</section>\n\n<section index="1">\ntext\n</section>'
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langgraph")
+
+from tools import mermaid
+from utils.artifact_cache import ArtifactCache
+
+VALID_CODE = "graph TD\n    A[Start] --> B[End]"
+
+
+@pytest.fixture
+def no_renderer(monkeypatch, tmp_path):
+    """No render service and no `mmdc` on the PATH."""
+    monkeypatch.setattr(mermaid, "get_render_service", lambda: None)
+    monkeypatch.setattr(mermaid, "get_artifact_cache", lambda: ArtifactCache(str(tmp_path / "cache")))
+    monkeypatch.setenv("PATH", str(tmp_path / "empty-bin"))
+
+
+def test_missing_renderer_raises_renderer_failure(no_renderer, tmp_path):
+    with pytest.raises(mermaid.MermaidRendererFailure, match="mermaid-cli is not installed"):
+        mermaid.render_mermaid(VALID_CODE, str(tmp_path / "diagram.png"))
+
+
+def test_missing_renderer_does_not_repair(no_renderer, monkeypatch, tmp_path):
+    def fail_repair(code, errors):
+        raise AssertionError("a renderer failure must not trigger a repair")
+
+    monkeypatch.setattr(mermaid, "_repair", fail_repair)
+    monkeypatch.setattr(mermaid, "_generate", lambda messages, regenerate=False: VALID_CODE)
+    (tmp_path / "job" / "mermaid_diagrams").mkdir(parents=True)
+    state = {"job_folder_path": str(tmp_path / "job"), "google_doc_markdown": "# Proposal"}
+
+    result = mermaid.generate_mermaid_diagram.func(state=state)
+
+    assert "could not be rendered" in result["error"]
+    assert "mermaid-cli is not installed" in result["error"]
+
+
+def test_syntax_errors_are_reported_for_repair():
+    message = mermaid._render_error("Parse error on line 2: ...")
+    assert message.startswith("Error rendering Mermaid diagram.")
+    with pytest.raises(mermaid.MermaidRendererFailure):
+        mermaid._render_error("Protocol error: Target closed")
+
+
+def test_missing_google_doc_markdown_is_an_error(monkeypatch, tmp_path):
+    monkeypatch.setattr(mermaid, "_generate", lambda messages, regenerate=False: pytest.fail("nothing to draw from"))
+    state = {"job_folder_path": str(tmp_path / "job"), "google_doc_markdown": None}
+
+    result = mermaid.generate_mermaid_diagram.func(state=state)
+
+    assert "`google_doc_markdown` is missing" in result["error"]
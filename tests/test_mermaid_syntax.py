@@ -0,0 +1,83 @@
+import pytest
+
+from tools.mermaid_syntax import apply_edits, validate_mermaid
+
+
+def flowchart(*lines: str) -> str:
+    return "\n".join(["graph TD"] + [f"    {line}" for line in lines])
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "A-->B",
+        "Start-->End1",
+        "A --> B",
+        "A-->|yes|B",
+        "A -->|yes| B",
+        "A-- yes -->B",
+        "A-.->B",
+        "A-.-B",
+        "A -. maybe .-> B",
+        "A==>B",
+        "A===B",
+        "A == sure ==> B",
+        "A~~~B",
+        "A ~~~ B",
+        "A<-->B",
+        "A--oB",
+        "A--xB",
+        "A[Start]-->B{Is it?}-->|Yes|C(Done)",
+        'A["Label (with brackets)"]-->B',
+        "A & B-->C",
+        "my-node-->other.node",
+        "api-gateway[API Gateway]-.->db_1[(Database)]",
+        "A:::highlight-->B",
+    ],
+)
+def test_valid_links(line):
+    assert validate_mermaid(flowchart(line)) == []
+
+
+def test_valid_diagram_with_subgraph_and_styles():
+    code = flowchart(
+        "subgraph Backend",
+        "    API-->DB[(Postgres)]",
+        "end",
+        "Client-->API",
+        "classDef blue fill:#00f",
+        "class API blue",
+    )
+    assert validate_mermaid(code) == []
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("A[Unclosed-->B", "missing `]`"),
+        ("A[Label (with brackets)]-->B", "wrap it in double quotes"),
+        ('A["unterminated]-->B', "unterminated quoted label"),
+        ("A B", "expected a link"),
+        ("end-->B", "`end` can't be used"),
+    ],
+)
+def test_invalid_lines(line, message):
+    errors = validate_mermaid(flowchart(line))
+    assert len(errors) == 1
+    assert message in errors[0]
+
+
+def test_unclosed_subgraph():
+    errors = validate_mermaid(flowchart("subgraph One", "A-->B"))
+    assert errors == ["line 2: `subgraph` is never closed with `end`"]
+
+
+def test_missing_header():
+    assert "expected a diagram type" in validate_mermaid("A-->B")[0]
+
+
+def test_apply_edits():
+    code = "graph TD\nA-->B\nB-->C"
+    assert apply_edits(code, [("B-->C", "B-->D")]) == "graph TD\nA-->B\nB-->D"
+    assert apply_edits(code, [("", "C-->D")]) == "graph TD\nA-->B\nB-->C\nC-->D"
+    assert apply_edits(code, [("X-->Y", "")]) is None
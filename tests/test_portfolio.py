@@ -0,0 +1,56 @@
+import pytest
+
+import prompts
+from utils.portfolio import PortfolioIndex, about_me, format_about_me, tokenize
+
+PROJECTS = [
+    "RAG chatbot over support tickets",
+    "Lead enrichment agent for HubSpot",
+    "CV screening pipeline for recruiters",
+    "Another lead enrichment agent for Salesforce",
+]
+
+
+def test_tokenize_drops_stop_words_and_plurals():
+    assert tokenize("The Agents and their CRMs, for Sales teams") == ["agent", "crm", "sale", "team"]
+
+
+def test_most_relevant_projects_come_first():
+    index = PortfolioIndex(PROJECTS)
+
+    assert index.search("We need a recruiter tool that screens CVs", top_k=1) == [PROJECTS[2]]
+    assert index.search("Salesforce lead enrichment", top_k=2) == [PROJECTS[3], PROJECTS[1]]
+
+
+def test_ties_keep_the_listed_order():
+    index = PortfolioIndex(PROJECTS)
+
+    # Both lead enrichment projects match the query equally.
+    assert index.search("lead enrichment", top_k=2) == [PROJECTS[1], PROJECTS[3]]
+
+
+def test_query_matching_nothing_keeps_the_listed_order():
+    index = PortfolioIndex(PROJECTS)
+
+    assert index.search("Build a Shopify storefront", top_k=3) == PROJECTS[:3]
+    assert index.search("", top_k=2) == PROJECTS[:2]
+
+
+def test_about_me_includes_the_top_projects(monkeypatch):
+    monkeypatch.delenv("PORTFOLIO_TOP_K", raising=False)
+    block = about_me("Find decision-makers on LinkedIn and verify their emails", top_k=1)
+
+    assert block.startswith(prompts.ABOUT_ME_INTRO)
+    assert block.count("\n- ") == 1
+    assert "Lead Generation & Enrichment Agent" in block
+
+
+@pytest.mark.parametrize("top_k", ["0", "100"])
+def test_top_k_zero_or_whole_portfolio_returns_the_full_about_me(monkeypatch, top_k):
+    monkeypatch.setenv("PORTFOLIO_TOP_K", top_k)
+
+    assert about_me("Lead enrichment") == prompts.ABOUT_ME
+
+
+def test_format_about_me_matches_the_full_block():
+    assert format_about_me(prompts.PORTFOLIO_PROJECTS) == prompts.ABOUT_ME
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langgraph")
+
+import prompts
+import schemas
+from tools import cover_letter, google_doc
+
+JOBS = ["Build a RAG chatbot over our support tickets.", "Screen CVs for our recruiters with an LLM."]
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Captures the messages of every LLM call made by the tools."""
+    calls = []
+
+    def fake_invoke_llm(tool, messages, *args, schema=None, **kwargs):
+        calls.append(messages)
+        return schema(proposal="Dear client") if schema is schemas.Proposal else "# Proposal"
+
+    monkeypatch.setattr(cover_letter, "invoke_llm", fake_invoke_llm)
+    monkeypatch.setattr(google_doc, "invoke_llm", fake_invoke_llm)
+    return calls
+
+
+def assert_static_prefix(calls, system_prompt):
+    assert [messages[0].content for messages in calls] == [system_prompt] * len(JOBS)
+    about_me_messages = [messages[1].content for messages in calls]
+    assert all(content.startswith("Some facts about me:") for content in about_me_messages)
+    assert about_me_messages[0] != about_me_messages[1]
+
+
+def test_cover_letter_keeps_the_portfolio_out_of_the_system_prompt(sent, tmp_path, monkeypatch):
+    monkeypatch.setenv("PORTFOLIO_TOP_K", "2")
+    for job in JOBS:
+        cover_letter.generate_cover_letter.func(state={"job_folder_path": str(tmp_path)}, job_description=job)
+
+    assert_static_prefix(sent, prompts.PROPOSAL_GENERATION_SYSTEM_PROMPT)
+
+
+def test_google_doc_keeps_the_portfolio_out_of_the_system_prompt(sent, monkeypatch):
+    monkeypatch.setenv("PORTFOLIO_TOP_K", "2")
+    for job in JOBS:
+        google_doc._generate_markdown(job, change_request=None, regenerate=False)
+
+    assert_static_prefix(sent, prompts.GOOGLE_DOC_PROPOSAL_SYSTEM_PROMPT)
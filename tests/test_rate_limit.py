@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import MIN_RATE_FACTOR, RATE_INCREASE_STEP, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class RateLimitError(Exception):
+    def __init__(self, headers=None):
+        super().__init__("429 Too Many Requests")
+        self.response = Response(429, headers or {})
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def wait_time(limiter, tokens=0):
+    """Seconds a new request would wait at the limiter's current time."""
+    now = limiter._clock()
+    limiter._refill(now)
+    return limiter._wait_time(now, tokens)
+
+
+def advance(limiter, clock, seconds):
+    """Moves the fake clock forward and wakes up the callers waiting in the limiter."""
+    clock.now += seconds
+    with limiter._condition:
+        limiter._condition.notify_all()
+
+
+def start_acquire(limiter, name, tokens, order):
+    """Calls `acquire` on a thread and returns once it is queued in the limiter."""
+    depth = limiter.queue_depth
+    thread = threading.Thread(target=lambda: (limiter.acquire(tokens), order.append(name)), daemon=True)
+    thread.start()
+    for _ in range(500):
+        if limiter.queue_depth > depth:
+            return thread
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{name} never queued")
+
+
+def test_waiters_are_served_in_arrival_order(clock):
+    limiter = RateLimiter(tokens_per_minute=600, clock=clock)  # 10 tokens/s, bucket of 50
+    limiter.acquire(50)
+    order = []
+    large = start_acquire(limiter, "large", 50, order)
+    small = start_acquire(limiter, "small", 1, order)
+
+    # Enough for the small request but not the large one, which is first in line.
+    advance(limiter, clock, 1)
+    threading.Event().wait(0.1)
+    assert order == []
+
+    advance(limiter, clock, 4)
+    large.join(5)
+    advance(limiter, clock, 1)
+    small.join(5)
+    assert order == ["large", "small"]
+
+
+def test_429_pauses_for_retry_after_and_halves_the_rate(clock):
+    limiter = RateLimiter(requests_per_minute=60, clock=clock)
+    error = RateLimitError({"retry-after": "2"})
+    assert rate_limit.is_rate_limit_error(error)
+
+    limiter.on_rate_limited(rate_limit.retry_after_seconds(error))
+
+    assert limiter.rate_factor == 0.5
+    assert wait_time(limiter) == pytest.approx(2.0)
+    clock.now += 2
+    assert wait_time(limiter) <= 0
+    assert limiter.acquire() == 0
+
+
+def test_retry_after_ms_takes_precedence():
+    error = RateLimitError({"retry-after-ms": "250", "retry-after": "2"})
+    assert rate_limit.retry_after_seconds(error) == 0.25
+
+
+def test_429_without_retry_after_backs_off_exponentially(clock):
+    limiter = RateLimiter(clock=clock)
+    limiter.on_rate_limited()
+    assert wait_time(limiter) == pytest.approx(1.0)
+    limiter.on_rate_limited()
+    assert wait_time(limiter) == pytest.approx(2.0)
+
+
+def test_rate_ramps_back_up_after_rate_limits(clock):
+    limiter = RateLimiter(requests_per_minute=60, clock=clock)
+    for _ in range(10):
+        limiter.on_rate_limited(0)
+    assert limiter.rate_factor == MIN_RATE_FACTOR
+
+    limiter.on_success()
+    assert limiter.rate_factor == pytest.approx(MIN_RATE_FACTOR + RATE_INCREASE_STEP)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate_factor == 1.0
+
+
+def test_halved_rate_slows_the_refill(clock):
+    limiter = RateLimiter(requests_per_minute=60, clock=clock)  # 1 request/s
+    limiter.on_rate_limited(0)
+
+    # The bucket was emptied, and refills at half the configured rate.
+    assert wait_time(limiter) == pytest.approx(2.0)
+
+
+def test_exhausted_ratelimit_headers_pause_until_the_reset(clock):
+    limiter = RateLimiter(clock=clock)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "1m30s",
+    })
+
+    assert limiter.requests_per_minute == 500
+    assert wait_time(limiter) == pytest.approx(90.0)
+
+
+def test_remaining_quota_does_not_pause(clock):
+    limiter = RateLimiter(clock=clock)
+    limiter.update_from_headers({"x-ratelimit-remaining-tokens": "1200", "x-ratelimit-reset-tokens": "6ms"})
+    assert wait_time(limiter) <= 0
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langgraph")
+
+from server import ProposalServer, Session, Subscriber
+from utils.file_manager import FileStorageManager
+
+
+@pytest.fixture
+def server(tmp_path):
+    return ProposalServer(base_dir=str(tmp_path))
+
+
+def add_session(server, job_id, last_active):
+    session = server.sessions[job_id] = Session(job_id)
+    session.last_active = last_active
+    return session
+
+
+def test_idle_sessions_expire_after_the_ttl(server, monkeypatch):
+    monkeypatch.setattr("server.time.monotonic", lambda: 10_000.0)
+    add_session(server, "expired", 10_000.0 - server.session_ttl)
+    add_session(server, "recent", 10_000.0 - 1)
+    running = add_session(server, "running", 0.0)
+    running.running = True
+    subscribed = add_session(server, "subscribed", 0.0)
+    subscribed.subscribers.add(Subscriber(max_queue=1))
+
+    server._evict_sessions()
+
+    assert set(server.sessions) == {"recent", "running", "subscribed"}
+
+
+def test_least_recently_active_idle_sessions_are_evicted_first(server, monkeypatch):
+    monkeypatch.setattr("server.time.monotonic", lambda: 100.0)
+    server.max_idle_sessions = 2
+    for i in range(4):
+        add_session(server, f"job-{i}", 90.0 + i)
+
+    server._evict_sessions()
+
+    assert set(server.sessions) == {"job-2", "job-3"}
+
+
+def test_evicted_session_is_reloaded_from_the_job_index(server, tmp_path):
+    job_id = FileStorageManager(base_dir=str(tmp_path)).job_id
+    add_session(server, job_id, -server.session_ttl)
+    server.sessions[job_id].run_id = "old-run"
+
+    session = server._get_session(job_id)
+
+    assert session.job_id == job_id
+    assert session.run_id is None
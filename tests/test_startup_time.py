@@ -0,0 +1,19 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from benchmarks.startup_time import LAZY_MODULES, PROJECT_ROOT, check_budget
+
+
+def test_graph_import_is_within_budget():
+    assert check_budget("graph", budget_ms=2000.0, top=0) == []
+
+
+def test_graph_import_leaves_heavy_sdks_unloaded():
+    script = f"import json, sys, graph; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.splitlines()[-1]) == []
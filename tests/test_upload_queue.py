@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("googleapiclient")
+pytest.importorskip("google_auth_oauthlib")
+
+from utils import google_drive, rate_limit
+from utils.fake_drive_server import FakeDriveServer
+from utils.upload_queue import UploadQueue
+
+
+@pytest.fixture
+def docx(tmp_path):
+    path = tmp_path / "proposal.docx"
+    path.write_bytes(b"PK fake docx")
+    return str(path)
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    """Starts a fake Drive API and points a fresh Drive client and `drive` limiter at it."""
+    servers = []
+
+    def start(**kwargs):
+        server = FakeDriveServer(**kwargs).start()
+        servers.append(server)
+        monkeypatch.setenv("GOOGLE_DRIVE_API_ENDPOINT", server.url)
+        return server
+
+    monkeypatch.setattr(google_drive, "_drive_service", None)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def upload(docx, file_id=None, **queue_options):
+    queue = UploadQueue(workers=1, backoff_seconds=0.01, **queue_options)
+    handle = queue.submit(docx, "Proposal", file_id=file_id)
+    handle.wait(timeout=10)
+    assert handle.done()
+    return handle
+
+
+def test_create_and_share(drive, docx):
+    server = drive()
+
+    handle = upload(docx)
+
+    assert handle.status == "done"
+    assert handle.doc_url == "https://docs.google.com/document/d/fake-doc-1/edit"
+    assert server.permissions["fake-doc-1"] == [{"type": "anyone", "role": "reader"}]
+    assert handle.attempts == 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_transient_errors_are_retried(drive, docx, status):
+    server = drive(fail_first=2, fail_status=status)
+
+    handle = upload(docx)
+
+    assert handle.status == "done"
+    assert handle.attempts == 3
+    assert list(server.files) == ["fake-doc-1"]
+    if status == 429:
+        # Each 429 halved the shared Drive rate; successes only grow it back gradually.
+        assert rate_limit.get_limiter("drive").rate_factor < 1.0
+
+
+def test_exhausted_retries_surface_the_error(drive, docx):
+    drive(fail_first=10)
+
+    handle = upload(docx, max_attempts=3)
+
+    assert handle.status == "failed"
+    assert handle.doc_url is None
+    assert "503" in handle.error
+    assert handle.attempts == 3
+
+
+def test_update_of_a_deleted_document_creates_a_new_one(drive, docx):
+    server = drive()
+
+    handle = upload(docx, file_id="deleted-doc")
+
+    assert handle.status == "done"
+    assert handle.file_id is None
+    assert handle.doc_url == "https://docs.google.com/document/d/fake-doc-1/edit"
+    assert "fake-doc-1" in server.permissions
@@ -4,10 +4,13 @@ from typing import Optional, Annotated
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
-from langchain_openai import ChatOpenAI
 
 import prompts
 import schemas
+from utils.file_manager import atomic_write
+from utils.llm_clients import invoke_llm
+from utils.portfolio import about_me
+from utils.similar_jobs import baseline_artifact
 
 
 @tool
@@ -15,6 +18,7 @@ def generate_cover_letter(
     state: Annotated[dict, InjectedState],
     job_description: str,
     change_request: Optional[str] = None,
+    regenerate: bool = False,
 ) -> dict:
     """
     Generates a customized Upwork cover letter, saves it to a file, and returns the content and path.
@@ -25,6 +29,8 @@ def generate_cover_letter(
         job_description (str): The job description from the Upwork posting.
         change_request (Optional[str]): If the user wants to modify a previous attempt,
             this parameter should contain the requested changes.
+        regenerate (bool): Set to True only when the user explicitly asks for a fresh version,
+            so a previously cached response is not reused.
 
     Returns:
         dict: A dictionary containing the `proposal_text` and the `file_path`.
@@ -32,14 +38,18 @@ def generate_cover_letter(
     previous_proposal = state.get("proposal")
     job_folder_path = state.get("job_folder_path")
 
+    # For a near-duplicate of a past job, rewrite that job's cover letter for the new one.
+    # A letter is short enough that it has no partial edit mode, unlike the proposal.
+    baseline = baseline_artifact(state, "proposal") if not change_request and not regenerate else None
+    if baseline:
+        previous_proposal, change_request = baseline, prompts.SIMILAR_JOB_CHANGE_REQUEST
+
     if not job_folder_path:
         return {"error": "Error: `job_folder_path` is missing from the state."}
 
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
-    structured_llm = llm.with_structured_output(schemas.Proposal)
-
     messages = [
         SystemMessage(content=prompts.PROPOSAL_GENERATION_SYSTEM_PROMPT),
+        HumanMessage(content=prompts.ABOUT_ME_MESSAGE.format(about_me=about_me(job_description))),
     ]
 
     if previous_proposal and change_request:
@@ -58,22 +68,15 @@ def generate_cover_letter(
 
     messages.append(HumanMessage(content=f'{{"jobDescription":"{job_description}"}}'))
 
-    response = structured_llm.invoke(messages)
+    response = invoke_llm(
+        "generate_cover_letter", messages, "openai", "gpt-4o", temperature=0.7,
+        schema=schemas.Proposal, regenerate=regenerate, artifact="cover_letter",
+    )
     proposal_text = response.proposal
 
-    # Save the proposal to a file
-    # We instantiate a manager with the *same* base directory and it will reconstruct the path
-    # This feels a bit clunky. A better approach might be to pass the file manager instance itself
-    # or just the direct path, which we are doing via state.
-    
-    # Let's derive the timestamp from the folder path to create the file manager
-    timestamp = os.path.basename(job_folder_path)
-    
-    # This is a hacky way to re-use the file manager methods.
-    # A cleaner way would be to pass the file manager object in the state.
-    # For now, let's just construct the path directly.
-    file_path = os.path.join(job_folder_path, f"cover_letter_{timestamp}.txt")
-    with open(file_path, "w") as f:
-        f.write(proposal_text)
+    # Save the proposal to a file named after the job ID (the job folder's name)
+    job_id = os.path.basename(job_folder_path)
+    file_path = os.path.join(job_folder_path, f"cover_letter_{job_id}.txt")
+    atomic_write(file_path, proposal_text)
 
     return {"proposal_text": proposal_text, "file_path": file_path} 
\ No newline at end of file
@@ -1,122 +1,216 @@
+import logging
 import os
 import os.path
-import pypandoc
-from typing import Optional, Dict, Annotated
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from typing import Optional, Dict, Annotated, Callable, List
 
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 import prompts
+import schemas
+from tools.mermaid import extract_workflow_section, speculation_enabled, start_speculative_diagram
+from utils.artifact_cache import get_artifact_cache
+from utils.file_manager import atomic_write
+from utils.llm_clients import invoke_llm
+from utils.markdown_docx import markdown_to_docx
+from utils.markdown_sections import number_sections, splice_sections, split_sections
+from utils.metrics import metrics
+from utils.portfolio import about_me
+from utils.similar_jobs import baseline_artifact
+from utils.upload_queue import get_upload_queue
 
-# If modifying these scopes, delete the file token.json.
-SCOPES = ["https://www.googleapis.com/auth/drive"]
+logger = logging.getLogger(__name__)
 
+# Name of the generated Google Doc in Drive.
+DOC_NAME = "Proposal - Shaheer Akhtar"
+PANDOC_ARGS = ["--from=markdown-auto_identifiers", "-M", "auto-identifiers=false"]
 
-def get_google_credentials():
-    """Gets valid user credentials from storage or initiates the OAuth2 flow."""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return creds
+
+def _docx_converter() -> str:
+    """The Markdown to DOCX converter: `builtin` (the default) or `pandoc`, set with `DOCX_CONVERTER`."""
+    return "pandoc" if os.environ.get("DOCX_CONVERTER", "builtin").lower() == "pandoc" else "builtin"
+
+
+def _convert_with_pandoc(md_path: str, docx_path: str):
+    import pypandoc
+
+    tmp_docx_path = f"{docx_path}.{os.getpid()}.tmp.docx"
+    with metrics.stage("pandoc", "docx"):
+        pypandoc.convert_file(md_path, 'docx', outputfile=tmp_docx_path, extra_args=PANDOC_ARGS)
+    os.replace(tmp_docx_path, docx_path)
+
+
+def _convert_to_docx(markdown_content: str, md_path: str, docx_path: str, converter: str):
+    """
+    Converts the proposal Markdown to a .docx file, in-process with the built-in
+    converter, or with pandoc if it was requested or the built-in converter fails.
+    """
+    if converter == "builtin":
+        try:
+            with metrics.stage("docx", "builtin"):
+                content = markdown_to_docx(markdown_content)
+            atomic_write(docx_path, content)
+            return
+        except Exception:
+            logger.exception("The built-in DOCX converter failed; falling back to pandoc")
+    _convert_with_pandoc(md_path, docx_path)
+
+
+def _generate_markdown(job_description: str, change_request: Optional[str], regenerate: bool, on_text: Optional[Callable[[Optional[str]], None]] = None) -> str:
+    """Generates the whole proposal Markdown from the job description, passing streamed text to `on_text`."""
+    messages = [
+        SystemMessage(content=prompts.GOOGLE_DOC_PROPOSAL_SYSTEM_PROMPT),
+        HumanMessage(content=prompts.ABOUT_ME_MESSAGE.format(about_me=about_me(job_description))),
+        HumanMessage(content=job_description),
+    ]
+    if change_request:
+        messages.append(HumanMessage(content=f"Please incorporate the following changes: {change_request}"))
+
+    markdown_content = invoke_llm(
+        "generate_google_doc_proposal", messages, "google", "gemini-2.5-pro", temperature=0.7,
+        regenerate=regenerate, artifact="google_doc_markdown", on_text=on_text,
+    )
+    if (markdown_content.startswith("```markdown") or markdown_content.startswith("\n```markdown") or markdown_content.startswith("```") or markdown_content.startswith("\n```")) and markdown_content.endswith("```"):
+        markdown_content = markdown_content[11:-3].strip()
+    return markdown_content
+
+
+def _speculation_trigger(job_folder_path: str) -> Callable[[Optional[str]], None]:
+    """
+    Returns a stream callback that starts the Mermaid diagram as soon as the proposal's
+    step-by-step plan is complete, overlapping it with the rest of the generation.
+    A diagram started from text that is later discarded is reconciled like any other
+    mismatch with the final proposal.
+    """
+    streamed = []
+    started = False
+
+    def on_text(text: Optional[str]):
+        nonlocal started
+        if text is None:
+            streamed.clear()
+            return
+        streamed.append(text)
+        if started or "\n" not in text:
+            return
+        workflow_section = extract_workflow_section("".join(streamed), partial=True)
+        if workflow_section:
+            started = True
+            start_speculative_diagram(job_folder_path, workflow_section)
+
+    return on_text
+
+
+def _edit_markdown(previous_markdown: str, job_description: str, change_request: str) -> (str, List[int]):
+    """
+    Applies a change request to the previous proposal by rewriting only the sections
+    it affects.
+
+    Returns:
+        (str, List[int]): The new Markdown and the indexes of the rewritten sections.
+    """
+    sections = split_sections(previous_markdown)
+    messages = [
+        SystemMessage(content=prompts.GOOGLE_DOC_SECTION_EDIT_SYSTEM_PROMPT),
+        HumanMessage(content=prompts.ABOUT_ME_MESSAGE.format(about_me=about_me(f"{job_description}\n{change_request}"))),
+        HumanMessage(content=f"Job description:\n```\n{job_description}\n```\n\nProposal sections:\n\n{number_sections(sections)}"),
+        HumanMessage(content=f"Please incorporate the following changes: {change_request}"),
+    ]
+    response = invoke_llm(
+        "generate_google_doc_proposal", messages, "google", "gemini-2.5-pro", temperature=0.7,
+        schema=schemas.SectionEdits, artifact="google_doc_markdown",
+    )
+    replacements = {edit.index: edit.content for edit in response.edits if 0 <= edit.index < len(sections)}
+    return splice_sections(sections, replacements), sorted(replacements)
 
 
 @tool
-def generate_google_doc_proposal(state: Annotated[dict, InjectedState], job_description: str, change_request: Optional[str] = None) -> Dict[str, str]:
+def generate_google_doc_proposal(state: Annotated[dict, InjectedState], job_description: str, change_request: Optional[str] = None, regenerate: bool = False) -> Dict[str, str]:
     """
     Generates a full, detailed proposal, saves it locally, and uploads it to Google Drive.
 
     This tool takes a job description, generates proposal content in Markdown format,
-    converts the Markdown to a .docx file, saves both locally, and then uploads the
-    .docx to Google Drive, converting it to a native Google Doc.
+    converts the Markdown to a .docx file, saves both locally, and then queues the
+    .docx for upload to Google Drive, converting it to a native Google Doc. The tool
+    returns as soon as the upload is queued; the Google Doc URL is resolved later.
+
+    When a proposal already exists and a `change_request` is given, only the sections
+    affected by the change are rewritten, and the existing Google Doc is updated in
+    place, keeping its URL.
 
     Args:
         state (Annotated[dict, InjectedState]): The current workflow state, injected automatically.
         job_description (str): The job description for which to generate a proposal.
         change_request (Optional[str]): If the user wants to modify a previous attempt,
             this parameter should contain the requested changes.
+        regenerate (bool): Set to True only when the user explicitly asks for a fresh version,
+            so a previously cached response is not reused and the whole proposal is rewritten.
 
     Returns:
-        Dict[str, str]: A dictionary containing `doc_url`, `markdown_content`, `md_path`,
-                        `docx_path`, or an error message.
+        Dict[str, str]: A dictionary containing `upload_id`, `markdown_content`, `md_path`,
+                        `docx_path` and, in edit mode, `edited_sections`, or an error message.
     """
     job_folder_path = state.get("job_folder_path")
     if not job_folder_path:
         return {"error": "Error: `job_folder_path` is missing from the state."}
 
     try:
-        # 1. Generate Markdown content
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.7)
-        messages = [
-            SystemMessage(content=prompts.GOOGLE_DOC_PROPOSAL_SYSTEM_PROMPT),
-            HumanMessage(content=job_description),
-        ]
-        if change_request:
-            messages.append(HumanMessage(content=f"Please incorporate the following changes: {change_request}"))
-
-        markdown_content = llm.invoke(messages).content
-        if (markdown_content.startswith("```markdown") or markdown_content.startswith("\n```markdown") or markdown_content.startswith("```") or markdown_content.startswith("\n```")) and markdown_content.endswith("```"):
-            markdown_content = markdown_content[11:-3].strip()
-        
+        # 1. Generate Markdown content, or edit the affected sections of the previous version
+        previous_markdown = state.get("google_doc_markdown")
+        edited_sections = None
+        # For a near-duplicate of a past job, the sections of that job's proposal are edited
+        baseline = baseline_artifact(state, "google_doc_markdown") if not change_request and not regenerate else None
+        if baseline:
+            markdown_content, edited_sections = _edit_markdown(baseline, job_description, prompts.SIMILAR_JOB_CHANGE_REQUEST)
+        elif previous_markdown and change_request and not regenerate:
+            markdown_content, edited_sections = _edit_markdown(previous_markdown, job_description, change_request)
+        else:
+            # For a new job, the diagram is started speculatively while the proposal streams
+            has_diagram = state.get("mermaid_code") or baseline_artifact(state, "mermaid_code")
+            on_text = _speculation_trigger(job_folder_path) if not has_diagram and speculation_enabled() else None
+            markdown_content = _generate_markdown(job_description, change_request, regenerate, on_text=on_text)
+
         # 2. Define local paths and save Markdown
-        timestamp = os.path.basename(job_folder_path)
+        job_id = os.path.basename(job_folder_path)
         google_doc_proposal_path = os.path.join(job_folder_path, "google_doc_proposal")
-        md_path = os.path.join(google_doc_proposal_path, f"proposal_{timestamp}.md")
-        docx_path = os.path.join(google_doc_proposal_path, f"proposal_{timestamp}.docx")
+        md_path = os.path.join(google_doc_proposal_path, f"proposal_{job_id}.md")
+        docx_path = os.path.join(google_doc_proposal_path, f"proposal_{job_id}.docx")
 
-        with open(md_path, "w") as f:
-            f.write(markdown_content)
+        atomic_write(md_path, markdown_content)
         
-        # 3. Convert Markdown to DOCX using pypandoc
-        pypandoc.convert_file(md_path, 'docx', outputfile=docx_path, extra_args=["--from=markdown-auto_identifiers", "-M", "auto-identifiers=false"])
-
-        # 4. Authenticate and build Google Drive service
-        creds = get_google_credentials()
-        drive_service = build("drive", "v3", credentials=creds)
-
-        # 5. Upload the .docx file and convert it to a Google Doc
-        file_metadata = {
-            "name": f"Proposal - Shaheer Akhtar",
-            "mimeType": "application/vnd.google-apps.document"
-        }
-        media = MediaFileUpload(docx_path, mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document", resumable=True)
-        
-        uploaded_file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
-        doc_id = uploaded_file.get("id")
-
-        # 6. Share the document
-        drive_service.permissions().create(fileId=doc_id, body={"type": "anyone", "role": "reader"}).execute()
-
-        doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
-        return {
-            "doc_url": doc_url,
+        # 3. Convert Markdown to DOCX, unless the same Markdown was converted before
+        converter = _docx_converter()
+        cache = get_artifact_cache()
+        cache_key = cache.make_key("docx", markdown_content, converter, *PANDOC_ARGS)
+        if not cache.fetch(cache_key, docx_path):
+            _convert_to_docx(markdown_content, md_path, docx_path, converter)
+            cache.store(cache_key, docx_path)
+
+        # 4. Upload and share the .docx in the background; the URL is filled in when it finishes.
+        # Edits replace the content of the existing Google Doc instead of creating a new one
+        # (a proposal adapted from a similar job always gets a new Google Doc).
+        file_id = state.get("google_doc_id") if edited_sections is not None and not baseline else None
+        upload = get_upload_queue().submit(docx_path, name=DOC_NAME, file_id=file_id)
+
+        result = {
+            "upload_id": upload.id,
             "markdown_content": markdown_content,
             "md_path": md_path,
             "docx_path": docx_path
         }
+        if edited_sections is not None:
+            result["edited_sections"] = edited_sections
+        if baseline:
+            result["baseline_job_id"] = state["similar_job"]["job_id"]
+        return result
 
-    except FileNotFoundError:
-        return {"error": "Error: `credentials.json` not found. Please ensure it is in the root directory."}
     except Exception as e:
         return {"error": f"An error occurred: {e}"}
 
 
 if __name__ == "__main__":
+    import pypandoc
     from dotenv import load_dotenv
     from utils.file_manager import FileStorageManager
     load_dotenv()
@@ -145,4 +239,6 @@ if __name__ == "__main__":
         "state": mock_state,
         "job_description": sample_job_description
     })
-    print(result) 
\ No newline at end of file
+    print(result)
+    if "upload_id" in result:
+        print(get_upload_queue().get(result["upload_id"]).wait())
@@ -1,17 +1,31 @@
+import contextvars
+import logging
 import os
+import re
+import shutil
 import subprocess
 import tempfile
-from datetime import datetime
-from typing import Optional, Dict, Any, Annotated
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Annotated, List, Tuple
 
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 import prompts
 import schemas
+from tools.mermaid_renderer import RENDER_TIMEOUT, MermaidRenderError, RenderServiceUnavailable, get_render_service
+from tools.mermaid_syntax import apply_edits, number_lines, validate_mermaid
+from utils.artifact_cache import get_artifact_cache
+from utils.file_manager import atomic_write
+from utils.llm_clients import invoke_llm
+from utils.metrics import metrics
+from utils.similar_jobs import baseline_artifact
 from langgraph.prebuilt import InjectedState
 
+logger = logging.getLogger(__name__)
+
 # Base directories are now managed by the FileStorageManager
 # CODE_DIR = "mermaid_diagrams/code"
 # IMAGE_DIR = "mermaid_diagrams/images"
@@ -21,56 +35,280 @@ from langgraph.prebuilt import InjectedState
 #    os.makedirs(CODE_DIR, exist_ok=True)
 #    os.makedirs(IMAGE_DIR, exist_ok=True)
 
-def render_mermaid(mermaid_code: str, output_path: str) -> str:
-    """
-    Renders Mermaid diagram code into a PNG image and saves it to a specific path.
+# Model calls allowed to fix syntax errors found by the validator or the renderer.
+MAX_REPAIR_ATTEMPTS = 2
 
-    Args:
-        mermaid_code (str): The Mermaid diagram code to render.
-        output_path (str): The full path to save the output PNG file.
+# How Mermaid reports problems with the diagram code itself; any other render
+# failure is the renderer's, and repairing the code won't fix it.
+SYNTAX_ERROR_MARKERS = ("Parse error", "Lexical error", "Syntax error", "No diagram type detected", "UnknownDiagramError")
 
-    Returns:
-        str: A message indicating success or failure.
-    """
+# The line closing the step-by-step plan in the proposal template.
+WORKFLOW_SUMMARY_LINE = re.compile(r"^So basically\b.*$", re.MULTILINE | re.IGNORECASE)
+
+# Unclaimed speculative diagrams are dropped after this long.
+SPECULATION_TTL_SECONDS = 600
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mermaid-speculation")
+_speculations: Dict[str, Tuple[str, Future, float]] = {}
+_speculation_lock = threading.Lock()
+
+
+class MermaidRendererFailure(Exception):
+    """Raised when the diagram couldn't be rendered for a reason other than its code (no renderer, a crash or a timeout)."""
+
+
+def _render_error(details: str) -> str:
+    """The message for a render failure: an `Error ...` string for syntax errors, otherwise `MermaidRendererFailure`."""
+    if any(marker in details for marker in SYNTAX_ERROR_MARKERS):
+        return f"Error rendering Mermaid diagram.\nStderr: {details}"
+    raise MermaidRendererFailure(details)
+
+
+def _render_with_cli(mermaid_code: str, output_path: str) -> str:
+    """Renders the diagram with a one-shot `mmdc` process."""
     with tempfile.NamedTemporaryFile(mode="w", suffix=".mmd", delete=False) as tmp:
         tmp.write(mermaid_code)
         tmp_path = tmp.name
 
     try:
+        tmp_output_path = f"{tmp_path[:-4]}.png"
         subprocess.run([
             "mmdc",
             "-i", tmp_path,
-            "-o", output_path,
+            "-o", tmp_output_path,
             "-w", "1500",
             "-H", "350",
             "--scale", "1.2"
-        ], check=True, capture_output=True, text=True)
+        ], check=True, capture_output=True, text=True, timeout=RENDER_TIMEOUT)
+        shutil.move(tmp_output_path, output_path)
         return f"Diagram saved to {output_path}"
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        error_message = (
-            "Error rendering Mermaid diagram. Please ensure you have mermaid-cli "
-            "installed (`npm install -g @mermaid-js/mermaid-cli`).\n"
+    except FileNotFoundError as e:
+        raise MermaidRendererFailure(
+            "mermaid-cli is not installed (`npm install -g @mermaid-js/mermaid-cli`). "
             f"Original error: {e}"
         )
-        if isinstance(e, subprocess.CalledProcessError):
-            error_message += f"\nStderr: {e.stderr}"
-        return error_message
+    except subprocess.TimeoutExpired:
+        raise MermaidRendererFailure(f"mmdc did not finish within {RENDER_TIMEOUT:g}s.")
+    except subprocess.CalledProcessError as e:
+        return _render_error(f"{e.stderr or e}")
     finally:
         os.remove(tmp_path)
 
+
+def render_mermaid(mermaid_code: str, output_path: str) -> str:
+    """
+    Renders Mermaid diagram code into a PNG image and saves it to a specific path.
+
+    Identical diagrams are served from the artifact cache. Otherwise it uses the
+    warm render service when it is available and falls back to the one-shot
+    `mmdc` CLI.
+
+    Args:
+        mermaid_code (str): The Mermaid diagram code to render.
+        output_path (str): The full path to save the output PNG file.
+
+    Returns:
+        str: `Diagram saved to ...`, or an `Error ...` message if Mermaid rejected the code.
+
+    Raises:
+        MermaidRendererFailure: If rendering failed for any other reason.
+    """
+    with metrics.stage("render", "mermaid") as record:
+        cache = get_artifact_cache()
+        cache_key = cache.make_key("png", mermaid_code, "1500x350@1.2")
+        if cache.fetch(cache_key, output_path):
+            record["backend"] = "cache"
+            return f"Diagram saved to {output_path}"
+        cache.detach(output_path)
+
+        result = None
+        service = get_render_service()
+        if service is not None:
+            try:
+                service.render(mermaid_code, output_path, width=1500, height=350, scale=1.2)
+                record["backend"] = "service"
+                result = f"Diagram saved to {output_path}"
+            except MermaidRenderError as e:
+                if any(marker in str(e) for marker in SYNTAX_ERROR_MARKERS):
+                    record["status"] = "error"
+                    return _render_error(str(e))
+                # The service failed for another reason (e.g. the browser crashed); try the CLI.
+                logger.warning("Render service failed: %s", e)
+            except RenderServiceUnavailable:
+                pass
+
+        if result is None:
+            record["backend"] = "cli"
+            try:
+                result = _render_with_cli(mermaid_code, output_path)
+            except MermaidRendererFailure:
+                record["status"] = "error"
+                raise
+        if "Error" in result:
+            record["status"] = "error"
+        else:
+            cache.store(cache_key, output_path)
+        return result
+
+def _strip_code_fences(mermaid_code: str) -> str:
+    """Removes the markdown code block the model sometimes wraps the code in."""
+    if mermaid_code.strip().startswith("```mermaid"):
+        return mermaid_code.strip()[10:-3].strip()
+    if mermaid_code.strip().startswith("```"):
+        return mermaid_code.strip()[3:-3].strip()
+    return mermaid_code
+
+
+def _validate(mermaid_code: str) -> List[str]:
+    with metrics.stage("validate", "mermaid") as record:
+        errors = validate_mermaid(mermaid_code)
+        record["errors"] = len(errors)
+    return errors
+
+
+def _request_edits(mermaid_code: str, instruction: str, regenerate: bool = False) -> Optional[str]:
+    """
+    Asks the model for search-and-replace edits to `mermaid_code` and applies them.
+
+    Returns:
+        Optional[str]: The edited code, or None if the edits don't match the code.
+    """
+    messages = [
+        SystemMessage(content=prompts.MERMAID_EDIT_SYSTEM_PROMPT),
+        HumanMessage(content=f"Current Mermaid code:\n```\n{number_lines(mermaid_code)}\n```\n\n{instruction}"),
+    ]
+    response = invoke_llm(
+        "generate_mermaid_diagram", messages, "google", "gemini-2.5-pro", temperature=0.2,
+        schema=schemas.MermaidEdits, regenerate=regenerate, artifact="mermaid_code",
+    )
+    return apply_edits(mermaid_code, [(edit.old, edit.new) for edit in response.edits])
+
+
+def _repair(mermaid_code: str, errors: List[str]) -> str:
+    """Asks the model to fix just the reported errors, keeping the code if the fix doesn't apply."""
+    error_list = "\n".join(f"- {error}" for error in errors)
+    repaired = _request_edits(mermaid_code, f"The diagram has these syntax errors:\n{error_list}\n\nFix only these errors.")
+    return repaired if repaired is not None else mermaid_code
+
+
+def _generate(messages: List, regenerate: bool = False) -> str:
+    return _strip_code_fences(invoke_llm(
+        "generate_mermaid_diagram", messages, "google", "gemini-2.5-pro", temperature=0.7,
+        regenerate=regenerate, artifact="mermaid_code",
+    ))
+
+
+def _validate_and_repair(mermaid_code: str) -> (str, int):
+    """Catches syntax errors locally before spending a render on them. Returns the code and the number of repairs."""
+    repairs = 0
+    errors = _validate(mermaid_code)
+    while errors and repairs < MAX_REPAIR_ATTEMPTS:
+        repairs += 1
+        mermaid_code = _repair(mermaid_code, errors)
+        errors = _validate(mermaid_code)
+    return mermaid_code, repairs
+
+
+def speculation_enabled() -> bool:
+    """Speculative diagrams are on unless `MERMAID_SPECULATION=0`."""
+    return os.environ.get("MERMAID_SPECULATION", "1") != "0"
+
+
+def extract_workflow_section(markdown: str, partial: bool = False) -> Optional[str]:
+    """
+    Returns the part of a proposal the diagram visualizes: everything up to and
+    including the "So basically, ..." summary of the step-by-step plan.
+
+    Args:
+        markdown (str): The proposal Markdown, possibly still being streamed.
+        partial (bool): If True, the summary line only counts once it is complete
+            (followed by a new line), since more text may still arrive.
+
+    Returns:
+        Optional[str]: The section, or None if it isn't there (yet).
+    """
+    text = markdown.lstrip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    match = WORKFLOW_SUMMARY_LINE.search(text)
+    if match is None or (partial and match.end() == len(text)):
+        return None
+    return text[:match.end()].strip()
+
+
+def start_speculative_diagram(key: str, workflow_section: str):
+    """
+    Starts generating the diagram for `workflow_section` in the background, so it
+    overlaps with the rest of the Google Doc generation. `generate_mermaid_diagram`
+    picks the result up with the same `key` (the job folder path).
+    """
+    with _speculation_lock:
+        if key in _speculations:
+            return
+        now = time.monotonic()
+        for stale_key in [k for k, (_, _, started_at) in _speculations.items() if now - started_at > SPECULATION_TTL_SECONDS]:
+            del _speculations[stale_key]
+        future = _speculation_pool.submit(
+            contextvars.copy_context().run, lambda: _validate_and_repair(_generate([
+                SystemMessage(content=prompts.MERMAID_DIAGRAM_SYSTEM_PROMPT),
+                HumanMessage(content=workflow_section),
+            ]))[0]
+        )
+        _speculations[key] = (workflow_section, future, now)
+
+
+def _use_speculative_diagram(key: str, workflow_description: Optional[str]) -> Optional[str]:
+    """
+    Returns the speculative diagram started for `key`, if any. If the workflow section
+    changed after the diagram was started, the diagram is reconciled with edits.
+    """
+    with _speculation_lock:
+        speculation = _speculations.pop(key, None)
+    if speculation is None:
+        return None
+
+    workflow_section, future, _ = speculation
+    with metrics.stage("speculation", "mermaid") as record:
+        try:
+            mermaid_code = future.result()
+        except Exception:
+            record["outcome"] = "failed"
+            return None
+
+        final_section = extract_workflow_section(workflow_description or "") or workflow_description
+        if final_section == workflow_section:
+            record["outcome"] = "hit"
+            return mermaid_code
+
+        record["outcome"] = "reconciled"
+        return _request_edits(
+            mermaid_code,
+            f"The proposal was revised after this diagram was drawn. Update the diagram so it matches the final plan:\n```\n{final_section}\n```",
+        )
+
+
 @tool
 def generate_mermaid_diagram(
     state: Annotated[dict, InjectedState],
-    change_request: Optional[str] = None
+    change_request: Optional[str] = None,
+    regenerate: bool = False,
 ) -> Dict[str, Any]:
     """
     Generates or refines a Mermaid diagram based on the google_doc_markdown in the state.
 
-    It saves the Mermaid code and the rendered PNG image to timestamped files.
+    Changes to an existing diagram are applied as small edits to the previous code
+    rather than regenerating it, and so is the diagram of a similar past job. A new
+    diagram started speculatively while the Google Doc was streaming is reused (and
+    reconciled if the plan changed afterwards). The code is checked locally for
+    syntax errors before rendering, and syntax errors (including those Mermaid
+    reports when rendering) trigger a targeted repair.
+
+    It saves the Mermaid code and the rendered PNG image to files named after the job ID.
 
     Args:
         state (Annotated[dict, InjectedState]): The current workflow state, automatically injected.
         change_request (Optional[str]): The user's requested changes to the diagram.
+        regenerate (bool): Set to True only when the user explicitly asks for a fresh version,
+            so a previously cached response is not reused and the whole diagram is redrawn.
 
     Returns:
         Dict[str, Any]: A dictionary containing the `mermaid_code` and `image_path` or an error message.
@@ -82,41 +320,54 @@ def generate_mermaid_diagram(
 
     if not job_folder_path:
          return {"error": "Error: `job_folder_path` is missing from the state."}
+    if not workflow_description and not (previous_mermaid_code and change_request):
+        return {"error": "Error: `google_doc_markdown` is missing from the state. Generate the Google Doc proposal first."}
 
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.7)
+    mermaid_code = None
+    baseline = baseline_artifact(state, "mermaid_code") if not change_request and not regenerate else None
+    if baseline and workflow_description:
+        # For a near-duplicate of a past job, that job's diagram is patched to match the new proposal
+        mermaid_code = _request_edits(baseline, prompts.SIMILAR_JOB_DIAGRAM_REQUEST.format(proposal=workflow_description))
+    elif previous_mermaid_code and change_request and not regenerate:
+        mermaid_code = _request_edits(previous_mermaid_code, f"Here is the requested change: '{change_request}'.")
+    elif not previous_mermaid_code and not change_request and not regenerate:
+        # A diagram may already have been started while the Google Doc was streaming
+        mermaid_code = _use_speculative_diagram(job_folder_path, workflow_description)
 
-    messages = [SystemMessage(content=prompts.MERMAID_DIAGRAM_SYSTEM_PROMPT)]
-    
-    if previous_mermaid_code and change_request:
-        messages.append(
-            HumanMessage(
-                content=f"The user wants to change the diagram. Here was the previous version:\\n```mermaid\\n{previous_mermaid_code}\\n```\\n\\nHere is the requested change: '{change_request}'. Please generate the new, complete Mermaid code."
+    if mermaid_code is None:
+        messages = [SystemMessage(content=prompts.MERMAID_DIAGRAM_SYSTEM_PROMPT)]
+
+        if previous_mermaid_code and change_request:
+            messages.append(
+                HumanMessage(
+                    content=f"The user wants to change the diagram. Here was the previous version:\\n```mermaid\\n{previous_mermaid_code}\\n```\\n\\nHere is the requested change: '{change_request}'. Please generate the new, complete Mermaid code."
+                )
             )
-        )
-    else:
-        messages.append(HumanMessage(content=workflow_description))
-    
-    response = llm.invoke(messages)
-    mermaid_code = response.content
+        else:
+            messages.append(HumanMessage(content=workflow_description))
 
-    # Clean up the code if it's wrapped in markdown code blocks
-    if mermaid_code.strip().startswith("```mermaid"):
-        mermaid_code = mermaid_code.strip()[10:-3].strip()
-    elif mermaid_code.strip().startswith("```"):
-        mermaid_code = mermaid_code.strip()[3:-3].strip()
+        mermaid_code = _generate(messages, regenerate)
+
+    mermaid_code, repairs = _validate_and_repair(mermaid_code)
 
-    # Generate timestamped filename
-    timestamp = os.path.basename(job_folder_path)
+    # Generate filenames named after the job ID (the job folder's name)
+    job_id = os.path.basename(job_folder_path)
     mermaid_diagrams_path = os.path.join(job_folder_path, "mermaid_diagrams")
-    
-    code_path = os.path.join(mermaid_diagrams_path, f"mermaid_code_{timestamp}.md")
-    with open(code_path, "w") as f:
-        f.write(mermaid_code)
-    print(f"Mermaid code saved to {code_path}")
-
-    # Render the image
-    image_path = os.path.join(mermaid_diagrams_path, f"mermaid_image_{timestamp}.png")
-    render_result = render_mermaid(mermaid_code, image_path)
+    code_path = os.path.join(mermaid_diagrams_path, f"mermaid_code_{job_id}.md")
+    image_path = os.path.join(mermaid_diagrams_path, f"mermaid_image_{job_id}.png")
+
+    # Render the image, repairing the code if Mermaid still rejects it
+    while True:
+        atomic_write(code_path, mermaid_code)
+        try:
+            render_result = render_mermaid(mermaid_code, image_path)
+        except MermaidRendererFailure as e:
+            return {"error": f"The diagram code was saved to {code_path}, but it could not be rendered: {e}"}
+        if "Error" not in render_result or repairs >= MAX_REPAIR_ATTEMPTS:
+            break
+        repairs += 1
+        mermaid_code = _repair(mermaid_code, [render_result])
+    logger.info("Mermaid code saved to %s after %d repair(s)", code_path, repairs)
 
     if "Error" in render_result:
         return {"error": render_result}
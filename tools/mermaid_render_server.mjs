@@ -0,0 +1,97 @@
+// Long-lived Mermaid render service used by tools/mermaid_renderer.py.
+//
+// Keeps one headless Chromium warm and renders PNGs over a local HTTP socket,
+// so each diagram costs a page render instead of a full Node + browser cold start.
+//
+// Protocol:
+//   POST /render  {"code": "...", "width": 1500, "height": 350, "scale": 1.2}
+//                 -> 200 image/png bytes, or 400 text/plain with the render error
+//   GET  /health  -> 200 "ok"
+//
+// On startup the chosen port is printed to stdout as a single JSON line:
+//   {"port": 12345}
+//
+// The process exits if the browser disconnects; the Python side restarts it.
+
+import http from "node:http";
+import path from "node:path";
+import { createRequire } from "node:module";
+import { pathToFileURL } from "node:url";
+
+const cliDir = process.env.MERMAID_CLI_DIR;
+const maxConcurrency = parseInt(process.env.MERMAID_RENDER_CONCURRENCY || "4", 10);
+
+const cliEntry = path.join(cliDir, "src", "index.js");
+const { renderMermaid } = await import(pathToFileURL(cliEntry).href);
+const puppeteer = createRequire(cliEntry)("puppeteer");
+
+const browser = await puppeteer.launch({ headless: "new" });
+browser.on("disconnected", () => process.exit(1));
+
+let active = 0;
+const waiting = [];
+
+async function withSlot(fn) {
+  if (active >= maxConcurrency) {
+    await new Promise((resolve) => waiting.push(resolve));
+  }
+  active += 1;
+  try {
+    return await fn();
+  } finally {
+    active -= 1;
+    const next = waiting.shift();
+    if (next) next();
+  }
+}
+
+function readBody(req) {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    req.on("data", (chunk) => chunks.push(chunk));
+    req.on("end", () => resolve(Buffer.concat(chunks).toString("utf8")));
+    req.on("error", reject);
+  });
+}
+
+const server = http.createServer(async (req, res) => {
+  if (req.method === "GET" && req.url === "/health") {
+    res.writeHead(200, { "Content-Type": "text/plain" });
+    res.end("ok");
+    return;
+  }
+  if (req.method !== "POST" || req.url !== "/render") {
+    res.writeHead(404);
+    res.end();
+    return;
+  }
+
+  try {
+    const job = JSON.parse(await readBody(req));
+    const { data } = await withSlot(() =>
+      renderMermaid(browser, job.code, "png", {
+        viewport: {
+          width: job.width || 1500,
+          height: job.height || 350,
+          deviceScaleFactor: job.scale || 1,
+        },
+      })
+    );
+    res.writeHead(200, { "Content-Type": "image/png" });
+    res.end(Buffer.from(data));
+  } catch (err) {
+    res.writeHead(400, { "Content-Type": "text/plain" });
+    res.end(String(err && err.message ? err.message : err));
+  }
+});
+
+server.listen(0, "127.0.0.1", () => {
+  process.stdout.write(JSON.stringify({ port: server.address().port }) + "\n");
+});
+
+process.stdin.on("end", async () => {
+  // The parent process went away; shut down instead of leaking a browser.
+  await browser.close().catch(() => {});
+  process.exit(0);
+});
+process.stdin.resume();
@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from utils.file_manager import atomic_write
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mermaid_render_server.mjs")
+STARTUP_TIMEOUT = float(os.environ.get("MERMAID_RENDER_STARTUP_TIMEOUT", "30"))
+RENDER_TIMEOUT = float(os.environ.get("MERMAID_RENDER_TIMEOUT", "60"))
+# After a failed start, renders go straight to the `mmdc` fallback for this long.
+STARTUP_RETRY_SECONDS = float(os.environ.get("MERMAID_RENDER_STARTUP_RETRY", "300"))
+
+
+class RenderServiceUnavailable(Exception):
+    """Raised when the warm render service cannot be started or reached."""
+
+
+class MermaidRenderError(Exception):
+    """Raised when the render service rejects a diagram (e.g. a syntax error)."""
+
+
+def _find_mermaid_cli_dir() -> Optional[str]:
+    """Locates the globally installed `@mermaid-js/mermaid-cli` package."""
+    configured = os.environ.get("MERMAID_CLI_DIR")
+    if configured:
+        return configured
+    npm = shutil.which("npm")
+    if not npm:
+        return None
+    try:
+        global_root = subprocess.run([npm, "root", "-g"], check=True, capture_output=True, text=True).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    cli_dir = os.path.join(global_root, "@mermaid-js", "mermaid-cli")
+    return cli_dir if os.path.isdir(cli_dir) else None
+
+
+class MermaidRenderService:
+    """
+    Manages a long-lived Node process that keeps a headless browser warm for rendering.
+
+    The process is started lazily on the first render and restarted automatically
+    if it crashes. If it fails to start, the service is considered unavailable for
+    `STARTUP_RETRY_SECONDS`, so renders fall back to `mmdc` right away instead of each
+    waiting for another start. Renders are sent over a local HTTP socket and may run
+    concurrently; the Node side caps how many pages render at the same time.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = concurrency
+        self._process: Optional[subprocess.Popen] = None
+        self._port: Optional[int] = None
+        self._lock = threading.Lock()
+        self._disabled_reason: Optional[str] = None
+        self._startup_error: Optional[str] = None
+        self._retry_start_at = 0.0
+
+    def _start(self):
+        node = shutil.which("node")
+        cli_dir = _find_mermaid_cli_dir()
+        if not node or not cli_dir:
+            self._disabled_reason = "node or @mermaid-js/mermaid-cli not found"
+            raise RenderServiceUnavailable(self._disabled_reason)
+
+        env = {
+            **os.environ,
+            "MERMAID_CLI_DIR": cli_dir,
+            "MERMAID_RENDER_CONCURRENCY": str(self.concurrency),
+        }
+        try:
+            process = subprocess.Popen(
+                [node, SERVER_SCRIPT],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                env=env,
+            )
+        except OSError as e:
+            raise RenderServiceUnavailable(f"Mermaid render service could not be started: {e}")
+
+        # Wait for the server to announce its port without blocking forever.
+        first_line = []
+        reader = threading.Thread(target=lambda: first_line.append(process.stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(STARTUP_TIMEOUT)
+        try:
+            self._port = json.loads(first_line[0])["port"] if first_line else None
+        except (ValueError, KeyError):
+            self._port = None
+        if not self._port:
+            process.kill()
+            raise RenderServiceUnavailable(f"Mermaid render service did not start within {STARTUP_TIMEOUT:g}s.")
+        self._process = process
+
+    def _ensure_running(self) -> int:
+        with self._lock:
+            if self._disabled_reason:
+                raise RenderServiceUnavailable(self._disabled_reason)
+            if self._process is None or self._process.poll() is not None:
+                if time.monotonic() < self._retry_start_at:
+                    raise RenderServiceUnavailable(self._startup_error)
+                try:
+                    self._start()
+                except RenderServiceUnavailable as e:
+                    if not self._disabled_reason:
+                        self._startup_error = f"{e} Not retrying for {STARTUP_RETRY_SECONDS:g}s."
+                        self._retry_start_at = time.monotonic() + STARTUP_RETRY_SECONDS
+                    raise
+            return self._port
+
+    def _post(self, port: int, payload: dict) -> bytes:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/render",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=RENDER_TIMEOUT) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            raise MermaidRenderError(e.read().decode("utf-8", errors="replace"))
+
+    def render(self, mermaid_code: str, output_path: str, width: int = 1500, height: int = 350, scale: float = 1.2):
+        """
+        Renders Mermaid code to a PNG file.
+
+        Raises:
+            RenderServiceUnavailable: If the service cannot be started or reached, even after a restart.
+            MermaidRenderError: If the diagram itself failed to render.
+        """
+        payload = {"code": mermaid_code, "width": width, "height": height, "scale": scale}
+        for attempt in range(2):
+            port = self._ensure_running()
+            try:
+                png = self._post(port, payload)
+                break
+            except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+                # The process may have died mid-request; restart it once and retry.
+                self.stop()
+                if attempt == 1:
+                    raise RenderServiceUnavailable(f"Mermaid render service is unreachable: {e}")
+
+        atomic_write(output_path, png)
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.stdin.close()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+            self._process = None
+            self._port = None
+
+
+_service: Optional[MermaidRenderService] = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> Optional[MermaidRenderService]:
+    """
+    Returns the process-wide render service, or None if it is disabled.
+
+    Set `MERMAID_RENDER_SERVICE=0` to always use the one-shot `mmdc` CLI.
+    """
+    global _service
+    if os.environ.get("MERMAID_RENDER_SERVICE", "1") == "0":
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = MermaidRenderService(concurrency=int(os.environ.get("MERMAID_RENDER_CONCURRENCY", "4")))
+            atexit.register(_service.stop)
+        return _service
@@ -0,0 +1,216 @@
+"""
+A fast, local syntax check for the Mermaid flowcharts the agent generates, and a
+helper to apply line edits to existing Mermaid code.
+
+The validator covers the flowchart grammar the prompts ask for (`graph`/`flowchart`,
+subgraphs, node shapes, labelled links, `classDef`/`style` statements and the
+`%%{init}%%` directive). It catches the mistakes that make `mmdc` fail, like unquoted
+labels containing brackets, unbalanced quotes or a missing `end`, without starting a
+browser. Other diagram types only get the generic bracket and quote checks.
+"""
+import re
+from typing import List, Optional, Tuple
+
+FLOWCHART_HEADER = re.compile(r"^(graph|flowchart)(\s+(TB|TD|BT|RL|LR))?\s*;?$")
+OTHER_DIAGRAM_HEADER = re.compile(
+    r"^(sequenceDiagram|classDiagram|stateDiagram(-v2)?|erDiagram|journey|gantt|pie|mindmap|timeline|gitGraph|quadrantChart|sankey-beta|xychart-beta|block-beta)\b"
+)
+STATEMENT_KEYWORDS = re.compile(r"^(classDef|class|style|linkStyle|click|direction|accTitle|accDescr)\b")
+# IDs may contain `-` and `.`, but not the start of a link (`--`, `-.`, `->`, `.-`), so `A-->B` splits into `A` and `B`.
+NODE_ID = re.compile(r"[A-Za-z0-9_](?:[A-Za-z0-9_]|-(?![-.>])|\.(?!-))*")
+CLASS_SUFFIX = re.compile(r":::[A-Za-z0-9_](?:[A-Za-z0-9_]|-(?![-.>]))*")
+# `--> |text|`, `-.->`, `==>`, `---`, `<-->`, `--o`, `--x`, `~~~` ...
+LINK = re.compile(r"[<xo]?(-{2,}|={2,}|-\.+-|~{3,})[>xo]?(\s*\|[^|]*\|)?")
+# `-- text -->`, `== text ==>`, `-. text .->`
+TEXT_LINK = re.compile(r"(--|==|-\.)\s+(\"[^\"]*\"|[^\"]+?)\s+(-{2,}|={2,}|\.-+)[>xo]?")
+# Node shapes, longest opening delimiter first.
+SHAPES = [
+    ("(((", ")))"), ("([", "])"), ("[[", "]]"), ("[(", ")]"), ("((", "))"), ("{{", "}}"),
+    ("[/", "/]"), ("[/", "\\]"), ("[\\", "\\]"), ("[\\", "/]"),
+    ("[", "]"), ("(", ")"), ("{", "}"), (">", "]"),
+]
+LABEL_SPECIAL_CHARS = set('[](){}"')
+
+
+class _LineError(Exception):
+    pass
+
+
+def _parse_label(line: str, pos: int, close: str) -> int:
+    """Parses a node label starting at `pos` and returns the position after `close`."""
+    if line.startswith('"', pos):
+        end_quote = line.find('"', pos + 1)
+        if end_quote == -1:
+            raise _LineError("unterminated quoted label")
+        pos = end_quote + 1
+        if not line.startswith(close, pos):
+            raise _LineError(f"expected `{close}` after the quoted label")
+        return pos + len(close)
+
+    end = line.find(close, pos)
+    if end == -1:
+        raise _LineError(f"missing `{close}` to close the node label")
+    text = line[pos:end]
+    if LABEL_SPECIAL_CHARS & set(text):
+        raise _LineError(f"label `{text.strip()}` contains brackets or quotes; wrap it in double quotes")
+    return end + len(close)
+
+
+def _parse_node(line: str, pos: int) -> int:
+    match = NODE_ID.match(line, pos)
+    if not match:
+        raise _LineError(f"expected a node ID at `{line[pos:pos + 20]}`")
+    if match.group(0) == "end":
+        raise _LineError("`end` can't be used as a node ID")
+    pos = match.end()
+    error = None
+    for open_delimiter, close_delimiter in SHAPES:
+        if not line.startswith(open_delimiter, pos):
+            continue
+        try:
+            pos = _parse_label(line, pos + len(open_delimiter), close_delimiter)
+            error = None
+            break
+        except _LineError as e:
+            # Another shape with the same opening delimiter may still match.
+            error = e
+    if error is not None:
+        raise error
+    class_suffix = CLASS_SUFFIX.match(line, pos)
+    return class_suffix.end() if class_suffix else pos
+
+
+def _skip_spaces(line: str, pos: int) -> int:
+    while pos < len(line) and line[pos] in " \t":
+        pos += 1
+    return pos
+
+
+def _parse_chain(line: str):
+    """Parses `A[..] --> B & C -- text --> D` style statements."""
+    pos = 0
+    while True:
+        pos = _skip_spaces(line, _parse_node(line, _skip_spaces(line, pos)))
+        if pos >= len(line):
+            return
+        if line[pos] == "&":
+            pos += 1
+            continue
+        link = TEXT_LINK.match(line, pos) or LINK.match(line, pos)
+        if not link:
+            raise _LineError(f"expected a link (like `-->`) at `{line[pos:pos + 20]}`")
+        pos = link.end()
+
+
+def _check_balance(line: str) -> Optional[str]:
+    if line.count('"') % 2:
+        return "unbalanced double quotes"
+    unquoted = re.sub(r'"[^"]*"', "", line)
+    for open_char, close_char in ("[]", "()", "{}"):
+        if unquoted.count(open_char) != unquoted.count(close_char):
+            return f"unbalanced `{open_char}{close_char}`"
+    return None
+
+
+def validate_mermaid(code: str) -> List[str]:
+    """
+    Checks Mermaid code for syntax errors.
+
+    Returns:
+        List[str]: One message per problem, prefixed with its line number. Empty if
+                   the code looks valid.
+    """
+    errors = []
+    lines = code.splitlines()
+    in_directive = False
+    header_seen = False
+    is_flowchart = False
+    subgraph_lines = []
+
+    for number, raw_line in enumerate(lines, start=1):
+        line = raw_line.strip()
+        if in_directive:
+            in_directive = "}%%" not in line
+            continue
+        if line.startswith("%%{"):
+            in_directive = "}%%" not in line
+            continue
+        if not line or line.startswith("%%"):
+            continue
+
+        if not header_seen:
+            header_seen = True
+            if FLOWCHART_HEADER.match(line):
+                is_flowchart = True
+                continue
+            if OTHER_DIAGRAM_HEADER.match(line):
+                continue
+            errors.append(f"line {number}: expected a diagram type like `graph TD`, found `{line[:40]}`")
+            continue
+
+        if not is_flowchart:
+            problem = _check_balance(line)
+            if problem:
+                errors.append(f"line {number}: {problem}")
+            continue
+
+        for statement in (s.strip() for s in re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', line)):
+            if not statement:
+                continue
+            if statement.startswith("subgraph"):
+                subgraph_lines.append(number)
+                problem = _check_balance(statement)
+                if problem:
+                    errors.append(f"line {number}: {problem}")
+            elif statement == "end":
+                if subgraph_lines:
+                    subgraph_lines.pop()
+                else:
+                    errors.append(f"line {number}: `end` without a matching `subgraph`")
+            elif STATEMENT_KEYWORDS.match(statement):
+                continue
+            else:
+                try:
+                    _parse_chain(statement)
+                except _LineError as e:
+                    errors.append(f"line {number}: {e}")
+
+    if in_directive:
+        errors.append("the `%%{init: ...}%%` directive is not closed")
+    if not header_seen:
+        errors.append("the diagram is empty")
+    for number in subgraph_lines:
+        errors.append(f"line {number}: `subgraph` is never closed with `end`")
+    return errors
+
+
+def number_lines(code: str) -> str:
+    """Prefixes every line with its number, for prompts that refer to lines."""
+    return "\n".join(f"{number:>3} | {line}" for number, line in enumerate(code.splitlines(), start=1))
+
+
+def apply_edits(code: str, edits: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    Applies search-and-replace edits to Mermaid code. Each edit is `(old, new)`, where
+    `old` is one or more consecutive lines of the code (compared without surrounding
+    whitespace); an empty `old` appends `new` at the end.
+
+    Returns:
+        Optional[str]: The edited code, or None if an `old` block can't be found.
+    """
+    lines = code.splitlines()
+    for old, new in edits:
+        new_lines = new.splitlines()
+        old_lines = [l.strip() for l in old.splitlines() if l.strip()]
+        if not old_lines:
+            lines.extend(new_lines)
+            continue
+        stripped = [l.strip() for l in lines]
+        start = next(
+            (i for i in range(len(lines) - len(old_lines) + 1) if stripped[i:i + len(old_lines)] == old_lines),
+            None,
+        )
+        if start is None:
+            return None
+        lines[start:start + len(old_lines)] = new_lines
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_CACHE_DIR = os.path.join("generated_content", ".artifact_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Temporary files this old were left behind by a crashed `store` and are removed on load.
+STALE_TMP_SECONDS = 3600
+
+
+class ArtifactCache:
+    """
+    A content-addressed, size-bounded on-disk cache for rendered artifacts.
+
+    Entries are keyed by a hash of everything that determines the output (the
+    source content plus the rendering options), so re-rendering the same Mermaid
+    code or converting the same Markdown becomes a file link instead of a
+    subprocess. When the cache grows past `max_bytes`, the least recently used
+    entries are evicted. File modification times double as the LRU order, so the
+    order survives restarts.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            if name.endswith(".tmp"):
+                # Never an entry; another process may still be writing a recent one.
+                if time.time() - stat.st_mtime > STALE_TMP_SECONDS:
+                    self.detach(path)
+                continue
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(kind: str, *parts: str) -> str:
+        """Builds a cache key from an artifact kind (used as the file extension) and its inputs."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return f"{digest.hexdigest()}.{kind}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def detach(path: str):
+        """
+        Removes `path` if it exists.
+
+        Cache hits may hard-link the destination to the cached file, so callers
+        must detach a destination before writing to it in place.
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """
+        Materializes a cached artifact at `dest_path`.
+
+        Returns:
+            bool: True on a cache hit, False if the artifact has to be produced.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+        cached_path = self._path(key)
+        self.detach(dest_path)
+        try:
+            os.link(cached_path, dest_path)
+        except OSError:
+            try:
+                shutil.copyfile(cached_path, dest_path)
+            except FileNotFoundError:
+                # Evicted or removed by another process in the meantime.
+                with self._lock:
+                    self._total_bytes -= self._entries.pop(key, 0)
+                    self._hits -= 1
+                    self._misses += 1
+                return False
+        os.utime(cached_path)
+        return True
+
+    def store(self, key: str, src_path: str):
+        """Copies a freshly produced artifact into the cache and evicts old entries if needed."""
+        cached_path = self._path(key)
+        tmp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, cached_path)
+        size = os.path.getsize(cached_path)
+
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._evictions += 1
+            self.detach(self._path(key))
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[ArtifactCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Returns the process-wide artifact cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArtifactCache()
+        return _cache
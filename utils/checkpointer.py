@@ -0,0 +1,64 @@
+import os
+import sqlite3
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("generated_content", "checkpoints.sqlite")
+
+
+class PruningSqliteSaver(SqliteSaver):
+    """A `SqliteSaver` that can drop a thread's older checkpoints."""
+
+    def prune(self, thread_id: str, keep_last: int) -> int:
+        """
+        Deletes all but the `keep_last` most recent checkpoints of a thread, along with
+        their pending writes. Checkpoint IDs are time-ordered, so sorting them is enough.
+
+        Returns:
+            int: The number of checkpoints deleted.
+        """
+        keep_last = max(1, keep_last)
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM checkpoints
+                WHERE thread_id = ? AND checkpoint_id NOT IN (
+                    SELECT checkpoint_id FROM checkpoints
+                    WHERE thread_id = ? ORDER BY checkpoint_id DESC LIMIT ?
+                )
+                """,
+                (thread_id, thread_id, keep_last),
+            )
+            deleted = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM writes
+                WHERE thread_id = ? AND checkpoint_id NOT IN (
+                    SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?
+                )
+                """,
+                (thread_id, thread_id),
+            )
+        return deleted
+
+
+def create_checkpointer(path: str = None):
+    """
+    Creates the workflow's checkpointer.
+
+    By default thread state is stored in a SQLite database in WAL mode, so it survives
+    restarts and can be resumed later. Set `CHECKPOINTER=memory` to keep it in-process.
+
+    Args:
+        path (str): The SQLite file. Defaults to `CHECKPOINT_DB` or `generated_content/checkpoints.sqlite`.
+    """
+    if os.environ.get("CHECKPOINTER", "sqlite").lower() == "memory":
+        return MemorySaver()
+
+    path = path or os.environ.get("CHECKPOINT_DB", DEFAULT_CHECKPOINT_PATH)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return PruningSqliteSaver(conn)
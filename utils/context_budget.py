@@ -0,0 +1,112 @@
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Tool outputs from earlier turns longer than this are replaced by a short reference.
+MAX_INLINE_TOOL_OUTPUT_CHARS = 500
+
+# The state keys holding the latest version of each tool's artifact.
+TOOL_ARTIFACT_KEYS = {
+    "generate_cover_letter": "proposal",
+    "generate_google_doc_proposal": "google_doc_markdown",
+    "generate_mermaid_diagram": "mermaid_code",
+}
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """A rough token count (about 4 characters per token) used when no tokenizer is available."""
+    return sum(len(str(m.content)) // 4 + 4 for m in messages)
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Splits the history into turns, each starting at a user message."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _compact_turn(turn: List[BaseMessage]) -> List[BaseMessage]:
+    """Replaces large tool outputs in a finished turn with references to the state."""
+    tool_names = {
+        tool_call["id"]: tool_call["name"]
+        for message in turn if isinstance(message, AIMessage)
+        for tool_call in message.tool_calls
+    }
+    compacted = []
+    for message in turn:
+        if isinstance(message, ToolMessage) and len(str(message.content)) > MAX_INLINE_TOOL_OUTPUT_CHARS:
+            tool_name = tool_names.get(message.tool_call_id, "tool")
+            artifact_key = TOOL_ARTIFACT_KEYS.get(tool_name, "artifact")
+            message = ToolMessage(
+                content=f"[Output of `{tool_name}` omitted ({len(str(message.content))} chars). "
+                        f"The latest version is kept in the workflow state as `{artifact_key}`.]",
+                tool_call_id=message.tool_call_id,
+            )
+        compacted.append(message)
+    return compacted
+
+
+def _artifact_summary(state: Dict) -> Optional[SystemMessage]:
+    """Describes the current artifacts so compacted turns don't lose what the user needs to see."""
+    lines = []
+    if state.get("proposal"):
+        lines.append(f"Current cover letter:\n```\n{state['proposal']}\n```")
+    if state.get("google_doc_url"):
+        lines.append(f"Current Google Doc URL: {state['google_doc_url']}")
+    if state.get("mermaid_image_path"):
+        lines.append(f"Current diagram image: {state['mermaid_image_path']}")
+    if not lines:
+        return None
+    return SystemMessage(content="Current artifacts (from earlier turns):\n\n" + "\n\n".join(lines))
+
+
+def build_context(
+    system_prompt: str,
+    history: List[BaseMessage],
+    state: Dict,
+    max_tokens: int,
+    count_tokens: Callable[[List[BaseMessage]], int] = estimate_tokens,
+) -> List[BaseMessage]:
+    """
+    Builds the orchestrator's prompt within a token budget.
+
+    The layout is kept stable so provider-side prefix caching applies across hops:
+    the static system prompt comes first, followed by the history (where earlier turns
+    are compacted the same way on every hop), and anything that changes between hops,
+    like the current artifacts, goes last. Finished turns have their large tool outputs
+    replaced by references to the state, and the oldest turns are dropped while the
+    prompt is over `max_tokens`. The first user message (the job description, which
+    every tool call needs) is never dropped: the turns after it go first, then the
+    rest of its own turn. The current turn is always kept in full.
+
+    Returns:
+        List[BaseMessage]: The messages to send to the orchestrator.
+    """
+    turns = _split_turns(history)
+    earlier_turns = [_compact_turn(turn) for turn in turns[:-1]]
+    current_turn = turns[-1] if turns else []
+    system_message = SystemMessage(content=system_prompt)
+
+    def assemble() -> List[BaseMessage]:
+        tail = []
+        if earlier_turns:
+            summary = _artifact_summary(state)
+            if summary is not None:
+                tail.append(summary)
+        return [system_message] + [m for turn in earlier_turns for m in turn] + current_turn + tail
+
+    messages = assemble()
+    while earlier_turns and count_tokens(messages) > max_tokens:
+        if not isinstance(earlier_turns[0][0], HumanMessage):
+            earlier_turns.pop(0)
+        elif len(earlier_turns) > 1:
+            earlier_turns.pop(1)
+        elif len(earlier_turns[0]) > 1:
+            earlier_turns[0] = earlier_turns[0][:1]
+        else:
+            break
+        messages = assemble()
+    return messages
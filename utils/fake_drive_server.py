@@ -0,0 +1,122 @@
+"""
+A minimal, in-memory stand-in for the Google Drive v3 API.
+
+It implements just the calls the agent makes (multipart `files.create`, `files.update`
+and `permissions.create`) so uploads can be exercised locally without network access:
+
+    python -m utils.fake_drive_server --port 8765 --latency 0.2 --fail-first 1
+    GOOGLE_DRIVE_API_ENDPOINT=http://127.0.0.1:8765 python3 main.py
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeDriveServer:
+    """
+    Runs the fake Drive API on a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one).
+        latency (float): Seconds added to every request.
+        fail_first (int): Number of initial requests answered with an error, to exercise retries.
+        fail_status (int): The HTTP status of those errors. A 429 comes with `Retry-After: 0`.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_first: int = 0, fail_status: int = 503):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.files = {}
+        self.permissions = {}
+        self.request_count = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeDriveServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: dict, headers: Optional[dict] = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(server.latency)
+                with server._lock:
+                    server.request_count += 1
+                    if server.request_count <= server.fail_first:
+                        status = server.fail_status
+                        headers = {"Retry-After": "0"} if status == 429 else None
+                        return self._reply(status, {"error": {"code": status, "message": "Backend Error"}}, headers)
+
+                path = self.path.split("?", 1)[0]
+                if self.command == "POST" and path == "/upload/drive/v3/files":
+                    with server._lock:
+                        file_id = f"fake-doc-{next(server._ids)}"
+                        server.files[file_id] = len(body)
+                    return self._reply(200, {"id": file_id})
+
+                match = re.fullmatch(r"/upload/drive/v3/files/([^/]+)", path)
+                if self.command == "PATCH" and match:
+                    with server._lock:
+                        if match.group(1) not in server.files:
+                            return self._reply(404, {"error": {"code": 404, "message": "File not found"}})
+                        server.files[match.group(1)] = len(body)
+                    return self._reply(200, {"id": match.group(1)})
+
+                match = re.fullmatch(r"/drive/v3/files/([^/]+)/permissions", path)
+                if self.command == "POST" and match:
+                    with server._lock:
+                        server.permissions.setdefault(match.group(1), []).append(json.loads(body or b"{}"))
+                    return self._reply(200, {"id": "anyoneWithLink"})
+
+                self._reply(404, {"error": {"code": 404, "message": f"Unknown endpoint {self.command} {path}"}})
+
+            do_POST = _handle
+            do_PATCH = _handle
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake Google Drive API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    fake = FakeDriveServer(port=args.port, latency=args.latency, fail_first=args.fail_first, fail_status=args.fail_status)
+    print(f"Fake Google Drive API listening on {fake.url}")
+    fake._server.serve_forever()
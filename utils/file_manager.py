@@ -1,47 +1,168 @@
+import json
 import os
+import secrets
+import threading
+import time
 from datetime import datetime
+from typing import List, Optional, Union
+
+from utils.metrics import metrics
+
+INDEX_FILE_NAME = "index.jsonl"
+
+_CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ulid_lock = threading.Lock()
+_last_ulid = (0, 0)
+_index_lock = threading.Lock()
+
+
+def new_job_id() -> str:
+    """
+    Returns a new ULID: 26 characters, sortable by creation time and unique across
+    jobs started in the same millisecond (the random part is incremented in that case).
+    """
+    global _last_ulid
+    with _ulid_lock:
+        timestamp_ms = int(time.time() * 1000)
+        last_ms, last_random = _last_ulid
+        if timestamp_ms <= last_ms:
+            timestamp_ms, randomness = last_ms, last_random + 1
+        else:
+            randomness = secrets.randbits(80)
+        _last_ulid = (timestamp_ms, randomness)
+
+    value = (timestamp_ms << 80) | (randomness & ((1 << 80) - 1))
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def atomic_write(path: str, content: Union[str, bytes]):
+    """
+    Writes a file atomically: the content goes to a temporary file in the same
+    directory, which then replaces `path`. Readers never see a partial file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with metrics.stage("file_write", os.path.splitext(path)[1] or "file", bytes=len(content)):
+        try:
+            with open(tmp_path, mode) as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
 
 class FileStorageManager:
     """
     Manages the file storage for generated proposal artifacts.
 
-    This class handles the creation of a unique, timestamped directory for each
-    job proposal session. It provides a centralized way to get paths for various
+    This class handles the creation of a unique directory for each job proposal
+    session, named after a time-ordered job ID (a ULID) that also serves as the
+    LangGraph thread ID. It provides a centralized way to get paths for various
     files like the job description, cover letter, and proposals, ensuring all
-
     artifacts for a single run are stored together in an organized manner.
+
+    Every job is recorded in `<base_dir>/index.jsonl`, so jobs can be listed and
+    looked up without scanning the whole tree.
     """
-    def __init__(self, base_dir="generated_content"):
-        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.job_folder_path = os.path.join(base_dir, self.timestamp)
+    def __init__(self, base_dir="generated_content", job_id: Optional[str] = None):
+        """
+        Args:
+            base_dir (str): The folder holding all job folders.
+            job_id (Optional[str]): The ID of an existing job to open. If omitted, a new
+                job ID is generated and its folder is created.
+        """
+        self.base_dir = base_dir
+        if job_id is not None:
+            self._set_paths(job_id)
+            return
+
+        while True:
+            self._set_paths(new_job_id())
+            try:
+                self._create_directories()
+                break
+            except FileExistsError:
+                # Another process created the same ID; try a new one.
+                continue
+        self.created_at = datetime.now().isoformat(timespec="seconds")
+        self._append_to_index({"job_id": self.job_id, "created_at": self.created_at, "job_folder_path": self.job_folder_path})
+
+    def _set_paths(self, job_id: str):
+        self.job_id = job_id
+        self.job_folder_path = os.path.join(self.base_dir, job_id)
         self.google_doc_proposal_path = os.path.join(self.job_folder_path, "google_doc_proposal")
         self.mermaid_diagrams_path = os.path.join(self.job_folder_path, "mermaid_diagrams")
-        self._create_directories()
 
     def _create_directories(self):
-        """Creates the necessary directories for the job."""
-        os.makedirs(self.google_doc_proposal_path, exist_ok=True)
-        os.makedirs(self.mermaid_diagrams_path, exist_ok=True)
-        
+        """Creates the necessary directories for the job, failing if the job folder already exists."""
+        os.makedirs(self.base_dir, exist_ok=True)
+        os.mkdir(self.job_folder_path)
+        os.mkdir(self.google_doc_proposal_path)
+        os.mkdir(self.mermaid_diagrams_path)
+
+    def _append_to_index(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with _index_lock:
+            with open(os.path.join(self.base_dir, INDEX_FILE_NAME), "a") as f:
+                f.write(line)
+
     def save_job_description(self, content: str) -> str:
         """Saves the job description to a file."""
-        file_path = os.path.join(self.job_folder_path, f"job_description_{self.timestamp}.txt")
-        with open(file_path, "w") as f:
-            f.write(content)
+        file_path = os.path.join(self.job_folder_path, f"job_description_{self.job_id}.txt")
+        atomic_write(file_path, content)
+        title = next((line.strip() for line in content.splitlines() if line.strip()), "")
+        self._append_to_index({"job_id": self.job_id, "title": title[:120], "job_description_path": file_path})
+        return file_path
+
+    def save_final_response(self, content: str) -> str:
+        """Saves the orchestrator's final response to a file."""
+        file_path = os.path.join(self.job_folder_path, f"final_response_{self.job_id}.txt")
+        atomic_write(file_path, content)
         return file_path
 
     def get_cover_letter_path(self) -> str:
         """Returns the full path for the cover letter file."""
-        return os.path.join(self.job_folder_path, f"cover_letter_{self.timestamp}.txt")
+        return os.path.join(self.job_folder_path, f"cover_letter_{self.job_id}.txt")
 
     def get_google_doc_paths(self) -> (str, str):
         """Returns the full paths for the proposal markdown and docx files."""
-        md_path = os.path.join(self.google_doc_proposal_path, f"proposal_{self.timestamp}.md")
-        docx_path = os.path.join(self.google_doc_proposal_path, f"proposal_{self.timestamp}.docx")
+        md_path = os.path.join(self.google_doc_proposal_path, f"proposal_{self.job_id}.md")
+        docx_path = os.path.join(self.google_doc_proposal_path, f"proposal_{self.job_id}.docx")
         return md_path, docx_path
 
     def get_mermaid_diagram_paths(self) -> (str, str):
         """Returns the full paths for the mermaid code and image files."""
-        code_path = os.path.join(self.mermaid_diagrams_path, f"mermaid_code_{self.timestamp}.md")
-        image_path = os.path.join(self.mermaid_diagrams_path, f"mermaid_image_{self.timestamp}.png")
-        return code_path, image_path 
\ No newline at end of file
+        code_path = os.path.join(self.mermaid_diagrams_path, f"mermaid_code_{self.job_id}.md")
+        image_path = os.path.join(self.mermaid_diagrams_path, f"mermaid_image_{self.job_id}.png")
+        return code_path, image_path
+
+    @staticmethod
+    def list_jobs(base_dir="generated_content") -> List[dict]:
+        """Returns one merged record per job from the index, oldest first."""
+        jobs = {}
+        try:
+            with open(os.path.join(base_dir, INDEX_FILE_NAME), "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A partially written last line.
+                    jobs.setdefault(record["job_id"], {}).update(record)
+        except FileNotFoundError:
+            return []
+        return sorted(jobs.values(), key=lambda job: job["job_id"])
+
+    @classmethod
+    def lookup(cls, job_id: str, base_dir="generated_content") -> Optional["FileStorageManager"]:
+        """Opens an existing job by ID, or returns None if it is not in the index."""
+        if not any(job["job_id"] == job_id for job in cls.list_jobs(base_dir)):
+            return None
+        return cls(base_dir=base_dir, job_id=job_id)
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from utils.file_manager import atomic_write
+
+# If modifying these scopes, delete the file token.json.
+SCOPES = ["https://www.googleapis.com/auth/drive"]
+TOKEN_PATH = "token.json"
+CLIENT_SECRETS_PATH = "credentials.json"
+
+# Refresh the access token this many seconds before it expires.
+REFRESH_MARGIN_SECONDS = 300
+REFRESH_RETRY_SECONDS = 60
+
+
+def _drive_api_endpoint() -> Optional[str]:
+    """
+    Returns `GOOGLE_DRIVE_API_ENDPOINT`, which points the Drive client at another server
+    (e.g. `utils/fake_drive_server.py` for local testing). No OAuth is used in that case.
+    """
+    return os.environ.get("GOOGLE_DRIVE_API_ENDPOINT")
+
+_lock = threading.RLock()
+_credentials: Optional[Credentials] = None
+_refresh_timer: Optional[threading.Timer] = None
+_drive_service = None
+_thread_local = threading.local()
+
+
+def _save_credentials(creds: Credentials):
+    atomic_write(TOKEN_PATH, creds.to_json())
+
+
+def _schedule_refresh(creds: Credentials, delay: Optional[float] = None):
+    """Schedules a background refresh shortly before the access token expires."""
+    global _refresh_timer
+    if not creds.refresh_token:
+        return
+    if delay is None:
+        if not creds.expiry:
+            return
+        delay = (creds.expiry - datetime.utcnow()).total_seconds() - REFRESH_MARGIN_SECONDS
+    if _refresh_timer is not None:
+        _refresh_timer.cancel()
+    _refresh_timer = threading.Timer(max(0.0, delay), _background_refresh)
+    _refresh_timer.daemon = True
+    _refresh_timer.start()
+
+
+def _background_refresh():
+    with _lock:
+        creds = _credentials
+        if creds is None:
+            return
+        try:
+            creds.refresh(Request())
+            _save_credentials(creds)
+        except Exception:
+            # Try again a bit later; callers still refresh on demand if it keeps failing.
+            _schedule_refresh(creds, delay=REFRESH_RETRY_SECONDS)
+            return
+        _schedule_refresh(creds)
+
+
+def get_google_credentials() -> Credentials:
+    """
+    Returns the process-wide user credentials, loading or authorizing them on first use.
+
+    The credentials are cached in memory and refreshed in the background before the
+    access token expires, so concurrent uploads never block on re-authentication.
+    """
+    global _credentials
+    with _lock:
+        creds = _credentials
+        if creds is None and os.path.exists(TOKEN_PATH):
+            creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_PATH, SCOPES)
+                creds = flow.run_local_server(port=0)
+            _save_credentials(creds)
+        if creds is not _credentials:
+            _credentials = creds
+            _schedule_refresh(creds)
+        return creds
+
+
+def get_drive_service():
+    """
+    Returns the process-wide Drive v3 service.
+
+    The service is built once from the discovery document bundled with
+    `google-api-python-client`, so no discovery request is made at runtime. Execute
+    its requests with `execute` to stay thread-safe.
+    """
+    global _drive_service
+    with _lock:
+        endpoint = _drive_api_endpoint()
+        if _drive_service is None and endpoint:
+            document = json.loads(get_static_doc("drive", "v3"))
+            document["rootUrl"] = endpoint.rstrip("/") + "/"
+            document["baseUrl"] = document["rootUrl"] + document["servicePath"]
+            _drive_service = build_from_document(document, http=httplib2.Http())
+        elif _drive_service is None:
+            _drive_service = build(
+                "drive",
+                "v3",
+                credentials=get_google_credentials(),
+                static_discovery=True,
+                cache_discovery=False,
+            )
+        return _drive_service
+
+
+def _thread_http():
+    """Returns an authorized HTTP transport owned by the current thread (httplib2 is not thread-safe)."""
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        if _drive_api_endpoint():
+            http = httplib2.Http()
+        else:
+            http = AuthorizedHttp(get_google_credentials(), http=httplib2.Http())
+        _thread_local.http = http
+    return http
+
+
+def execute(request):
+    """Executes a Drive API request on the calling thread's own HTTP transport."""
+    return request.execute(http=_thread_http())
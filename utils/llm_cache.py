@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+DEFAULT_CACHE_PATH = os.path.join("generated_content", ".llm_cache.sqlite")
+
+# Seconds a cached response stays valid, per tool. None means it never expires and
+# 0 disables caching for that tool.
+DEFAULT_TTLS: Dict[str, Optional[int]] = {
+    "generate_cover_letter": 7 * 24 * 3600,
+    "generate_google_doc_proposal": 7 * 24 * 3600,
+    "generate_mermaid_diagram": 7 * 24 * 3600,
+}
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes message content so cosmetic differences don't defeat the cache."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+class SQLiteBackend:
+    """Stores cached responses in a single SQLite database (WAL mode, safe across threads)."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+
+class DiskBackend:
+    """Stores each cached response as a JSON file in a directory."""
+
+    def __init__(self, path: str = os.path.join("generated_content", ".llm_cache")):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key: str):
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry["value"], entry["created_at"]
+
+    def set(self, key: str, value: str):
+        file_path = os.path.join(self.path, f"{key}.json")
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"value": value, "created_at": time.time()}, f)
+        os.replace(tmp_path, file_path)
+
+
+class LLMResponseCache:
+    """
+    Memoizes LLM responses for retried, repeated or re-run tool calls.
+
+    The key combines the model, the temperature, the output schema, a hash of the
+    system prompt and the normalized content of every other message.
+    """
+
+    def __init__(self, backend, ttls: Optional[Dict[str, Optional[int]]] = None):
+        self.backend = backend
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: List[BaseMessage], schema_name: str = "") -> str:
+        system_prompt = "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+        payload = {
+            "model": model,
+            "temperature": temperature,
+            "schema": schema_name,
+            "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            "messages": [
+                [m.type, normalize_text(str(m.content))] for m in messages if not isinstance(m, SystemMessage)
+            ],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _count(self, tool: str, outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(tool, {"hits": 0, "misses": 0, "bypassed": 0})
+            counters[outcome] += 1
+
+    def get(self, tool: str, key: str, bypass: bool = False) -> Optional[str]:
+        """Returns the cached response, or None on a miss, an expired entry or a bypass."""
+        ttl = self.ttls.get(tool)
+        if bypass or ttl == 0:
+            self._count(tool, "bypassed")
+            return None
+        row = self.backend.get(key)
+        if row is None or (ttl is not None and time.time() - row[1] > ttl):
+            self._count(tool, "misses")
+            return None
+        self._count(tool, "hits")
+        return row[0]
+
+    def set(self, tool: str, key: str, value: str):
+        if self.ttls.get(tool) == 0:
+            return
+        self.backend.set(key, value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns hit/miss/bypass counters per tool."""
+        with self._lock:
+            return {tool: dict(counters) for tool, counters in self._counters.items()}
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the process-wide response cache, or None if caching is disabled.
+
+    Controlled by `LLM_CACHE` (`sqlite` by default, `disk`, or `off`).
+    """
+    global _cache
+    backend_name = os.environ.get("LLM_CACHE", "sqlite").lower()
+    if backend_name in ("off", "0", "false"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            backend = DiskBackend() if backend_name == "disk" else SQLiteBackend()
+            _cache = LLMResponseCache(backend)
+        return _cache
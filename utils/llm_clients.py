@@ -0,0 +1,324 @@
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from langchain_core.messages import BaseMessage
+from langchain_core.utils.json import parse_partial_json
+from langgraph.config import get_stream_writer
+from pydantic import BaseModel
+
+from utils import rate_limit
+from utils.context_budget import estimate_tokens
+from utils.llm_cache import get_llm_cache
+from utils.llm_router import AttemptCancelled, get_router
+from utils.metrics import metrics
+
+# Connection pool limits for the shared HTTP clients. They can be overridden with
+# environment variables or with `configure_pool` before the first client is built.
+POOL_LIMITS = {
+    "max_connections": int(os.environ.get("LLM_MAX_CONNECTIONS", "20")),
+    "max_keepalive_connections": int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    "keepalive_expiry": float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60")),
+}
+
+# Output tokens reserved from the tokens-per-minute budget before a call starts;
+# the limiter is corrected with the real usage once the response is complete.
+EXPECTED_OUTPUT_TOKENS = 1500
+
+_lock = threading.RLock()
+_clients: Dict[Tuple[str, str, float, Optional[Type[BaseModel]]], Any] = {}
+_http_clients: Dict[str, Any] = {}
+_client_factory: Optional[Callable[[str, str, float], Any]] = None
+
+
+def configure_pool(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+):
+    """
+    Updates the connection pool limits used by the shared HTTP clients.
+
+    Clients that were already built keep their pools, so this should be called at
+    startup, before the first `get_chat_model` call.
+    """
+    with _lock:
+        if max_connections is not None:
+            POOL_LIMITS["max_connections"] = max_connections
+        if max_keepalive_connections is not None:
+            POOL_LIMITS["max_keepalive_connections"] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            POOL_LIMITS["keepalive_expiry"] = keepalive_expiry
+
+
+def _get_http_client(kind: str):
+    """Returns the process-wide keep-alive HTTP client (`sync` or `async`)."""
+    with _lock:
+        if kind not in _http_clients:
+            import httpx
+
+            limits = httpx.Limits(**POOL_LIMITS)
+            if kind == "async":
+                _http_clients[kind] = httpx.AsyncClient(limits=limits, timeout=None)
+            else:
+                _http_clients[kind] = httpx.Client(limits=limits, timeout=None)
+        return _http_clients[kind]
+
+
+def set_client_factory(factory: Optional[Callable[[str, str, float], Any]]):
+    """
+    Replaces how chat models are built, e.g. with local fakes for benchmarks.
+
+    `factory(provider, model, temperature)` must return a chat model. Pass None to
+    restore the real providers. Already built clients are discarded.
+    """
+    global _client_factory
+    with _lock:
+        _client_factory = factory
+        _clients.clear()
+
+
+def _build_chat_model(provider: str, model: str, temperature: float):
+    if _client_factory is not None:
+        return _client_factory(provider, model, temperature)
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            http_client=_get_http_client("sync"),
+            http_async_client=_get_http_client("async"),
+            stream_usage=True,
+            # 429s are retried by the shared rate limiter, which also reads the
+            # `x-ratelimit-*` headers to slow down before the quota runs out.
+            max_retries=0,
+            include_response_headers=True,
+        )
+    if provider == "google":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # The Gemini client keeps its own channel, which is reused as long as the
+        # model object is.
+        return ChatGoogleGenerativeAI(model=model, temperature=temperature, max_retries=0)
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def get_chat_model(
+    provider: str,
+    model: str,
+    temperature: float = 0.0,
+    schema: Optional[Type[BaseModel]] = None,
+):
+    """
+    Returns a shared chat model client, building it on first use.
+
+    Clients are keyed by (provider, model, temperature, output schema), so every
+    caller asking for the same configuration reuses the same connection pool and,
+    for structured output, the same schema binding.
+
+    Args:
+        provider (str): Either `openai` or `google`.
+        model (str): The provider's model name, e.g. `gpt-4o`.
+        temperature (float): The sampling temperature.
+        schema (Optional[Type[BaseModel]]): If given, the client is bound to `schema` as a
+            forced tool call, whose arguments `invoke_llm` parses into the schema. Unlike
+            `with_structured_output`, this keeps the raw chunks available for streaming.
+
+    Returns:
+        The chat model (or the chat model bound to the schema tool).
+    """
+    key = (provider, model, float(temperature), schema)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if schema is None:
+                client = _build_chat_model(provider, model, temperature)
+            else:
+                client = get_chat_model(provider, model, temperature).bind_tools(
+                    [schema], tool_choice=schema.__name__
+                )
+            _clients[key] = client
+        return client
+
+
+def _get_stream_writer():
+    """Returns LangGraph's custom stream writer, or None outside of a graph run."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
+
+def _stream_response(client, messages: List[BaseMessage], schema: Optional[Type[BaseModel]], emit, cancel: Optional[threading.Event] = None):
+    """
+    Streams a model response, passing each new piece of text to `emit`, and returns
+    the parsed result with the response's token usage and HTTP headers (if the
+    client reports them).
+
+    For structured output, the text of the schema's first field is streamed as the
+    tool call arguments arrive. If `cancel` is set, the stream is closed and
+    `AttemptCancelled` is raised.
+    """
+    response = None
+    streamed_text = ""
+    for chunk in client.stream(messages):
+        if cancel is not None and cancel.is_set():
+            raise AttemptCancelled()
+        response = chunk if response is None else response + chunk
+        if schema is None:
+            delta = chunk.content if isinstance(chunk.content, str) else ""
+        else:
+            args = "".join(tc.get("args") or "" for tc in response.tool_call_chunks)
+            partial = parse_partial_json(args) if args else None
+            text = (partial or {}).get(next(iter(schema.model_fields)), "")
+            delta = text[len(streamed_text):] if isinstance(text, str) else ""
+        if delta:
+            streamed_text += delta
+            emit(delta)
+
+    usage = response.usage_metadata or {}
+    headers = response.response_metadata.get("headers")
+    if schema is None:
+        return str(response.content), usage, headers
+    return schema(**response.tool_calls[0]["args"]), usage, headers
+
+
+def invoke_llm(
+    tool: str,
+    messages: List[BaseMessage],
+    provider: str,
+    model: str,
+    temperature: float = 0.0,
+    schema: Optional[Type[BaseModel]] = None,
+    regenerate: bool = False,
+    artifact: Optional[str] = None,
+    on_text: Optional[Callable[[Optional[str]], None]] = None,
+):
+    """
+    Invokes a shared chat model for a tool, going through the response cache.
+
+    The call goes through the LLM router: if the requested model is slow or failing,
+    the request is hedged or failed over to the tool's secondary model.
+
+    The response is streamed: inside a graph run, every new piece of text is sent to
+    LangGraph's `custom` stream mode as `{"tool", "artifact", "chunk"}`, and to
+    `on_text` if given. If the streamed text turns out to belong to a hedged attempt
+    that is discarded, `{"tool", "artifact", "chunk": "", "reset": True}` is sent (and
+    `on_text(None)` called) before the text of the attempt that is used.
+
+    Args:
+        tool (str): Name of the calling tool, used for per-tool cache TTLs and counters.
+        messages (List[BaseMessage]): The prompt messages.
+        provider (str): Either `openai` or `google`.
+        model (str): The provider's model name.
+        temperature (float): The sampling temperature.
+        schema (Optional[Type[BaseModel]]): If given, the response is parsed into this schema.
+        regenerate (bool): If True, skip the cache lookup and always call the model.
+        artifact (Optional[str]): The artifact being generated, used to tag streamed chunks.
+        on_text (Optional[Callable[[Optional[str]], None]]): Called with every new piece of
+            text, so callers can act on a response before it is complete, and with None
+            when the text streamed so far is discarded.
+
+    Returns:
+        The response text, or an instance of `schema` for structured output.
+    """
+    writer = _get_stream_writer()
+
+    def emit(text: str):
+        if writer is not None:
+            writer({"tool": tool, "artifact": artifact or tool, "chunk": text})
+        if on_text is not None:
+            on_text(text)
+
+    def reset():
+        if writer is not None:
+            writer({"tool": tool, "artifact": artifact or tool, "chunk": "", "reset": True})
+        if on_text is not None:
+            on_text(None)
+
+    with metrics.stage("llm", tool, model=model, provider=provider) as record:
+        cache = get_llm_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(model, temperature, messages, schema.__name__ if schema else "")
+            cached = cache.get(tool, cache_key, bypass=regenerate)
+            if cached is not None:
+                record["cache"] = "hit"
+                result = schema.model_validate_json(cached) if schema else cached
+                text = getattr(result, next(iter(schema.model_fields))) if schema else result
+                if isinstance(text, str):
+                    emit(text)
+                return result
+
+        # With hedging, two attempts may stream at once. Each one's text is buffered and
+        # only one of them (the owner) is forwarded. If the owner fails or loses the race,
+        # the stream is reset and the buffered text of the next owner is replayed.
+        stream = {"owner": None, "shown": None, "buffers": {}}
+        stream_lock = threading.Lock()
+        queue_seconds = {}
+        estimated_tokens = estimate_tokens(messages) + EXPECTED_OUTPUT_TOKENS
+
+        def forward(attempt_model: str, text: str):
+            """Forwards `attempt_model`'s new text (or its whole buffer if it wasn't shown). Call with `stream_lock` held."""
+            if stream["shown"] == attempt_model:
+                if text:
+                    emit(text)
+                return
+            if stream["shown"] is not None:
+                reset()
+            stream["shown"] = attempt_model
+            if stream["buffers"].get(attempt_model):
+                emit(stream["buffers"][attempt_model])
+
+        def attempt(attempt_provider: str, attempt_model: str, cancel: threading.Event, started: Callable[[], None]):
+            def attempt_emit(text: str):
+                with stream_lock:
+                    stream["buffers"][attempt_model] = stream["buffers"].get(attempt_model, "") + text
+                    if stream["owner"] is None:
+                        stream["owner"] = attempt_model
+                    if stream["owner"] == attempt_model:
+                        forward(attempt_model, text)
+
+            def stream_once():
+                # A retry after a 429 streams the response again from the start.
+                with stream_lock:
+                    if stream["buffers"].pop(attempt_model, None) and stream["shown"] == attempt_model:
+                        reset()
+                        stream["shown"] = None
+                return _stream_response(client, messages, schema, attempt_emit, cancel)
+
+            client = get_chat_model(attempt_provider, attempt_model, temperature, schema)
+            try:
+                (result, usage, headers), queue_seconds[attempt_model] = rate_limit.run(
+                    attempt_provider,
+                    stream_once,
+                    tokens=estimated_tokens,
+                    on_acquired=started,
+                )
+            except BaseException:
+                with stream_lock:
+                    if stream["owner"] == attempt_model:
+                        stream["owner"] = None
+                    stream["buffers"].pop(attempt_model, None)
+                raise
+            rate_limit.observe_response(attempt_provider, headers, estimated_tokens, usage.get("total_tokens"))
+            return result, usage
+
+        result, usage, (used_provider, used_model) = get_router().call(tool, provider, model, attempt)
+        with stream_lock:
+            # Commit the attempt that is used, so the stream ends with its text.
+            stream["owner"] = used_model
+            forward(used_model, "")
+        record["provider"], record["model"] = used_provider, used_model
+        record["queue_seconds"] = queue_seconds.get(used_model, 0.0)
+        if (used_provider, used_model) != (provider, model):
+            record["routed_from"] = model
+        record["input_tokens"] = usage.get("input_tokens")
+        record["output_tokens"] = usage.get("output_tokens")
+
+        # A failover or hedge answer came from another model, so it isn't stored under
+        # the requested model's key; the next call gets a fresh chance at that model.
+        if cache is not None and "routed_from" not in record:
+            cache.set(tool, cache_key, result.model_dump_json() if schema else result)
+        return result
@@ -0,0 +1,295 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import rate_limit
+from utils.metrics import current_run_ids, metrics
+
+logger = logging.getLogger(__name__)
+
+# The models each tool may use, in order of preference. The first one is the
+# tool's primary model; the others receive hedged requests and failovers.
+ROUTES = {
+    "generate_cover_letter": [("openai", "gpt-4o"), ("google", "gemini-2.5-pro")],
+    "generate_google_doc_proposal": [("google", "gemini-2.5-pro"), ("openai", "gpt-4o")],
+    "generate_mermaid_diagram": [("google", "gemini-2.5-pro"), ("openai", "gpt-4o")],
+}
+
+# Latency SLOs: seconds after which a hedged request is sent, used until enough
+# latencies have been observed to hedge at the model's p95 instead.
+DEFAULT_HEDGE_SECONDS = {
+    "generate_cover_letter": 20.0,
+    "generate_google_doc_proposal": 60.0,
+    "generate_mermaid_diagram": 40.0,
+}
+FALLBACK_HEDGE_SECONDS = 30.0
+# How often an attempt still queued in the rate limiter is checked on.
+QUEUE_POLL_SECONDS = 0.25
+
+# Errors that mean the provider is unreachable, slow or overloaded (as opposed to a
+# bad request or an answer that doesn't fit the schema, which no other model fixes).
+PROVIDER_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailable",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "ServerError",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "RemoteProtocolError", "PoolTimeout", "TimeoutException",
+}
+
+Attempt = Callable[[str, str, threading.Event, Callable[[], None]], Tuple[Any, dict]]
+
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt whose hedged twin already answered."""
+
+
+class AttemptClock:
+    """When an attempt was submitted, and when its request was sent (after any rate limiter queue)."""
+
+    def __init__(self):
+        self.submitted_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """True for transport errors, timeouts, 5xx and 429 responses, including when wrapped in another exception."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectionError)) or rate_limit.is_rate_limit_error(error):
+            return True
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        if status is None and isinstance(getattr(error, "code", None), int):
+            status = error.code
+        if isinstance(status, int) and (status >= 500 or status == 408):
+            return True
+        if any(cls.__name__ in PROVIDER_ERROR_NAMES for cls in type(error).__mro__):
+            return True
+        error = error.__cause__
+    return False
+
+
+class CircuitBreaker:
+    """
+    Stops traffic to a model after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and rejects
+    requests for `cooldown_seconds`. Then a single probe request is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Returns True if a request may be sent now (claiming the probe when half-open)."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LLMRouter:
+    """
+    Routes tool LLM calls across models with hedged requests and circuit breakers.
+
+    A call starts on the requested model. If it hasn't answered by the hedge delay
+    (the model's observed p95 latency for the tool, or the tool's SLO until enough
+    calls have been seen), the same request is also sent to the next model in the
+    tool's route, and whichever answers first wins; the other attempt is cancelled.
+    Time spent queued in the rate limiter doesn't count towards the hedge delay, so
+    throttled calls don't add load on the other provider.
+    An attempt that fails because of the provider (see `is_provider_failure`) fails
+    over to the next model right away; other errors, like a bad request or an answer
+    that doesn't fit the schema, are raised as they are. Models whose circuit
+    breaker is open are skipped.
+
+    Args:
+        hedging (bool): If False, only failover is done (no duplicate requests).
+        min_samples (int): Latencies needed before hedging at the observed p95.
+        window (int): Number of recent latencies kept per tool and model.
+        max_workers (int): Threads running attempts.
+    """
+
+    def __init__(self, hedging: bool = True, min_samples: int = 20, window: int = 200, max_workers: int = 32):
+        self.hedging = hedging
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies: Dict[Tuple[str, str, str], deque] = {}
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-attempt")
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        with self._lock:
+            return self._breakers.setdefault((provider, model), CircuitBreaker())
+
+    def hedge_delay(self, tool: str, provider: str, model: str) -> float:
+        """Seconds to wait for `model` before sending a hedged request."""
+        with self._lock:
+            latencies = sorted(self._latencies.get((tool, provider, model), ()))
+        if len(latencies) < self.min_samples:
+            return DEFAULT_HEDGE_SECONDS.get(tool, FALLBACK_HEDGE_SECONDS)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def _observe(self, tool: str, provider: str, model: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault((tool, provider, model), deque(maxlen=self.window)).append(seconds)
+
+    def candidates(self, tool: str, provider: str, model: str) -> List[Tuple[str, str]]:
+        """The requested model first, followed by the tool's other models."""
+        primary = (provider, model)
+        return [primary] + [candidate for candidate in ROUTES.get(tool, []) if candidate != primary]
+
+    def call(self, tool: str, provider: str, model: str, attempt: Attempt) -> Tuple[Any, dict, Tuple[str, str]]:
+        """
+        Runs `attempt(provider, model, cancel, started)` on the best available model(s).
+
+        `attempt` must call `started()` when its request is sent, return `(result, usage)`
+        and raise `AttemptCancelled` soon after `cancel` is set.
+
+        Returns:
+            (result, usage, (provider, model)): The first successful answer and the
+            model that produced it.
+        """
+        pending = self.candidates(tool, provider, model)
+        running: Dict[Future, Tuple[Tuple[str, str], threading.Event, AttemptClock]] = {}
+        run_ids = current_run_ids()
+
+        def launch(force: bool = False) -> bool:
+            while pending:
+                candidate = pending.pop(0)
+                if force or self.breaker(*candidate).allow():
+                    cancel = threading.Event()
+                    clock = AttemptClock()
+                    future = self._pool.submit(
+                        contextvars.copy_context().run, attempt, candidate[0], candidate[1], cancel, clock.start
+                    )
+                    running[future] = (candidate, cancel, clock)
+                    return True
+                logger.info("Skipping %s/%s for %s: circuit open", candidate[0], candidate[1], tool)
+            return False
+
+        if not launch():
+            # Every breaker is open; try the requested model anyway.
+            pending[:] = [(provider, model)]
+            launch(force=True)
+
+        last_error: Optional[BaseException] = None
+        while running:
+            # The most recently started attempt decides when to hedge again.
+            leader_candidate, _, leader_clock = list(running.values())[-1]
+            timeout = None
+            if self.hedging and pending:
+                if leader_clock.started_at is None:
+                    # Still waiting for the rate limiter, which isn't the provider being slow.
+                    timeout = QUEUE_POLL_SECONDS
+                else:
+                    elapsed = time.perf_counter() - leader_clock.started_at
+                    timeout = max(0.0, self.hedge_delay(tool, *leader_candidate) - elapsed)
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                started_at = leader_clock.started_at
+                if started_at is not None and time.perf_counter() - started_at >= self.hedge_delay(tool, *leader_candidate):
+                    logger.info("Hedging %s: %s/%s is past its latency threshold", tool, *leader_candidate)
+                    launch()
+                continue
+
+            for future in done:
+                candidate, _, clock = running.pop(future)
+                try:
+                    result, usage = future.result()
+                except AttemptCancelled:
+                    continue
+                except Exception as e:
+                    if not is_provider_failure(e):
+                        # The provider answered; retrying elsewhere would fail the same way.
+                        self.breaker(*candidate).record_success()
+                        for _, cancel, _ in running.values():
+                            cancel.set()
+                        raise
+                    self.breaker(*candidate).record_failure()
+                    logger.warning("LLM call for %s failed on %s/%s: %s", tool, candidate[0], candidate[1], e)
+                    last_error = e
+                    continue
+
+                self.breaker(*candidate).record_success()
+                self._observe(tool, candidate[0], candidate[1], time.perf_counter() - (clock.started_at or clock.submitted_at))
+                for loser, (loser_candidate, cancel, loser_clock) in running.items():
+                    cancel.set()
+                    loser.add_done_callback(self._loser_recorder(tool, loser_candidate, loser_clock.submitted_at, run_ids))
+                return result, usage, candidate
+
+            if not running and not launch():
+                break
+
+        raise last_error or RuntimeError(f"No model available for {tool}.")
+
+    def _loser_recorder(self, tool: str, candidate: Tuple[str, str], started_at: float, run_ids: dict):
+        """Records the cost of an attempt that lost the race, once it stops."""
+        def record(future: Future):
+            event = {
+                "kind": "llm_hedge",
+                "name": tool,
+                "provider": candidate[0],
+                "model": candidate[1],
+                "wall_seconds": time.perf_counter() - started_at,
+                **run_ids,
+            }
+            try:
+                _, usage = future.result()
+                event["status"] = "ok"
+                event["input_tokens"] = usage.get("input_tokens")
+                event["output_tokens"] = usage.get("output_tokens")
+            except AttemptCancelled:
+                event["status"] = "cancelled"
+            except Exception:
+                event["status"] = "error"
+            metrics.record(event)
+
+        return record
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Returns the process-wide router. Set `LLM_HEDGING=0` to only fail over, without hedging."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(hedging=os.environ.get("LLM_HEDGING", "1") != "0")
+        return _router
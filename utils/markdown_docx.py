@@ -0,0 +1,450 @@
+"""
+A dependency-free Markdown to DOCX converter for the proposal documents.
+
+It covers the Markdown the proposal prompts produce: ATX headings, paragraphs,
+bullet and numbered lists (nested by indentation), pipe tables, block quotes, code
+blocks, horizontal rules, and inline bold, italic, strikethrough, code, links and
+hard line breaks. Anything else is kept as plain text. The document is written
+block by block into an in-memory ZIP, so no pandoc process or temporary file is
+needed per conversion.
+"""
+import io
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+HEADING = re.compile(r"^ {0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+FENCE = re.compile(r"^\s*(```+|~~~+)")
+RULE = re.compile(r"^ {0,3}([-*_])(?:\s*\1){2,}\s*$")
+LIST_ITEM = re.compile(r"^(\s*)([-*+]|(\d{1,9})[.)])\s+(.*)$")
+QUOTE = re.compile(r"^ {0,3}>\s?(.*)$")
+TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+TABLE_CELL_SPLIT = re.compile(r"(?<!\\)\|")
+
+INLINE = re.compile(
+    r"(?P<escape>\\[\\`*_{}\[\]()#+\-.!|>~])"
+    r"|(?P<hard_break>\\\n| {2,}\n)"
+    r"|(?P<code>(?P<ticks>`+)(?P<code_text>.+?)(?P=ticks))"
+    r"|(?P<image>!\[(?P<image_alt>[^\]]*)\]\([^)\s]+(?:\s+\"[^\"]*\")?\))"
+    r"|(?P<link>\[(?P<link_text>(?:[^\[\]]|\[[^\]]*\])+)\]\((?P<link_url>[^)\s]+)(?:\s+\"[^\"]*\")?\))"
+    r"|(?P<autolink><(?P<autolink_url>(?:https?|mailto):[^>\s]+)>)"
+    r"|(?P<bold>\*\*(?P<bold_text>(?=\S).+?(?<=\S))\*\*|(?<!\w)__(?P<bold_text_>(?=\S).+?(?<=\S))__(?!\w))"
+    r"|(?P<italic>\*(?P<italic_text>(?=[^\s*]).*?(?<=[^\s*]))\*|(?<!\w)_(?P<italic_text_>(?=\S).+?(?<=\S))_(?!\w))"
+    r"|(?P<strike>~~(?P<strike_text>(?=\S).+?(?<=\S))~~)",
+    re.DOTALL,
+)
+
+W_NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# Page content width in twips (US Letter with 1" margins), shared by table columns.
+CONTENT_WIDTH = 9360
+INDENT_PER_LEVEL = 720
+BULLETS = ["•", "◦", "▪"]
+ORDERED_FORMATS = ["decimal", "lowerLetter", "lowerRoman"]
+BULLET_NUM_ID = 1
+
+
+def _join_lines(lines: List[str]) -> str:
+    # Keep the newlines (and trailing spaces) so the inline parser can find hard breaks.
+    return "\n".join(line.lstrip() for line in lines).rstrip()
+
+
+def _split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in TABLE_CELL_SPLIT.split(line)]
+
+
+def _is_table_start(lines: List[str], i: int) -> bool:
+    """A table starts at a row with pipes followed by a `|---|---|` separator row."""
+    return (
+        "|" in lines[i]
+        and i + 1 < len(lines)
+        and "|" in lines[i + 1]
+        and "-" in lines[i + 1]
+        and bool(TABLE_SEPARATOR.match(lines[i + 1]))
+    )
+
+
+def parse_blocks(markdown: str) -> Iterator[Dict]:
+    """
+    Splits Markdown into blocks, yielded as dicts with a `type` (`heading`,
+    `paragraph`, `item`, `quote`, `code`, `table` or `rule`) and its fields.
+
+    List items carry their nesting `level` and a `list_id` that changes whenever a
+    new list starts at that level, so numbered lists restart at the right place.
+    Paragraphs and code blocks inside list items carry the `level` to indent to.
+    """
+    lines = markdown.expandtabs(4).splitlines()
+    pending: Optional[Dict] = None
+    list_indents: List[int] = []
+    list_ids: List[tuple] = []
+    next_list_id = 0
+    blank = False
+
+    def flush():
+        nonlocal pending
+        if pending is not None:
+            block, pending = pending, None
+            block["text"] = _join_lines(block.pop("lines"))
+            yield block
+
+    def close_lists():
+        list_indents.clear()
+        list_ids.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        indent = len(line) - len(line.lstrip())
+        i += 1
+
+        if not stripped:
+            yield from flush()
+            blank = True
+            continue
+
+        fence = FENCE.match(line)
+        if fence:
+            yield from flush()
+            if indent == 0 and blank:
+                close_lists()
+            code_lines = []
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code_lines.append(lines[i][indent:] if not lines[i][:indent].strip() else lines[i].lstrip())
+                i += 1
+            i += 1
+            yield {"type": "code", "text": "\n".join(code_lines), "level": len(list_indents)}
+            blank = False
+            continue
+
+        item = None if RULE.match(line) else LIST_ITEM.match(line)
+        if item:
+            yield from flush()
+            while list_indents and indent < list_indents[-1]:
+                list_indents.pop()
+                list_ids.pop()
+            if not list_indents or indent >= list_indents[-1] + 2:
+                list_indents.append(indent)
+                list_ids.append(None)
+            level = len(list_indents) - 1
+            ordered = item.group(3) is not None
+            if list_ids[level] is None or list_ids[level][0] != ordered:
+                next_list_id += 1
+                list_ids[level] = (ordered, next_list_id)
+            pending = {
+                "type": "item",
+                "level": level,
+                "ordered": ordered,
+                "start": int(item.group(3) or 1),
+                "list_id": list_ids[level][1],
+                "lines": [item.group(4)],
+            }
+            blank = False
+            continue
+
+        heading = HEADING.match(line)
+        quote = QUOTE.match(line)
+        table = _is_table_start(lines, i - 1)
+        starts_block = heading or RULE.match(line) or table or (quote and (pending or {}).get("type") != "quote")
+
+        if pending is not None and not blank and not starts_block:
+            # A continuation line, possibly lazy (not indented) inside a list item or quote.
+            pending["lines"].append(quote.group(1) if quote and pending["type"] == "quote" else line)
+            continue
+
+        yield from flush()
+        if list_indents and (indent == 0 or starts_block):
+            close_lists()
+        blank = False
+
+        if heading:
+            yield {"type": "heading", "level": len(heading.group(1)), "text": heading.group(2)}
+        elif RULE.match(line):
+            yield {"type": "rule"}
+        elif table:
+            header = _split_row(line)
+            aligns = []
+            for cell in _split_row(lines[i]):
+                if cell.startswith(":") and cell.endswith(":"):
+                    aligns.append("center")
+                elif cell.endswith(":"):
+                    aligns.append("right")
+                else:
+                    aligns.append("left")
+            i += 1
+            rows = []
+            while i < len(lines) and lines[i].strip() and "|" in lines[i]:
+                rows.append(_split_row(lines[i]))
+                i += 1
+            yield {"type": "table", "header": header, "aligns": aligns, "rows": rows}
+        elif quote:
+            pending = {"type": "quote", "lines": [quote.group(1)]}
+        else:
+            pending = {"type": "paragraph", "level": len(list_indents), "lines": [line]}
+
+    yield from flush()
+
+
+class _DocumentWriter:
+    """Renders blocks to WordprocessingML, collecting the hyperlinks and numbered lists it needs."""
+
+    def __init__(self):
+        self.links: Dict[str, str] = {}
+        # list_id -> (numId, level, start) of every numbered list.
+        self.numbered_lists: Dict[int, tuple] = {}
+
+    def _link_id(self, url: str) -> str:
+        if url not in self.links:
+            self.links[url] = f"rId{len(self.links) + 3}"
+        return self.links[url]
+
+    def _run(self, text: str, props: frozenset) -> str:
+        run_props = []
+        if "code" in props:
+            run_props.append('<w:rStyle w:val="VerbatimChar"/>')
+        elif "link" in props:
+            run_props.append('<w:rStyle w:val="Hyperlink"/>')
+        if "bold" in props:
+            run_props.append("<w:b/><w:bCs/>")
+        if "italic" in props:
+            run_props.append("<w:i/><w:iCs/>")
+        if "strike" in props:
+            run_props.append("<w:strike/>")
+        run_props = f"<w:rPr>{''.join(run_props)}</w:rPr>" if run_props else ""
+        return f'<w:r>{run_props}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+
+    def inline(self, text: str, props: frozenset = frozenset()) -> str:
+        """Renders inline Markdown as runs."""
+        parts = []
+        pos = 0
+
+        def plain(segment: str):
+            segment = re.sub(r"[ \t]*\n[ \t]*", " ", segment)
+            if segment:
+                parts.append(self._run(segment, props))
+
+        for match in INLINE.finditer(text):
+            plain(text[pos:match.start()])
+            pos = match.end()
+            kind = match.lastgroup
+            if kind == "escape":
+                parts.append(self._run(match.group(0)[1], props))
+            elif kind == "hard_break":
+                parts.append("<w:r><w:br/></w:r>")
+            elif kind == "code":
+                parts.append(self._run(match.group("code_text").strip().replace("\n", " "), props | {"code"}))
+            elif kind == "image":
+                plain(match.group("image_alt"))
+            elif kind in ("link", "autolink"):
+                url = match.group("link_url") or match.group("autolink_url")
+                label = match.group("link_text") or url
+                runs = self.inline(label, props | {"link"}) if kind == "link" else self._run(label, props | {"link"})
+                parts.append(f'<w:hyperlink r:id="{self._link_id(url)}" w:history="1">{runs}</w:hyperlink>')
+            elif kind == "bold":
+                parts.append(self.inline(match.group("bold_text") or match.group("bold_text_"), props | {"bold"}))
+            elif kind == "italic":
+                parts.append(self.inline(match.group("italic_text") or match.group("italic_text_"), props | {"italic"}))
+            elif kind == "strike":
+                parts.append(self.inline(match.group("strike_text"), props | {"strike"}))
+        plain(text[pos:])
+        return "".join(parts)
+
+    def _paragraph(self, runs: str, style: Optional[str] = None, extra_props: str = "") -> str:
+        style_xml = f'<w:pStyle w:val="{style}"/>' if style else ""
+        props = f"<w:pPr>{style_xml}{extra_props}</w:pPr>" if style_xml or extra_props else ""
+        return f"<w:p>{props}{runs}</w:p>"
+
+    def _num_id(self, block: Dict) -> int:
+        if not block["ordered"]:
+            return BULLET_NUM_ID
+        if block["list_id"] not in self.numbered_lists:
+            num_id = BULLET_NUM_ID + 1 + len(self.numbered_lists)
+            self.numbered_lists[block["list_id"]] = (num_id, block["level"], block["start"])
+        return self.numbered_lists[block["list_id"]][0]
+
+    def _table(self, block: Dict) -> str:
+        columns = max([len(block["header"])] + [len(row) for row in block["rows"]])
+        width = CONTENT_WIDTH // columns
+        aligns = block["aligns"] + ["left"] * (columns - len(block["aligns"]))
+        xml = [
+            '<w:tbl><w:tblPr><w:tblStyle w:val="Table"/><w:tblW w:w="5000" w:type="pct"/>'
+            '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="0" w:lastColumn="0" w:noHBand="0" w:noVBand="1"/>'
+            "</w:tblPr><w:tblGrid>",
+            f'<w:gridCol w:w="{width}"/>' * columns,
+            "</w:tblGrid>",
+        ]
+        for row_index, row in enumerate([block["header"]] + block["rows"]):
+            is_header = row_index == 0
+            xml.append("<w:tr><w:trPr><w:tblHeader/></w:trPr>" if is_header else "<w:tr>")
+            for column in range(columns):
+                cell = row[column] if column < len(row) else ""
+                runs = self.inline(cell, frozenset({"bold"}) if is_header else frozenset())
+                paragraph = self._paragraph(runs, "Compact", f'<w:jc w:val="{aligns[column]}"/>')
+                xml.append(f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>{paragraph}</w:tc>')
+            xml.append("</w:tr>")
+        xml.append("</w:tbl>")
+        return "".join(xml)
+
+    def block(self, block: Dict) -> str:
+        """Renders one block from `parse_blocks`."""
+        kind = block["type"]
+        level_indent = f'<w:ind w:left="{INDENT_PER_LEVEL * block.get("level", 0)}"/>' if block.get("level") else ""
+        if kind == "heading":
+            return self._paragraph(self.inline(block["text"]), f"Heading{block['level']}")
+        if kind == "item":
+            numbering = f'<w:numPr><w:ilvl w:val="{block["level"]}"/><w:numId w:val="{self._num_id(block)}"/></w:numPr>'
+            return self._paragraph(self.inline(block["text"]), "ListParagraph", numbering)
+        if kind == "quote":
+            return self._paragraph(self.inline(block["text"]), "Quote")
+        if kind == "code":
+            runs = "<w:r><w:br/></w:r>".join(self._run(line, frozenset({"code"})) for line in block["text"].split("\n"))
+            return self._paragraph(runs, "SourceCode", level_indent)
+        if kind == "table":
+            return self._table(block)
+        if kind == "rule":
+            return self._paragraph("", None, '<w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/></w:pBdr>')
+        return self._paragraph(self.inline(block["text"]), None, level_indent)
+
+    def numbering_xml(self) -> str:
+        xml = [XML_HEADER, f"<w:numbering {W_NAMESPACES}>"]
+        for abstract_id, ordered in ((0, False), (1, True)):
+            xml.append(f'<w:abstractNum w:abstractNumId="{abstract_id}"><w:multiLevelType w:val="hybridMultilevel"/>')
+            for level in range(9):
+                if ordered:
+                    number_format = ORDERED_FORMATS[level % len(ORDERED_FORMATS)]
+                    text = f"%{level + 1}."
+                else:
+                    number_format, text = "bullet", BULLETS[level % len(BULLETS)]
+                xml.append(
+                    f'<w:lvl w:ilvl="{level}"><w:start w:val="1"/><w:numFmt w:val="{number_format}"/>'
+                    f'<w:lvlText w:val="{text}"/><w:lvlJc w:val="left"/>'
+                    f'<w:pPr><w:ind w:left="{INDENT_PER_LEVEL * (level + 1)}" w:hanging="360"/></w:pPr></w:lvl>'
+                )
+            xml.append("</w:abstractNum>")
+        xml.append(f'<w:num w:numId="{BULLET_NUM_ID}"><w:abstractNumId w:val="0"/></w:num>')
+        for num_id, level, start in self.numbered_lists.values():
+            xml.append(
+                f'<w:num w:numId="{num_id}"><w:abstractNumId w:val="1"/>'
+                f'<w:lvlOverride w:ilvl="{level}"><w:startOverride w:val="{start}"/></w:lvlOverride></w:num>'
+            )
+        xml.append("</w:numbering>")
+        return "".join(xml)
+
+    def relationships_xml(self) -> str:
+        relationship = '<Relationship Id="{}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/{}" Target={}{}/>'
+        xml = [
+            XML_HEADER,
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">',
+            relationship.format("rId1", "styles", '"styles.xml"', ""),
+            relationship.format("rId2", "numbering", '"numbering.xml"', ""),
+        ]
+        for url, link_id in self.links.items():
+            xml.append(relationship.format(link_id, "hyperlink", quoteattr(url), ' TargetMode="External"'))
+        xml.append("</Relationships>")
+        return "".join(xml)
+
+
+CONTENT_TYPES_XML = (
+    XML_HEADER
+    + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>'
+    "</Types>"
+)
+
+PACKAGE_RELATIONSHIPS_XML = (
+    XML_HEADER
+    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    "</Relationships>"
+)
+
+
+def _paragraph_style(style_id: str, name: str, run_props: str = "", paragraph_props: str = "", based_on: str = "Normal") -> str:
+    return (
+        f'<w:style w:type="paragraph" w:styleId="{style_id}"><w:name w:val="{name}"/>'
+        f'<w:basedOn w:val="{based_on}"/><w:next w:val="Normal"/><w:qFormat/>'
+        f"<w:pPr>{paragraph_props}</w:pPr><w:rPr>{run_props}</w:rPr></w:style>"
+    )
+
+
+HEADING_SIZES = {1: 40, 2: 32, 3: 28, 4: 24, 5: 22, 6: 22}
+
+STYLES_XML = (
+    XML_HEADER
+    + f"<w:styles {W_NAMESPACES}>"
+    '<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Calibri" w:cs="Calibri"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="en-US"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="160" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    + "".join(
+        _paragraph_style(
+            f"Heading{level}",
+            f"heading {level}",
+            f'<w:b/><w:bCs/><w:sz w:val="{size}"/><w:szCs w:val="{size}"/>',
+            f'<w:keepNext/><w:spacing w:before="240" w:after="120"/><w:outlineLvl w:val="{level - 1}"/>',
+        )
+        for level, size in HEADING_SIZES.items()
+    )
+    + _paragraph_style("ListParagraph", "List Paragraph", paragraph_props='<w:spacing w:after="80"/><w:contextualSpacing/>')
+    + _paragraph_style("Compact", "Compact", paragraph_props='<w:spacing w:before="36" w:after="36"/>')
+    + _paragraph_style("Quote", "Quote", "<w:i/><w:iCs/>", '<w:ind w:left="720" w:right="720"/>')
+    + _paragraph_style("SourceCode", "Source Code", paragraph_props='<w:spacing w:after="160" w:line="240" w:lineRule="auto"/>')
+    + '<w:style w:type="character" w:styleId="VerbatimChar"><w:name w:val="Verbatim Char"/>'
+    '<w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas" w:cs="Consolas"/><w:sz w:val="20"/></w:rPr></w:style>'
+    '<w:style w:type="character" w:styleId="Hyperlink"><w:name w:val="Hyperlink"/>'
+    '<w:rPr><w:color w:val="1155CC"/><w:u w:val="single"/></w:rPr></w:style>'
+    '<w:style w:type="table" w:styleId="Table"><w:name w:val="Table"/><w:tblPr><w:tblBorders>'
+    + "".join(
+        f'<w:{side} w:val="single" w:sz="4" w:space="0" w:color="BFBFBF"/>'
+        for side in ("top", "left", "bottom", "right", "insideH", "insideV")
+    )
+    + '</w:tblBorders><w:tblCellMar><w:left w:w="108" w:type="dxa"/><w:right w:w="108" w:type="dxa"/></w:tblCellMar>'
+    "</w:tblPr></w:style>"
+    "</w:styles>"
+)
+
+SECTION_PROPERTIES = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/>'
+    "</w:sectPr>"
+)
+
+
+def markdown_to_docx(markdown: str) -> bytes:
+    """
+    Converts Markdown to a DOCX document.
+
+    Args:
+        markdown (str): The Markdown text.
+
+    Returns:
+        bytes: The content of the .docx file.
+    """
+    writer = _DocumentWriter()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        with docx.open("word/document.xml", "w") as document:
+            document.write(f"{XML_HEADER}<w:document {W_NAMESPACES}><w:body>".encode("utf-8"))
+            for block in parse_blocks(markdown):
+                document.write(writer.block(block).encode("utf-8"))
+            document.write(f"{SECTION_PROPERTIES}</w:body></w:document>".encode("utf-8"))
+        # Hyperlinks and numbered lists are only known once the body is written.
+        docx.writestr("word/numbering.xml", writer.numbering_xml())
+        docx.writestr("word/_rels/document.xml.rels", writer.relationships_xml())
+        docx.writestr("word/styles.xml", STYLES_XML)
+        docx.writestr("_rels/.rels", PACKAGE_RELATIONSHIPS_XML)
+        docx.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+    return buffer.getvalue()
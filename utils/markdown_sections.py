@@ -0,0 +1,51 @@
+import re
+from typing import Dict, List
+
+# A section starts at a Markdown heading or at a line that is only bold text (like
+# "**A little about me**:"), which the proposal template uses as sub-headings.
+SECTION_START = re.compile(r"^(#{1,6}\s|\*\*[^*\n]+\*\*:?\s*$)")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def split_sections(markdown: str) -> List[str]:
+    """
+    Splits Markdown into sections, each starting at a heading (the text before the
+    first heading is a section of its own). Lines inside code fences never start a
+    section. Joining the sections gives back the original text exactly.
+    """
+    sections = []
+    current = []
+    in_fence = False
+    for line in markdown.splitlines(keepends=True):
+        if FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and SECTION_START.match(line) and any(l.strip() for l in current):
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def number_sections(sections: List[str]) -> str:
+    """Renders the sections with their indexes, for prompts that refer to them by number."""
+    return "\n\n".join(f'<section index="{i}">\n{section.strip()}\n</section>' for i, section in enumerate(sections))
+
+
+def splice_sections(sections: List[str], replacements: Dict[int, str]) -> str:
+    """
+    Replaces sections by index and joins everything back together. Each replacement
+    keeps the trailing blank lines of the section it replaces, so the spacing between
+    sections doesn't change. An empty replacement removes the section.
+    """
+    parts = []
+    for i, section in enumerate(sections):
+        if i not in replacements:
+            parts.append(section)
+            continue
+        content = replacements[i].strip()
+        if content:
+            trailing = section[len(section.rstrip()):] or ("\n\n" if i < len(sections) - 1 else "")
+            parts.append(content + trailing)
+    return "".join(parts)
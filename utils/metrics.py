@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output), used to estimate the cost of each LLM call.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# Structured JSON events are appended here; set `METRICS_EVENTS_PATH=` (empty) to disable.
+DEFAULT_EVENTS_PATH = os.path.join("generated_content", "metrics.jsonl")
+
+
+def estimate_cost(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def current_run_ids() -> Dict[str, Optional[str]]:
+    """Returns the thread and run IDs of the graph run executing on this thread, if any."""
+    try:
+        from langgraph.config import get_config
+
+        configurable = get_config().get("configurable", {})
+    except (ImportError, RuntimeError):
+        return {"thread_id": None, "run_id": None}
+    return {"thread_id": configurable.get("thread_id"), "run_id": configurable.get("workflow_run_id")}
+
+
+class MetricsRecorder:
+    """
+    Records the timing, token usage and estimated cost of every workflow stage.
+
+    A stage is a graph node, a tool call, or a tool sub-stage (LLM call, file write,
+    pandoc conversion, render, upload, share). Each finished stage becomes a JSON
+    event and is added to aggregates exposed in Prometheus text format.
+    """
+
+    def __init__(self, events_path: Optional[str] = DEFAULT_EVENTS_PATH, max_events: int = 10000):
+        self.events_path = events_path
+        self._events = deque(maxlen=max_events)
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, kind: str, name: str, queue_seconds: float = 0.0, thread_id: Optional[str] = None, **labels):
+        """
+        Times a stage. The yielded dict can be updated with `input_tokens`,
+        `output_tokens`, `model` or any other label before the block ends.
+        """
+        record = {"kind": kind, "name": name, "queue_seconds": queue_seconds, **labels}
+        ids = current_run_ids()
+        record["thread_id"] = thread_id or ids["thread_id"]
+        record["run_id"] = record.get("run_id") or ids["run_id"]
+        started_at = time.perf_counter()
+        record["status"] = "ok"
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            record["wall_seconds"] = time.perf_counter() - started_at
+            self.record(record)
+
+    def record(self, record: dict):
+        record.setdefault("ts", time.time())
+        input_tokens = int(record.get("input_tokens") or 0)
+        output_tokens = int(record.get("output_tokens") or 0)
+        if input_tokens or output_tokens:
+            record["cost_usd"] = estimate_cost(record.get("model"), input_tokens, output_tokens)
+
+        with self._lock:
+            self._events.append(record)
+            totals = self._totals[(record["kind"], record["name"])]
+            totals["count"] += 1
+            totals["errors"] += record.get("status") == "error"
+            totals["wall_seconds"] += record.get("wall_seconds", 0.0)
+            totals["queue_seconds"] += record.get("queue_seconds", 0.0)
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["cost_usd"] += record.get("cost_usd", 0.0)
+            if self.events_path:
+                try:
+                    with open(self.events_path, "a") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError:
+                    logger.debug("Could not write metrics event to %s", self.events_path)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Sets a point-in-time value, like a queue depth, exposed next to the aggregates."""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def events(self, thread_id: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [e for e in self._events if thread_id is None or e.get("thread_id") == thread_id]
+
+    def render_prometheus(self) -> str:
+        """Returns the aggregates in the Prometheus text exposition format."""
+        metrics = [
+            ("proposal_stage_calls_total", "count", "counter", "Number of finished stages."),
+            ("proposal_stage_errors_total", "errors", "counter", "Number of stages that raised."),
+            ("proposal_stage_wall_seconds_total", "wall_seconds", "counter", "Total wall time spent in stages."),
+            ("proposal_stage_queue_seconds_total", "queue_seconds", "counter", "Total time stages waited before starting."),
+            ("proposal_stage_input_tokens_total", "input_tokens", "counter", "LLM input tokens."),
+            ("proposal_stage_output_tokens_total", "output_tokens", "counter", "LLM output tokens."),
+            ("proposal_stage_cost_usd_total", "cost_usd", "counter", "Estimated LLM cost in USD."),
+        ]
+        with self._lock:
+            totals = {key: dict(value) for key, value in self._totals.items()}
+            gauges = dict(self._gauges)
+        lines = []
+        for metric, field, metric_type, help_text in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for (kind, name), values in sorted(totals.items()):
+                lines.append(f'{metric}{{kind="{kind}",name="{name}"}} {values.get(field, 0):g}')
+        for metric in sorted({name for name, _ in gauges}):
+            lines.append(f"# TYPE {metric} gauge")
+            for (name, labels), value in sorted(gauges.items()):
+                if name == metric:
+                    label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f"{metric}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summarize(self, thread_id: Optional[str] = None, run_id: Optional[str] = None) -> str:
+        """Returns a per-stage table of a thread's (or run's) timings, tokens and cost."""
+        rows = defaultdict(lambda: defaultdict(float))
+        for event in self.events(thread_id):
+            if run_id and event.get("run_id") != run_id:
+                continue
+            row = rows[(event["kind"], event["name"])]
+            row["count"] += 1
+            row["wall_seconds"] += event.get("wall_seconds", 0.0)
+            row["queue_seconds"] += event.get("queue_seconds", 0.0)
+            row["tokens"] += int(event.get("input_tokens") or 0) + int(event.get("output_tokens") or 0)
+            row["cost_usd"] += event.get("cost_usd", 0.0)
+        if not rows:
+            return "No metrics recorded."
+
+        lines = [f"{'stage':<44}{'calls':>6}{'wall s':>9}{'queue s':>9}{'tokens':>9}{'cost $':>9}"]
+        for (kind, name), row in sorted(rows.items()):
+            lines.append(
+                f"{kind + ':' + name:<44}{int(row['count']):>6}{row['wall_seconds']:>9.2f}"
+                f"{row['queue_seconds']:>9.2f}{int(row['tokens']):>9}{row['cost_usd']:>9.4f}"
+            )
+        total_cost = sum(row["cost_usd"] for row in rows.values())
+        lines.append(f"Estimated LLM cost: ${total_cost:.4f}")
+        return "\n".join(lines)
+
+
+metrics = MetricsRecorder(events_path=os.environ.get("METRICS_EVENTS_PATH", DEFAULT_EVENTS_PATH) or None)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves `/metrics` (Prometheus text) and `/events` (JSON) on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            elif self.path.startswith("/events"):
+                body, content_type = json.dumps(metrics.events(), default=str).encode("utf-8"), "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
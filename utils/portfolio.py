@@ -0,0 +1,110 @@
+"""
+BM25 retrieval over the portfolio, so prompts only include the projects that are
+relevant to the job instead of the whole portfolio.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Optional
+
+import prompts
+
+# Number of projects put in a prompt. Set `PORTFOLIO_TOP_K=0` to always include all of them.
+DEFAULT_TOP_K = 4
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "i", "in", "is", "it",
+    "its", "of", "on", "or", "our", "that", "the", "their", "them", "they", "this", "to", "was", "we",
+    "will", "with", "you", "your", "who", "which", "can", "also", "any", "all", "into", "over", "using",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words without stop words, with a plural `s` stripped (`agents` -> `agent`)."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class PortfolioIndex:
+    """
+    An Okapi BM25 index over portfolio projects.
+
+    Args:
+        projects (List[str]): One description per project, in order of preference;
+            ties and queries that match nothing keep this order.
+    """
+
+    def __init__(self, projects: List[str]):
+        self.projects = projects
+        self._term_counts = [Counter(tokenize(project)) for project in projects]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = sum(self._lengths) / len(projects) if projects else 0.0
+        document_frequency = Counter(term for counts in self._term_counts for term in counts)
+        n = len(projects)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            score = 0.0
+            for term in query_terms & counts.keys():
+                frequency = counts[term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self._average_length or 1))
+                score += self._idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[str]:
+        """Returns the `top_k` projects most relevant to `query`, best first."""
+        scores = self.scores(query)
+        ranked = sorted(range(len(self.projects)), key=lambda i: (-scores[i], i))
+        return [self.projects[i] for i in ranked[:top_k]]
+
+
+def format_about_me(projects: List[str]) -> str:
+    """Formats the intro and `projects` like `prompts.ABOUT_ME`."""
+    return prompts.ABOUT_ME_INTRO + "\n\nRelevant projects:\n" + "".join(f"- {project}\n" for project in projects)
+
+
+_index: Optional[PortfolioIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_portfolio_index() -> PortfolioIndex:
+    """Returns the process-wide index of `prompts.PORTFOLIO_PROJECTS`."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PortfolioIndex(prompts.PORTFOLIO_PROJECTS)
+        return _index
+
+
+def about_me(query: str, top_k: Optional[int] = None) -> str:
+    """
+    Builds the "about me" block for a prompt: the intro followed by the projects most
+    relevant to `query` (usually the job description).
+
+    Args:
+        query (str): The text to match the projects against.
+        top_k (Optional[int]): Number of projects to include. Defaults to `PORTFOLIO_TOP_K`
+            (4); 0 includes the whole portfolio.
+
+    Returns:
+        str: The block, formatted like `prompts.ABOUT_ME`.
+    """
+    if top_k is None:
+        top_k = int(os.environ.get("PORTFOLIO_TOP_K", DEFAULT_TOP_K))
+    if top_k <= 0 or top_k >= len(prompts.PORTFOLIO_PROJECTS):
+        return prompts.ABOUT_ME
+    return format_about_me(get_portfolio_index().search(query, top_k))
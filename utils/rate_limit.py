@@ -0,0 +1,290 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Mapping, Optional, Tuple, TypeVar
+
+from utils.metrics import current_run_ids, metrics
+
+T = TypeVar("T")
+
+# How many times a call rejected with HTTP 429 is retried after the advised delay.
+MAX_RATE_LIMIT_RETRIES = 3
+# After a 429, the rate is multiplied by this factor (and grows back on success),
+# but never below MIN_RATE_FACTOR of the configured rate.
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_STEP = 0.05
+MIN_RATE_FACTOR = 0.1
+# Pause after a 429 without `Retry-After`: doubled for each consecutive 429.
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parses `Retry-After` style values: plain seconds or durations like `6m0s` and `20ms`."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimiter:
+    """
+    A thread-safe limiter on requests and tokens per minute for one provider.
+
+    Two token buckets (requests and LLM tokens) allow short bursts of about five
+    seconds' worth of quota. Callers block in `acquire` and are served in arrival
+    order, so a large request can't be starved by a stream of small ones.
+
+    The limiter adapts to the provider: a 429 pauses it for the `Retry-After` delay
+    (or an exponential backoff) and halves the rate, which then grows back with each
+    success. Rate limit headers can pause it before a 429 happens and, when no limit
+    was configured, teach it the account's quota.
+
+    Args:
+        requests_per_minute (Optional[float]): The request quota (None for no limit).
+        tokens_per_minute (Optional[float]): The LLM token quota (None for no limit).
+        clock (Callable[[], float]): Returns the current time in seconds; injectable for tests.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self.rate_factor = 1.0
+        self.throttled_seconds = 0.0
+        self._request_tokens = self._capacity(requests_per_minute)
+        self._llm_tokens = self._capacity(tokens_per_minute)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._consecutive_rate_limits = 0
+        self._waiters = deque()
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _capacity(per_minute: Optional[float]) -> float:
+        return max(1.0, per_minute / 60.0 * 5) if per_minute else 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            rate = self.requests_per_minute * self.rate_factor / 60.0
+            self._request_tokens = min(self._capacity(self.requests_per_minute), self._request_tokens + elapsed * rate)
+        if self.tokens_per_minute:
+            rate = self.tokens_per_minute * self.rate_factor / 60.0
+            self._llm_tokens = min(self._capacity(self.tokens_per_minute), self._llm_tokens + elapsed * rate)
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        wait = self._paused_until - now
+        if self.requests_per_minute and self._request_tokens < 1:
+            wait = max(wait, (1 - self._request_tokens) * 60.0 / (self.requests_per_minute * self.rate_factor))
+        if self.tokens_per_minute and tokens:
+            # A request larger than the bucket only waits for a full bucket.
+            needed = min(tokens, self._capacity(self.tokens_per_minute))
+            if self._llm_tokens < needed:
+                wait = max(wait, (needed - self._llm_tokens) * 60.0 / (self.tokens_per_minute * self.rate_factor))
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until a request using about `tokens` LLM tokens may start.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        started_at = self._clock()
+        waiter = object()
+        with self._condition:
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    now = self._clock()
+                    if self._waiters[0] is waiter:
+                        self._refill(now)
+                        wait = self._wait_time(now, tokens)
+                        if wait <= 0:
+                            if self.requests_per_minute:
+                                self._request_tokens -= 1
+                            if self.tokens_per_minute:
+                                self._llm_tokens -= tokens
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._waiters.remove(waiter)
+                self._condition.notify_all()
+            waited = self._clock() - started_at
+            self.throttled_seconds += waited
+        return waited
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Corrects the token bucket once a request's real token usage is known."""
+        if not self.tokens_per_minute or actual_tokens is None:
+            return
+        with self._condition:
+            self._llm_tokens -= actual_tokens - estimated_tokens
+
+    def on_success(self):
+        with self._condition:
+            self._consecutive_rate_limits = 0
+            self.rate_factor = min(1.0, self.rate_factor + RATE_INCREASE_STEP)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Pauses the limiter after a 429 and lowers its rate."""
+        with self._condition:
+            self._consecutive_rate_limits += 1
+            if retry_after is None:
+                retry_after = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** (self._consecutive_rate_limits - 1))
+            self._paused_until = max(self._paused_until, self._clock() + retry_after)
+            self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor * RATE_DECREASE_FACTOR)
+            self._request_tokens = min(self._request_tokens, 0.0)
+            self._llm_tokens = min(self._llm_tokens, 0.0)
+            self._condition.notify_all()
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """
+        Reads OpenAI-style `x-ratelimit-*` headers: learns the quota if none was
+        configured, and pauses until the reset time when a budget is exhausted.
+        """
+        if not headers:
+            return
+        headers = {str(key).lower(): value for key, value in headers.items()}
+        with self._condition:
+            for kind in ("requests", "tokens"):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                if limit and kind == "requests" and not self.requests_per_minute:
+                    self.requests_per_minute = float(limit)
+                    self._request_tokens = self._capacity(self.requests_per_minute)
+                elif limit and kind == "tokens" and not self.tokens_per_minute:
+                    self.tokens_per_minute = float(limit)
+                    self._llm_tokens = self._capacity(self.tokens_per_minute)
+
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining is not None and reset and float(remaining) < 1:
+                    self._paused_until = max(self._paused_until, self._clock() + reset)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> RateLimiter:
+    """Returns the process-wide limiter of a provider (`openai`, `google` or `drive`)."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = RateLimiter()
+        return limiter
+
+
+def configure_rate_limits(
+    requests_per_minute: Dict[str, Optional[float]],
+    tokens_per_minute: Optional[Dict[str, Optional[float]]] = None,
+):
+    """
+    Sets per-provider limits, e.g. `{"openai": 60, "google": 30}` requests and
+    `{"openai": 30000}` tokens per minute.
+
+    A limit of None or 0 removes that limit for the provider; the limiter still
+    backs off when the provider answers with 429.
+    """
+    tokens_per_minute = tokens_per_minute or {}
+    with _limiters_lock:
+        for provider in set(requests_per_minute) | set(tokens_per_minute):
+            _limiters[provider] = RateLimiter(
+                requests_per_minute.get(provider) or None,
+                tokens_per_minute.get(provider) or None,
+            )
+
+
+def acquire(provider: str, tokens: int = 0) -> float:
+    """
+    Blocks until the provider's limiter allows another request and publishes the
+    queue depth and throttle time to the metrics.
+
+    Returns:
+        float: The seconds spent waiting.
+    """
+    limiter = get_limiter(provider)
+    metrics.set_gauge("proposal_rate_limit_queue_depth", limiter.queue_depth + 1, provider=provider)
+    waited = limiter.acquire(tokens)
+    metrics.set_gauge("proposal_rate_limit_queue_depth", limiter.queue_depth, provider=provider)
+    metrics.set_gauge("proposal_rate_limit_rate_factor", limiter.rate_factor, provider=provider)
+    metrics.record({"kind": "throttle", "name": provider, "queue_seconds": waited, "tokens": tokens, **current_run_ids()})
+    return waited
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognizes 429 errors from the OpenAI, Gemini and Drive clients."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and hasattr(error, "resp"):
+        status = getattr(error.resp, "status", None)
+    return status == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Returns the delay a rate-limited response asked for, if it had one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "resp", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        return float(retry_after_ms) / 1000
+    return _parse_duration(headers.get("retry-after"))
+
+
+def run(provider: str, call: Callable[[], T], tokens: int = 0, on_acquired: Optional[Callable[[], None]] = None) -> Tuple[T, float]:
+    """
+    Runs `call` under the provider's limiter. Calls rejected with a 429 pause the
+    limiter and are retried up to `MAX_RATE_LIMIT_RETRIES` times, queueing behind
+    everyone else instead of retrying blindly. `on_acquired` is called each time the
+    limiter lets the call go.
+
+    Returns:
+        (result, throttled_seconds): The call's result and the total time spent
+        waiting for the limiter.
+    """
+    limiter = get_limiter(provider)
+    throttled_seconds = 0.0
+    for retry in range(MAX_RATE_LIMIT_RETRIES + 1):
+        throttled_seconds += acquire(provider, tokens)
+        if on_acquired is not None:
+            on_acquired()
+        try:
+            result = call()
+        except Exception as e:
+            if retry >= MAX_RATE_LIMIT_RETRIES or not is_rate_limit_error(e):
+                raise
+            limiter.on_rate_limited(retry_after_seconds(e))
+            continue
+        limiter.on_success()
+        return result, throttled_seconds
+
+
+def observe_response(provider: str, headers: Optional[Mapping[str, str]] = None, estimated_tokens: int = 0, actual_tokens: Optional[int] = None):
+    """Feeds a finished request's rate limit headers and real token usage back to the limiter."""
+    limiter = get_limiter(provider)
+    limiter.update_from_headers(headers)
+    limiter.settle(estimated_tokens, actual_tokens)
@@ -0,0 +1,221 @@
+"""
+A local index of past job descriptions, used to find near-duplicate postings
+(reposts, or the same client hiring for a similar role) so their artifacts can be
+adapted with edits instead of being generated from scratch.
+
+Job descriptions are compared by MinHash signatures of their word 3-grams, which
+estimate the Jaccard similarity of the two texts. Signatures are bucketed with
+locality-sensitive hashing (LSH), so a lookup only compares against likely matches.
+They are computed once per job and stored in `<base_dir>/similar_jobs.jsonl`.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.file_manager import FileStorageManager
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "similar_jobs.jsonl"
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: pairs above ~0.45 similarity almost always share a bucket.
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+# Minimum estimated Jaccard similarity for a past job to be used as a baseline.
+DEFAULT_THRESHOLD = 0.6
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: the signatures are persisted, so the permutations must never change.
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(text: str) -> Set[str]:
+    """The set of word 3-grams of `text`, ignoring case and punctuation."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """The MinHash signature of `text`'s shingles."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") % _PRIME
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return [_PRIME] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(signature: List[int], other: List[int]) -> float:
+    """The estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+def _bands(signature: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(band, tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])) for band in range(BANDS)]
+
+
+def load_artifacts(base_dir: str, job_id: str) -> Dict[str, str]:
+    """Reads the latest cover letter, proposal Markdown and Mermaid code of a job, keyed like the workflow state."""
+    file_manager = FileStorageManager(base_dir=base_dir, job_id=job_id)
+    paths = {
+        "proposal": file_manager.get_cover_letter_path(),
+        "google_doc_markdown": file_manager.get_google_doc_paths()[0],
+        "mermaid_code": file_manager.get_mermaid_diagram_paths()[0],
+    }
+    artifacts = {}
+    for key, path in paths.items():
+        try:
+            with open(path, "r") as f:
+                content = f.read()
+        except OSError:
+            continue
+        if content.strip():
+            artifacts[key] = content
+    return artifacts
+
+
+class SimilarJobIndex:
+    """
+    Finds the past job most similar to a new job description.
+
+    The index is refreshed from the job index (`index.jsonl`) on every lookup, so
+    jobs created by other processes are picked up; only new jobs are hashed.
+
+    Args:
+        base_dir (str): The folder holding all job folders.
+        threshold (float): Minimum estimated Jaccard similarity for a match.
+    """
+
+    def __init__(self, base_dir: str = "generated_content", threshold: float = DEFAULT_THRESHOLD):
+        self.base_dir = base_dir
+        self.threshold = threshold
+        self.index_path = os.path.join(base_dir, INDEX_FILE_NAME)
+        self._signatures: Dict[str, List[int]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _add(self, job_id: str, signature: List[int]):
+        self._signatures[job_id] = signature
+        for band in _bands(signature):
+            self._buckets.setdefault(band, set()).add(job_id)
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A partially written last line.
+                    if len(record.get("signature", [])) == NUM_PERMUTATIONS:
+                        self._add(record["job_id"], record["signature"])
+        except FileNotFoundError:
+            pass
+        self._loaded = True
+
+    def refresh(self):
+        """Hashes the job descriptions of jobs that are not in the index yet."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            new_records = []
+            for job in FileStorageManager.list_jobs(self.base_dir):
+                if job["job_id"] in self._signatures or not job.get("job_description_path"):
+                    continue
+                path = os.path.join(self.base_dir, job["job_id"], f"job_description_{job['job_id']}.txt")
+                try:
+                    with open(path, "r") as f:
+                        signature = minhash(f.read())
+                except OSError:
+                    continue
+                self._add(job["job_id"], signature)
+                new_records.append(json.dumps({"job_id": job["job_id"], "signature": signature}))
+            if new_records:
+                os.makedirs(self.base_dir, exist_ok=True)
+                with open(self.index_path, "a") as f:
+                    f.write("\n".join(new_records) + "\n")
+
+    def find(self, job_description: str, exclude_job_id: Optional[str] = None) -> Optional[dict]:
+        """
+        Looks for a past job whose description is similar to `job_description` and
+        that has generated artifacts.
+
+        Returns:
+            Optional[dict]: `{"job_id", "similarity"}` plus the matched job's
+            `proposal`, `google_doc_markdown` and `mermaid_code` (those that exist),
+            or None if no past job is similar enough.
+        """
+        self.refresh()
+        signature = minhash(job_description)
+        with self._lock:
+            candidates = set()
+            for band in _bands(signature):
+                candidates |= self._buckets.get(band, set())
+            candidates.discard(exclude_job_id)
+            scored = sorted(
+                ((estimate_similarity(signature, self._signatures[job_id]), job_id) for job_id in candidates),
+                reverse=True,
+            )
+        for similarity, job_id in scored:
+            if similarity < self.threshold:
+                break
+            artifacts = load_artifacts(self.base_dir, job_id)
+            if artifacts:
+                return {"job_id": job_id, "similarity": round(similarity, 3), **artifacts}
+        return None
+
+
+_indexes: Dict[str, SimilarJobIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similar_job_index(base_dir: str = "generated_content") -> SimilarJobIndex:
+    """Returns the process-wide index of a base folder (threshold set by `SIMILAR_JOB_THRESHOLD`)."""
+    key = os.path.abspath(base_dir)
+    with _indexes_lock:
+        if key not in _indexes:
+            threshold = float(os.environ.get("SIMILAR_JOB_THRESHOLD", DEFAULT_THRESHOLD))
+            _indexes[key] = SimilarJobIndex(base_dir, threshold=threshold)
+        return _indexes[key]
+
+
+def find_similar_job(job_folder_path: str, job_description: str) -> Optional[dict]:
+    """
+    Finds a past job similar to the job in `job_folder_path`, among the other jobs of
+    the same base folder. Set `SIMILAR_JOBS=0` to disable the lookup.
+    """
+    if os.environ.get("SIMILAR_JOBS", "1") == "0":
+        return None
+    base_dir, job_id = os.path.split(os.path.normpath(job_folder_path))
+    with metrics.stage("index", "similar_jobs") as record:
+        try:
+            match = get_similar_job_index(base_dir).find(job_description, exclude_job_id=job_id)
+        except Exception:
+            logger.exception("Similar job lookup failed")
+            match = None
+        record["match"] = match["job_id"] if match else None
+        record["similarity"] = match["similarity"] if match else None
+    return match
+
+
+def baseline_artifact(state: dict, key: str) -> Optional[str]:
+    """
+    The artifact of the similar past job to start from, if the current job doesn't
+    have its own version of it yet.
+    """
+    similar_job = state.get("similar_job")
+    if not similar_job or state.get(key):
+        return None
+    return similar_job.get(key)
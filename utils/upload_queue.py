@@ -0,0 +1,201 @@
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from utils import rate_limit
+from utils.metrics import current_run_ids, metrics
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Finished uploads nobody released (e.g. abandoned runs) are forgotten beyond this many.
+MAX_FINISHED_HANDLES = 256
+
+
+class UploadHandle:
+    """A pending Google Drive upload. `wait` blocks until the document URL is known."""
+
+    def __init__(self, docx_path: str, name: str, file_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.docx_path = docx_path
+        self.name = name
+        # The existing Google Doc to update in place, if any.
+        self.file_id = file_id
+        self.status = "pending"
+        # Set as soon as the Google Doc exists, so a failed share isn't retried by creating another one.
+        self.doc_id: Optional[str] = None
+        self.doc_url: Optional[str] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.submitted_at = time.perf_counter()
+        # The graph run that queued the upload, so its metrics are attributed to it.
+        self.run_ids = current_run_ids()
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Waits for the upload to finish and returns the document URL (None if it failed)."""
+        self._done.wait(timeout)
+        return self.doc_url
+
+    def _finish(self, doc_id: Optional[str] = None, error: Optional[str] = None):
+        if doc_id:
+            self.doc_id = doc_id
+            self.doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
+            self.status = "done"
+        else:
+            self.error = error
+            self.status = "failed"
+        self._done.set()
+
+
+def _is_retryable(error: Exception) -> bool:
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS_CODES or _is_rate_limited(error)
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Drive reports quota errors as 429, or as 403 with a `(user)RateLimitExceeded` reason."""
+    from googleapiclient.errors import HttpError
+
+    if not isinstance(error, HttpError):
+        return False
+    content = error.content or b""
+    return error.resp.status == 429 or (
+        error.resp.status == 403 and (b"rateLimitExceeded" in content or b"RateLimitExceeded" in content)
+    )
+
+
+def _execute(request):
+    """Executes a Drive request once the shared `drive` rate limiter allows it."""
+    from utils.google_drive import execute
+
+    rate_limit.acquire("drive")
+    return execute(request)
+
+
+class UploadQueue:
+    """
+    Uploads DOCX files to Google Drive on background threads.
+
+    `submit` returns an `UploadHandle` right away, so the proposal tool doesn't wait on
+    the network. Each job uploads the file as a Google Doc and shares it with anyone
+    who has the link, retrying transient failures with exponential backoff. Requests
+    go through the shared `drive` rate limiter, so a quota error pauses every worker
+    until Drive's `Retry-After` delay has passed. Jobs with
+    a `file_id` replace the content of that Google Doc instead, keeping its URL and
+    sharing settings.
+    """
+
+    def __init__(self, workers: int = 2, max_attempts: int = 5, backoff_seconds: float = 1.0):
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._jobs = queue.Queue()
+        self._handles: Dict[str, UploadHandle] = {}
+        self._lock = threading.Lock()
+        for _ in range(max(1, workers)):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, docx_path: str, name: str, file_id: Optional[str] = None) -> UploadHandle:
+        handle = UploadHandle(docx_path, name, file_id=file_id)
+        with self._lock:
+            self._handles[handle.id] = handle
+            self._evict_finished()
+        self._jobs.put(handle)
+        return handle
+
+    def get(self, handle_id: str) -> Optional[UploadHandle]:
+        with self._lock:
+            return self._handles.get(handle_id)
+
+    def release(self, handle_id: str):
+        """Forgets a handle whose outcome has been read."""
+        with self._lock:
+            self._handles.pop(handle_id, None)
+
+    def _evict_finished(self):
+        finished = [handle_id for handle_id, handle in self._handles.items() if handle.done()]
+        for handle_id in finished[:max(0, len(finished) - MAX_FINISHED_HANDLES)]:
+            del self._handles[handle_id]
+
+    def _upload(self, handle: UploadHandle) -> str:
+        # The Google client libraries are only loaded once something is uploaded.
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import MediaFileUpload
+
+        from utils.google_drive import get_drive_service
+
+        drive_service = get_drive_service()
+        file_metadata = {"name": handle.name, "mimeType": "application/vnd.google-apps.document"}
+        media = MediaFileUpload(handle.docx_path, mimetype=DOCX_MIME_TYPE, resumable=False)
+        queue_seconds = time.perf_counter() - handle.submitted_at if handle.attempts == 1 else 0.0
+        if handle.file_id:
+            try:
+                with metrics.stage("upload", "files.update", queue_seconds=queue_seconds, attempt=handle.attempts, **handle.run_ids):
+                    _execute(drive_service.files().update(fileId=handle.file_id, media_body=media, fields="id"))
+                return handle.file_id
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                # The document was deleted in the meantime; create a new one.
+                handle.file_id = None
+                media = MediaFileUpload(handle.docx_path, mimetype=DOCX_MIME_TYPE, resumable=False)
+
+        if handle.doc_id is None:
+            with metrics.stage("upload", "files.create", queue_seconds=queue_seconds, attempt=handle.attempts, **handle.run_ids):
+                uploaded_file = _execute(drive_service.files().create(body=file_metadata, media_body=media, fields="id"))
+            handle.doc_id = uploaded_file.get("id")
+        # Retries after a failed share only repeat this step.
+        with metrics.stage("share", "permissions.create", attempt=handle.attempts, **handle.run_ids):
+            _execute(drive_service.permissions().create(fileId=handle.doc_id, body={"type": "anyone", "role": "reader"}))
+        return handle.doc_id
+
+    def _worker(self):
+        while True:
+            handle = self._jobs.get()
+            try:
+                self._process(handle)
+            finally:
+                self._jobs.task_done()
+
+    def _process(self, handle: UploadHandle):
+        while True:
+            handle.attempts += 1
+            try:
+                handle._finish(doc_id=self._upload(handle))
+                rate_limit.get_limiter("drive").on_success()
+                return
+            except FileNotFoundError:
+                handle._finish(error="`credentials.json` not found. Please ensure it is in the root directory.")
+                return
+            except Exception as e:
+                if handle.attempts >= self.max_attempts or not _is_retryable(e):
+                    handle._finish(error=str(e))
+                    return
+                if _is_rate_limited(e):
+                    # The next attempt waits in the limiter, behind the other workers.
+                    rate_limit.get_limiter("drive").on_rate_limited(rate_limit.retry_after_seconds(e))
+                    continue
+                delay = self.backoff_seconds * 2 ** (handle.attempts - 1)
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+
+_queue: Optional[UploadQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_upload_queue() -> UploadQueue:
+    """Returns the process-wide upload queue (workers set by `GOOGLE_UPLOAD_WORKERS`)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue(workers=int(os.environ.get("GOOGLE_UPLOAD_WORKERS", "2")))
+        return _queue